@@ -0,0 +1,9 @@
+"""Entry point for online backups and restores of the Banking MCP Server's database."""
+
+import sys
+
+from src.zenith.database.backup import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
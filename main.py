@@ -1,13 +1,22 @@
 """Entry point for the Banking MCP Server."""
 
 import os
-
-from src.zenith.server import mcp
+import sys
 
 
 if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "80"))
+    workers = int(os.getenv("ZENITH_WORKERS", "1"))
+    
+    if workers > 1:
+        from src.zenith.cluster import run_cluster
+        
+        sys.exit(run_cluster(host, port, workers))
+    
+    from src.zenith.database import start_rollup_folder
+    from src.zenith.server import mcp
     
+    start_rollup_folder()
     mcp.run(transport="sse", host=host, port=port)
 
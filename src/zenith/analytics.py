@@ -0,0 +1,205 @@
+"""Ledger summaries over windows of days, computed from rollup rows.
+
+Rollup rows are split into column arrays and aggregated with NumPy when it
+is installed (``pip install zenith[analytics]``), or with plain Python
+otherwise. Both paths sum integer minor units exactly and give the same
+results. NumPy is imported by the first summary, not at start-up. Columns
+whose sums could pass the 64-bit range of NumPy's integers are always
+aggregated with Python ints.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from .models import MAX_MINOR_UNITS, TransactionType
+
+
+_UNLOADED = object()
+
+# Set by _load_numpy(); None when NumPy is not installed
+np = _UNLOADED
+
+
+# Summary flow -> the transaction type counted in it; a transfer is counted
+# once, on its sending side
+FLOWS = {
+    "deposits": TransactionType.DEPOSIT,
+    "withdrawals": TransactionType.WITHDRAWAL,
+    "transfers": TransactionType.TRANSFER_OUT,
+}
+
+
+@dataclass(slots=True)
+class RollupColumns:
+    """Rollup rows of a window as parallel columns, one entry per row."""
+    
+    days: list[str] = field(default_factory=list)
+    account_ids: list[str] = field(default_factory=list)
+    types: list[str] = field(default_factory=list)
+    counts: list[int] = field(default_factory=list)
+    amounts: list[int] = field(default_factory=list)
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "RollupColumns":
+        """Split rollup rows into columns.
+        
+        Args:
+            rows: ``(day, account_id, type, count, amount)`` tuples.
+            
+        Returns:
+            The columns; empty if there are no rows.
+        """
+        rows = list(rows)
+        if not rows:
+            return cls()
+        return cls(*map(list, zip(*rows)))
+    
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+def summarize(
+    columns: RollupColumns,
+    start: date,
+    end: date,
+    top_accounts: int = 10,
+) -> dict:
+    """Summarize a window of days of ledger activity.
+    
+    Args:
+        columns: Rollup columns for days from ``start`` to ``end``.
+        start: First day of the window.
+        end: Last day of the window, inclusive.
+        top_accounts: Number of busiest accounts to return.
+        
+    Returns:
+        ``days``: one entry per day of the window, including quiet days,
+        with the count and amount of each flow and the net flow (deposits
+        less withdrawals); ``totals``: the same over the whole window;
+        ``top_accounts``: the accounts with the most transactions, ties
+        broken by volume, then account ID. Amounts are in minor units.
+        
+    Raises:
+        ValueError: If ``end`` is before ``start`` or ``top_accounts`` is negative.
+    """
+    if end < start:
+        raise ValueError("End date is before start date")
+    if top_accounts < 0:
+        raise ValueError("top_accounts cannot be negative")
+    
+    day_count = (end - start).days + 1
+    if _load_numpy() is not None and len(columns) and _fits_int64(columns):
+        flows, busiest = _aggregate_numpy(columns, start, day_count, top_accounts)
+    else:
+        flows, busiest = _aggregate_python(columns, start, day_count, top_accounts)
+    
+    days = []
+    for index in range(day_count):
+        entry = {"date": (start + timedelta(days=index)).isoformat()}
+        for name, (counts, amounts) in flows.items():
+            entry[name] = {"count": counts[index], "amount": amounts[index]}
+        entry["net_flow"] = entry["deposits"]["amount"] - entry["withdrawals"]["amount"]
+        days.append(entry)
+    
+    totals = {
+        name: {"count": sum(counts), "amount": sum(amounts)}
+        for name, (counts, amounts) in flows.items()
+    }
+    totals["net_flow"] = totals["deposits"]["amount"] - totals["withdrawals"]["amount"]
+    
+    return {
+        "days": days,
+        "totals": totals,
+        "top_accounts": [
+            {"account_id": account_id, "transactions": count, "volume": volume}
+            for account_id, count, volume in busiest
+        ],
+    }
+
+
+def _fits_int64(columns: RollupColumns) -> bool:
+    # Amounts are never negative, so no sum can pass this bound
+    return max(columns.amounts) * len(columns) <= MAX_MINOR_UNITS
+
+
+def _load_numpy():
+    global np
+    if np is _UNLOADED:
+        try:
+            import numpy
+        except ImportError:  # optional: pip install zenith[analytics]
+            numpy = None
+        np = numpy
+    return np
+
+
+def _aggregate_numpy(
+    columns: RollupColumns,
+    start: date,
+    day_count: int,
+    top_accounts: int,
+) -> tuple[dict, list[tuple[str, int, int]]]:
+    day_index = (
+        np.array(columns.days, dtype="datetime64[D]") - np.datetime64(start, "D")
+    ).astype(np.int64)
+    types = np.array(columns.types)
+    counts = np.array(columns.counts, dtype=np.int64)
+    amounts = np.array(columns.amounts, dtype=np.int64)
+    
+    flows = {}
+    for name, transaction_type in FLOWS.items():
+        mask = types == transaction_type
+        day_counts = np.zeros(day_count, dtype=np.int64)
+        day_amounts = np.zeros(day_count, dtype=np.int64)
+        np.add.at(day_counts, day_index[mask], counts[mask])
+        np.add.at(day_amounts, day_index[mask], amounts[mask])
+        flows[name] = (day_counts.tolist(), day_amounts.tolist())
+    
+    # unique() sorts, so the stable lexsort breaks remaining ties by account ID
+    account_ids, inverse = np.unique(np.array(columns.account_ids), return_inverse=True)
+    account_counts = np.zeros(len(account_ids), dtype=np.int64)
+    account_volumes = np.zeros(len(account_ids), dtype=np.int64)
+    np.add.at(account_counts, inverse, counts)
+    np.add.at(account_volumes, inverse, amounts)
+    order = np.lexsort((-account_volumes, -account_counts))[:top_accounts]
+    busiest = list(zip(
+        account_ids[order].tolist(),
+        account_counts[order].tolist(),
+        account_volumes[order].tolist(),
+    ))
+    return flows, busiest
+
+
+def _aggregate_python(
+    columns: RollupColumns,
+    start: date,
+    day_count: int,
+    top_accounts: int,
+) -> tuple[dict, list[tuple[str, int, int]]]:
+    flows = {name: ([0] * day_count, [0] * day_count) for name in FLOWS}
+    flow_of_type = {transaction_type: name for name, transaction_type in FLOWS.items()}
+    per_account: defaultdict[str, list[int]] = defaultdict(lambda: [0, 0])
+    
+    for day, account_id, transaction_type, count, amount in zip(
+        columns.days,
+        columns.account_ids,
+        columns.types,
+        columns.counts,
+        columns.amounts,
+    ):
+        name = flow_of_type.get(transaction_type)
+        if name is not None:
+            index = (date.fromisoformat(day) - start).days
+            flows[name][0][index] += count
+            flows[name][1][index] += amount
+        totals = per_account[account_id]
+        totals[0] += count
+        totals[1] += amount
+    
+    busiest = sorted(
+        ((account_id, count, volume) for account_id, (count, volume) in per_account.items()),
+        key=lambda item: (-item[1], -item[2], item[0]),
+    )[:top_accounts]
+    return flows, busiest
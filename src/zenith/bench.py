@@ -0,0 +1,490 @@
+"""Load generator and benchmark harness for the banking MCP tools.
+
+Runs N concurrent simulated clients against the tools, either in-process
+(through FastMCP's in-memory transport) or against a running SSE server
+started from ``main.py``, and reports throughput and latency percentiles.
+
+Usage:
+    python -m src.zenith.bench inprocess --clients 8 --duration 10
+    python -m src.zenith.bench sse --url http://localhost:80/sse --clients 32
+    python -m src.zenith.bench inprocess --save baseline.json
+    python -m src.zenith.bench inprocess --compare baseline.json
+    python -m src.zenith.bench rows --rows 1000
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+DEFAULT_MIX = {
+    "get_balance": 0.50,
+    "deposit": 0.20,
+    "withdraw": 0.10,
+    "get_transactions": 0.15,
+    "create_account": 0.05,
+}
+
+INITIAL_DEPOSIT = 1000.0
+
+
+@dataclass
+class BenchConfig:
+    """Parameters of one benchmark run."""
+    
+    mode: str = "inprocess"
+    url: str | None = None
+    clients: int = 8
+    duration: float = 10.0
+    operations: int | None = None
+    accounts: int = 100
+    mix: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    seed: int = 0
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """Parse a read/write mix such as ``get_balance=0.8,deposit=0.2``.
+    
+    Args:
+        text: Comma-separated ``tool=weight`` pairs.
+        
+    Returns:
+        Mapping of tool name to relative weight.
+        
+    Raises:
+        ValueError: If an entry is malformed or names an unknown tool.
+    """
+    mix = {}
+    for entry in text.split(","):
+        name, _, weight = entry.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown tool in mix: {name!r}")
+        mix[name] = float(weight)
+    
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("Mix needs at least one positive weight")
+    return mix
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples.
+    
+    Args:
+        samples: Sorted sample values.
+        fraction: Percentile as a fraction, e.g. 0.99.
+        
+    Returns:
+        The sample at that rank, or 0.0 for no samples.
+    """
+    if not samples:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(samples)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    """Summarize latency samples for one tool (or all tools).
+    
+    Args:
+        latencies: Per-call latencies in seconds.
+        errors: Number of calls that raised or returned an error.
+        elapsed: Wall-clock duration of the run in seconds.
+        
+    Returns:
+        Dictionary of counts, throughput and latency percentiles in ms.
+    """
+    samples = sorted(latencies)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "ops_per_sec": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": 1000 * sum(samples) / len(samples) if samples else 0.0,
+        "p50_ms": 1000 * percentile(samples, 0.50),
+        "p95_ms": 1000 * percentile(samples, 0.95),
+        "p99_ms": 1000 * percentile(samples, 0.99),
+        "max_ms": 1000 * samples[-1] if samples else 0.0,
+    }
+
+
+def _client_target(config: BenchConfig):
+    if config.mode == "sse":
+        if not config.url:
+            raise ValueError("SSE mode needs --url")
+        return config.url
+    
+    from .database import initialize_database
+    from .server import mcp
+    
+    initialize_database()
+    return mcp
+
+
+def _tool_arguments(
+    name: str,
+    rng: random.Random,
+    account_ids: list[str],
+    funded: list[str],
+) -> dict:
+    if name == "create_account":
+        return {"holder_name": f"Bench {rng.randrange(1_000_000)}"}
+    
+    # Accounts created during the run are empty, so withdrawals skip them
+    account_id = rng.choice(funded if name == "withdraw" else account_ids)
+    if name in ("deposit", "withdraw"):
+        return {"account_id": account_id, "amount": rng.randint(1, 1000) / 100}
+    if name == "get_transactions":
+        return {"account_id": account_id, "limit": 10}
+    return {"account_id": account_id}
+
+
+async def _setup_accounts(target, count: int) -> list[str]:
+    from fastmcp import Client
+    
+    account_ids = []
+    async with Client(target) as client:
+        for i in range(count):
+            created = await client.call_tool(
+                "create_account",
+                {"holder_name": f"Bench {i}"},
+            )
+            account_id = created.data["account_id"]
+            await client.call_tool("deposit", {
+                "account_id": account_id,
+                "amount": INITIAL_DEPOSIT,
+            })
+            account_ids.append(account_id)
+    return account_ids
+
+
+async def run_benchmark(config: BenchConfig) -> dict:
+    """Run a benchmark and collect per-tool latency statistics.
+    
+    Args:
+        config: Benchmark parameters.
+        
+    Returns:
+        Report with the config, elapsed time, overall and per-tool summaries.
+    """
+    from fastmcp import Client
+    
+    target = _client_target(config)
+    account_ids = await _setup_accounts(target, config.accounts)
+    funded = list(account_ids)
+    
+    names = [name for name, weight in config.mix.items() if weight > 0]
+    weights = [config.mix[name] for name in names]
+    latencies: dict[str, list[float]] = {name: [] for name in names}
+    errors: dict[str, int] = {name: 0 for name in names}
+    remaining = [config.operations] if config.operations is not None else None
+    
+    async def worker(index: int, deadline: float) -> None:
+        rng = random.Random(config.seed * 1000 + index)
+        async with Client(target) as client:
+            while time.perf_counter() < deadline:
+                if remaining is not None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                
+                name = rng.choices(names, weights)[0]
+                arguments = _tool_arguments(name, rng, account_ids, funded)
+                started = time.perf_counter()
+                try:
+                    result = await client.call_tool(name, arguments)
+                except Exception:
+                    errors[name] += 1
+                    continue
+                if "error" in result.data:
+                    # Rejected calls, e.g. for insufficient funds, are failures too
+                    errors[name] += 1
+                    continue
+                latencies[name].append(time.perf_counter() - started)
+                
+                if name == "create_account":
+                    account_ids.append(result.data["account_id"])
+    
+    started = time.perf_counter()
+    deadline = started + (config.duration if config.operations is None else float("inf"))
+    await asyncio.gather(*(worker(i, deadline) for i in range(config.clients)))
+    elapsed = time.perf_counter() - started
+    
+    all_latencies = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "config": asdict(config),
+        "git_commit": _git_commit(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "elapsed": elapsed,
+        "total": summarize(all_latencies, sum(errors.values()), elapsed),
+        "tools": {
+            name: summarize(latencies[name], errors[name], elapsed)
+            for name in names
+        },
+    }
+
+
+def compare_reports(report: dict, baseline: dict, tolerance: float = 0.10) -> list[str]:
+    """List regressions of a report against a saved baseline.
+    
+    Args:
+        report: Report from the current run.
+        baseline: Report loaded from a saved baseline file.
+        tolerance: Allowed relative drop in ops/s or rise in p99 latency.
+        
+    Returns:
+        Human-readable regression descriptions; empty if none.
+    """
+    regressions = []
+    current_tools = {"total": report["total"], **report["tools"]}
+    baseline_tools = {"total": baseline["total"], **baseline["tools"]}
+    
+    for name, before in baseline_tools.items():
+        after = current_tools.get(name)
+        if after is None or not before["count"]:
+            continue
+        if after["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: ops/s {before['ops_per_sec']:.1f} -> {after['ops_per_sec']:.1f}"
+            )
+        if after["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p99 {before['p99_ms']:.2f}ms -> {after['p99_ms']:.2f}ms"
+            )
+    return regressions
+
+
+def run_row_benchmark(rows: int = 1000, repeat: int = 20) -> dict:
+    """Measure the cost of turning ledger rows into get_transactions entries.
+    
+    Writes ``rows`` ledger rows for one account, then reads them back as a
+    single page along two paths: through Transaction objects that are then
+    copied into response dicts, and through a row factory that builds the
+    response dicts straight from the row tuples. Both include the query.
+    
+    Args:
+        rows: Ledger rows to write and read per page.
+        repeat: Timed page reads per path.
+        
+    Returns:
+        Report with the median time per row over the timed reads and the
+        peak traced memory of one page read.
+    """
+    from .database import (
+        apply_transactions,
+        create_account,
+        get_transactions_page,
+        initialize_database,
+    )
+    from .models import TransactionType, from_minor_units
+    from .server import transaction_entry
+    
+    initialize_database()
+    
+    account_id = create_account("Bench rows").account_id
+    apply_transactions(TransactionType.DEPOSIT, [(account_id, 1)] * rows)
+    
+    def through_models() -> list[dict]:
+        page = get_transactions_page(account_id, rows)
+        return [
+            {
+                "transaction_id": txn.transaction_id,
+                "type": txn.type,
+                "amount": from_minor_units(txn.amount),
+                "balance_after": from_minor_units(txn.balance_after),
+                "created_at": txn.created_at,
+            }
+            for txn in page.transactions
+        ]
+    
+    def through_row_factory() -> list[dict]:
+        return get_transactions_page(
+            account_id,
+            rows,
+            row_factory=transaction_entry,
+        ).transactions
+    
+    paths = {}
+    for name, read in (("models", through_models), ("row_factory", through_row_factory)):
+        read()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            read()
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        
+        tracemalloc.start()
+        read()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        paths[name] = {
+            "us_per_row": percentile(samples, 0.50) / rows * 1e6,
+            "peak_kib": peak / 1024,
+        }
+    
+    return {
+        "rows": rows,
+        "repeat": repeat,
+        "git_commit": _git_commit(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "paths": paths,
+    }
+
+
+def format_row_report(report: dict) -> str:
+    """Render a row benchmark report as a fixed-width table.
+    
+    Args:
+        report: Report from :func:`run_row_benchmark`.
+        
+    Returns:
+        The table as a string.
+    """
+    header = f"{'path':<14}{'us/row':>10}{'peak KiB':>12}"
+    lines = [header, "-" * len(header)]
+    for name, path in report["paths"].items():
+        lines.append(f"{name:<14}{path['us_per_row']:>10.3f}{path['peak_kib']:>12.1f}")
+    return "\n".join(lines)
+
+
+def format_report(report: dict) -> str:
+    """Render a report as a fixed-width table.
+    
+    Args:
+        report: Report from :func:`run_benchmark`.
+        
+    Returns:
+        The table as a string.
+    """
+    header = (
+        f"{'tool':<18}{'count':>8}{'errors':>8}{'ops/s':>10}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for name, summary in [*report["tools"].items(), ("total", report["total"])]:
+        lines.append(
+            f"{name:<18}{summary['count']:>8}{summary['errors']:>8}"
+            f"{summary['ops_per_sec']:>10.1f}{summary['p50_ms']:>9.2f}"
+            f"{summary['p95_ms']:>9.2f}{summary['p99_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+@contextmanager
+def _scratch_database(name: str) -> Iterator[None]:
+    # A run without --database must not fill the real database file
+    if os.getenv("ZENITH_DATABASE_PATH"):
+        yield
+        return
+    
+    from .database import close_connections
+    
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["ZENITH_DATABASE_PATH"] = os.path.join(directory, name)
+        try:
+            yield
+        finally:
+            close_connections()
+            del os.environ["ZENITH_DATABASE_PATH"]
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point.
+    
+    Args:
+        argv: Arguments excluding the program name; defaults to sys.argv.
+        
+    Returns:
+        Process exit code; 1 when ``--compare`` finds a regression.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("mode", choices=["inprocess", "sse", "rows"])
+    parser.add_argument("--url", help="SSE endpoint, e.g. http://localhost:80/sse")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--operations", type=int, help="stop after this many calls")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--mix", type=parse_mix, help="e.g. get_balance=0.8,deposit=0.2")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--database",
+        help="database file for in-process runs; a temporary one by default",
+    )
+    parser.add_argument("--save", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--rows", type=int, default=1000, help="ledger rows for rows mode (max 1000)")
+    parser.add_argument("--repeat", type=int, default=20, help="page reads for rows mode")
+    args = parser.parse_args(argv)
+    
+    if args.database:
+        os.environ["ZENITH_DATABASE_PATH"] = args.database
+    
+    if args.mode == "rows":
+        with _scratch_database("rows.db"):
+            report = run_row_benchmark(args.rows, args.repeat)
+        print(format_row_report(report))
+        if args.save:
+            Path(args.save).write_text(json.dumps(report, indent=2))
+        return 0
+    
+    config = BenchConfig(
+        mode=args.mode,
+        url=args.url,
+        clients=args.clients,
+        duration=args.duration,
+        operations=args.operations,
+        accounts=args.accounts,
+        mix=args.mix or dict(DEFAULT_MIX),
+        seed=args.seed,
+    )
+    if args.mode == "inprocess":
+        with _scratch_database("bench.db"):
+            report = asyncio.run(run_benchmark(config))
+    else:
+        report = asyncio.run(run_benchmark(config))
+    print(format_report(report))
+    
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+    
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare_reports(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Multi-process server: N HTTP workers and one SQLite writer process.
+
+The supervisor binds the listening socket once and hands it to every
+worker, so the kernel spreads connections across processes. Workers serve
+the MCP tools and read SQLite directly; their writes are forwarded to a
+single writer process (see :mod:`zenith.database.ipc`), so SQLite's write
+lock is only ever taken by one process. Crashed workers and a crashed
+writer are restarted.
+
+SSE sessions live in the process that opened them, so workers speak the
+stateless streamable-HTTP transport at ``/mcp`` instead of SSE.
+
+Usage:
+    ZENITH_WORKERS=4 python main.py
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+
+from .database import aio, start_rollup_folder
+from .database.ipc import (
+    WRITE_OPERATIONS,
+    WRITER_RESTARTED,
+    WriterClient,
+    encode_reply,
+    set_writer_client,
+)
+
+
+MCP_PATH = "/mcp"
+SUPERVISE_INTERVAL = 0.5
+
+
+def run_cluster(host: str, port: int, workers: int) -> int:
+    """Run the supervised multi-worker server until SIGINT or SIGTERM.
+    
+    Args:
+        host: Interface to listen on.
+        port: TCP port shared by all workers.
+        workers: Number of HTTP worker processes.
+        
+    Returns:
+        Process exit code.
+    """
+    if workers < 1:
+        raise ValueError("Need at least one worker")
+    
+    context = multiprocessing.get_context("spawn")
+    listener = socket.create_server((host, port), backlog=2048)
+    requests = context.Queue()
+    responses = [context.Queue() for _ in range(workers)]
+    
+    writer = _start_writer(context, requests, responses)
+    processes = [
+        _start_worker(context, index, listener, requests, responses[index])
+        for index in range(workers)
+    ]
+    
+    stopping = False
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    
+    try:
+        while not stopping:
+            time.sleep(SUPERVISE_INTERVAL)
+            if not writer.is_alive():
+                writer = _start_writer(context, requests, responses)
+                for queue in responses:
+                    queue.put(WRITER_RESTARTED)
+            for index, process in enumerate(processes):
+                if not process.is_alive():
+                    processes[index] = _start_worker(
+                        context,
+                        index,
+                        listener,
+                        requests,
+                        responses[index],
+                    )
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        
+        # Workers are gone; let the writer drain what they already queued
+        requests.put(None)
+        writer.join(timeout=30)
+        if writer.is_alive():
+            writer.terminate()
+        listener.close()
+    
+    return 0
+
+
+def _start_writer(context, requests: Queue, responses: list[Queue]) -> BaseProcess:
+    process = context.Process(
+        target=_writer_main,
+        args=(requests, responses),
+        name="zenith-writer",
+    )
+    process.start()
+    return process
+
+
+def _start_worker(
+    context,
+    index: int,
+    listener: socket.socket,
+    requests: Queue,
+    responses: Queue,
+) -> BaseProcess:
+    process = context.Process(
+        target=_worker_main,
+        args=(index, listener, requests, responses),
+        name=f"zenith-worker-{index}",
+    )
+    process.start()
+    return process
+
+
+def _writer_main(requests: Queue, responses: list[Queue]) -> None:
+    # The writer batches concurrent writes from all workers into shared commits
+    os.environ.setdefault("ZENITH_GROUP_COMMIT", "1")
+    os.environ["ZENITH_ACCOUNT_CACHE_SIZE"] = "0"
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    asyncio.run(_serve_writes(requests, responses))
+
+
+async def _serve_writes(requests: Queue, responses: list[Queue]) -> None:
+    async def handle(worker: int, request_id: str, operation: str, args: tuple) -> None:
+        try:
+            if operation not in WRITE_OPERATIONS:
+                raise ValueError(f"Not a forwarded write operation: {operation}")
+            result = await getattr(aio, operation)(*args)
+        except Exception as error:
+            reply = encode_reply(request_id, None, error)
+        else:
+            reply = encode_reply(request_id, result, None)
+        responses[worker].put(reply)
+    
+    loop = asyncio.get_running_loop()
+    await aio.initialize_database()
+    # The only process that writes folds the rollups; aio.shutdown stops it
+    start_rollup_folder()
+    
+    tasks: set[asyncio.Task] = set()
+    try:
+        while True:
+            message = await loop.run_in_executor(None, requests.get)
+            if message is None:
+                break
+            task = asyncio.create_task(handle(*message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        await loop.run_in_executor(None, aio.shutdown)
+
+
+def _worker_main(
+    index: int,
+    listener: socket.socket,
+    requests: Queue,
+    responses: Queue,
+) -> None:
+    # Other workers' writes would not invalidate this process's cache
+    os.environ["ZENITH_ACCOUNT_CACHE_SIZE"] = "0"
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    set_writer_client(WriterClient(index, requests, responses))
+    
+    # Imported here: the supervisor and the writer process never need the
+    # web stack, and spawned processes import this module
+    import uvicorn
+    
+    from .server import mcp
+    
+    app = mcp.http_app(path=MCP_PATH, transport="http", stateless_http=True)
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    server.run(sockets=[listener])
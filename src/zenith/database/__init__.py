@@ -1,20 +1,142 @@
-from .connection import get_connection, get_database_path
-from .schema import initialize_database
+from .connection import (
+    ConnectionPool,
+    close_connections,
+    get_connection,
+    get_database_path,
+    after_commit,
+    get_pool,
+    get_shard_count,
+    get_shard_path,
+    immediate_transaction,
+    retry_on_busy,
+    shard_for,
+)
+from .profiles import PROFILES, DurabilityProfile, get_durability_profile
+from .cache import AccountCache, get_account_cache
+from .errors import (
+    AccountNotFoundError,
+    BalanceLimitError,
+    BankingError,
+    IdempotencyConflictError,
+    InsufficientFundsError,
+    PartialCommitError,
+)
+from .idempotency import IdempotencyCache, get_idempotency_cache
+from .schema import (
+    SCHEMA_VERSION,
+    apply_migrations,
+    get_schema_version,
+    initialize_database,
+)
+from .queries import (
+    TRANSACTION_COLUMNS,
+    Statement,
+    get_statement,
+    registered_statements,
+)
 from .operations import (
     create_account,
     get_account_by_id,
+    get_accounts_by_ids,
+    find_accounts,
+    list_accounts,
     update_account_balance,
     record_transaction,
+    apply_transaction,
+    apply_transactions,
+    transfer,
     get_transactions_by_account,
+    get_transactions_page,
+    get_balance_at,
+    verify_account,
+    get_statement_chunk,
+    iter_statement,
+)
+from .rollups import (
+    ROLLUP_BATCH_SIZE,
+    RollupFolder,
+    close_rollup_folder,
+    folded_in_background,
+    get_rollup_folder,
+    read_rollups,
+    refresh_rollups,
+    start_rollup_folder,
+)
+from .archive import archive_transactions, get_archive_age
+from .backup import create_backup, get_backup_dir, restore_backup
+from .batcher import (
+    GroupCommitWriter,
+    close_group_commit_writer,
+    get_group_commit_writer,
 )
+from .ipc import WriterUnavailableError
+from . import aio
 
 __all__ = [
+    "aio",
+    "GroupCommitWriter",
+    "close_group_commit_writer",
+    "get_group_commit_writer",
+    "ConnectionPool",
+    "close_connections",
     "get_connection",
     "get_database_path",
+    "get_pool",
+    "get_shard_count",
+    "get_shard_path",
+    "shard_for",
+    "retry_on_busy",
+    "AccountCache",
+    "get_account_cache",
+    "PROFILES",
+    "DurabilityProfile",
+    "get_durability_profile",
+    "AccountNotFoundError",
+    "BalanceLimitError",
+    "BankingError",
+    "InsufficientFundsError",
+    "IdempotencyConflictError",
+    "PartialCommitError",
+    "WriterUnavailableError",
+    "IdempotencyCache",
+    "get_idempotency_cache",
+    "SCHEMA_VERSION",
+    "apply_migrations",
+    "get_schema_version",
     "initialize_database",
+    "TRANSACTION_COLUMNS",
+    "Statement",
+    "get_statement",
+    "registered_statements",
     "create_account",
     "get_account_by_id",
+    "get_accounts_by_ids",
+    "find_accounts",
+    "list_accounts",
     "update_account_balance",
     "record_transaction",
+    "apply_transaction",
+    "apply_transactions",
+    "transfer",
+    "after_commit",
+    "immediate_transaction",
     "get_transactions_by_account",
+    "get_transactions_page",
+    "get_balance_at",
+    "verify_account",
+    "get_statement_chunk",
+    "iter_statement",
+    "ROLLUP_BATCH_SIZE",
+    "refresh_rollups",
+    "RollupFolder",
+    "close_rollup_folder",
+    "folded_in_background",
+    "get_rollup_folder",
+    "start_rollup_folder",
+    "read_rollups",
+    "archive_transactions",
+    "get_archive_age",
+    "create_backup",
+    "get_backup_dir",
+    "restore_backup",
 ]
@@ -0,0 +1,416 @@
+"""Async variants of the database API.
+
+Each coroutine runs the matching blocking operation on a dedicated database
+executor, so a slow commit or a wait on SQLite's write lock only occupies an
+executor thread and never the event loop serving MCP clients.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TypeVar
+
+from . import operations, rollups, schema
+from .batcher import close_group_commit_writer, get_group_commit_writer
+from .connection import DEFAULT_POOL_SIZE, close_connections, get_shard_count, shard_for
+from .errors import BankingError
+from .ipc import get_writer_client
+from ..models.types import (
+    Account,
+    AccountPage,
+    AccountVerification,
+    Transaction,
+    TransactionPage,
+)
+
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the database executor, creating it on first use.
+    
+    The executor has one thread per pooled connection: ``ZENITH_DB_POOL_SIZE``
+    threads for each shard.
+    
+    Returns:
+        The shared ThreadPoolExecutor for database work.
+    """
+    global _executor
+    
+    with _executor_lock:
+        if _executor is None:
+            pool_size = int(os.getenv("ZENITH_DB_POOL_SIZE", str(DEFAULT_POOL_SIZE)))
+            workers = pool_size * get_shard_count()
+            _executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix="zenith-db",
+            )
+        return _executor
+
+
+async def run_in_executor(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking database call on the database executor.
+    
+    Args:
+        func: The blocking function to call.
+        *args: Positional arguments for ``func``.
+        **kwargs: Keyword arguments for ``func``.
+        
+    Returns:
+        Whatever ``func`` returns; exceptions propagate to the awaiting task.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+def shutdown() -> None:
+    """Stop rollup folding, flush group commits, stop the executor, close connections."""
+    global _executor
+    
+    rollups.close_rollup_folder()
+    close_group_commit_writer()
+    
+    with _executor_lock:
+        executor, _executor = _executor, None
+    
+    if executor is not None:
+        executor.shutdown(wait=True)
+    close_connections()
+
+
+async def initialize_database() -> None:
+    """Async variant of :func:`zenith.database.initialize_database`."""
+    await run_in_executor(schema.initialize_database)
+
+
+async def create_account(
+    holder_name: str,
+    idempotency_key: str | None = None,
+) -> Account:
+    """Async variant of :func:`zenith.database.create_account`."""
+    client = get_writer_client()
+    if client is not None:
+        return await client.call("create_account", holder_name, idempotency_key)
+    
+    return await run_in_executor(
+        operations.create_account,
+        holder_name,
+        idempotency_key,
+    )
+
+
+async def get_account_by_id(account_id: str) -> Account | None:
+    """Async variant of :func:`zenith.database.get_account_by_id`."""
+    return await run_in_executor(operations.get_account_by_id, account_id)
+
+
+async def get_accounts_by_ids(account_ids: list[str]) -> dict[str, Account]:
+    """Async variant of :func:`zenith.database.get_accounts_by_ids`."""
+    return await run_in_executor(operations.get_accounts_by_ids, account_ids)
+
+
+async def find_accounts(
+    holder_name_prefix: str,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> AccountPage:
+    """Async variant of :func:`zenith.database.find_accounts`."""
+    return await run_in_executor(operations.find_accounts, holder_name_prefix, limit, cursor)
+
+
+async def list_accounts(cursor: str | None = None, limit: int = 20) -> AccountPage:
+    """Async variant of :func:`zenith.database.list_accounts`."""
+    return await run_in_executor(operations.list_accounts, cursor, limit)
+
+
+async def update_account_balance(account_id: str, new_balance: int) -> None:
+    """Async variant of :func:`zenith.database.update_account_balance`."""
+    client = get_writer_client()
+    if client is not None:
+        await client.call("update_account_balance", account_id, new_balance)
+        return
+    
+    await run_in_executor(operations.update_account_balance, account_id, new_balance)
+
+
+async def record_transaction(
+    account_id: str,
+    transaction_type: str,
+    amount: int,
+) -> Transaction:
+    """Async variant of :func:`zenith.database.record_transaction`."""
+    client = get_writer_client()
+    if client is not None:
+        return await client.call(
+            "record_transaction",
+            account_id,
+            transaction_type,
+            amount,
+        )
+    
+    return await run_in_executor(
+        operations.record_transaction,
+        account_id,
+        transaction_type,
+        amount,
+    )
+
+
+async def apply_transaction(
+    account_id: str,
+    transaction_type: str,
+    amount: int,
+    idempotency_key: str | None = None,
+) -> tuple[Transaction, int]:
+    """Async variant of :func:`zenith.database.apply_transaction`.
+    
+    When group commit is enabled the mutation is queued on the shared writer
+    and this coroutine resumes once the batch containing it has committed.
+    In a multi-worker server it is forwarded to the writer process.
+    """
+    client = get_writer_client()
+    if client is not None:
+        return await client.call(
+            "apply_transaction",
+            account_id,
+            transaction_type,
+            amount,
+            idempotency_key,
+        )
+    
+    writer = get_group_commit_writer(shard_for(account_id))
+    if writer is not None:
+        if idempotency_key is not None:
+            replayed = operations.replay_cached(
+                idempotency_key,
+                "apply_transaction",
+                account_id,
+                transaction_type,
+                amount,
+            )
+            if replayed is not None:
+                return replayed[0], replayed[0].balance_after
+        
+        future = writer.submit(
+            operations.apply_transaction_locked,
+            account_id,
+            transaction_type,
+            amount,
+            idempotency_key,
+        )
+        return await asyncio.wrap_future(future)
+    
+    return await run_in_executor(
+        operations.apply_transaction,
+        account_id,
+        transaction_type,
+        amount,
+        idempotency_key,
+    )
+
+
+async def apply_transactions(
+    transaction_type: str,
+    items: list[tuple[str, int]],
+) -> list[tuple[Transaction, int] | BankingError]:
+    """Async variant of :func:`zenith.database.apply_transactions`.
+    
+    With group commit enabled each shard's part of the batch is queued as
+    one item on that shard's writer. In a multi-worker server the batch is
+    forwarded to the writer process.
+    """
+    client = get_writer_client()
+    if client is not None:
+        return await client.call("apply_transactions", transaction_type, items)
+    
+    if get_group_commit_writer() is not None:
+        partitions = operations.partition_by_shard([item[0] for item in items])
+        futures = [
+            get_group_commit_writer(shard).submit(
+                operations.apply_transactions_locked,
+                transaction_type,
+                [items[position] for position in positions],
+            )
+            for shard, positions in partitions.items()
+        ]
+        outcomes = await asyncio.gather(*map(asyncio.wrap_future, futures))
+        
+        results: list[tuple[Transaction, int] | BankingError] = [None] * len(items)
+        for positions, shard_outcomes in zip(partitions.values(), outcomes):
+            for position, outcome in zip(positions, shard_outcomes):
+                results[position] = outcome
+        return results
+    
+    return await run_in_executor(
+        operations.apply_transactions,
+        transaction_type,
+        items,
+    )
+
+
+async def transfer(
+    from_account_id: str,
+    to_account_id: str,
+    amount: int,
+    idempotency_key: str | None = None,
+) -> tuple[Transaction, Transaction]:
+    """Async variant of :func:`zenith.database.transfer`.
+    
+    With group commit enabled, a transfer between accounts on the same shard
+    is queued on that shard's writer. In a multi-worker server it is
+    forwarded to the writer process.
+    """
+    client = get_writer_client()
+    if client is not None:
+        return await client.call(
+            "transfer",
+            from_account_id,
+            to_account_id,
+            amount,
+            idempotency_key,
+        )
+    
+    shard = shard_for(from_account_id)
+    writer = get_group_commit_writer(shard)
+    if (
+        writer is not None
+        and from_account_id != to_account_id
+        and shard_for(to_account_id) == shard
+    ):
+        if idempotency_key is not None:
+            replayed = operations.replay_cached(
+                idempotency_key,
+                "transfer",
+                from_account_id,
+                to_account_id,
+                amount,
+            )
+            if replayed is not None:
+                return replayed[0], replayed[1]
+        
+        future = writer.submit(
+            operations.transfer_locked,
+            from_account_id,
+            to_account_id,
+            amount,
+            idempotency_key,
+        )
+        return await asyncio.wrap_future(future)
+    
+    return await run_in_executor(
+        operations.transfer,
+        from_account_id,
+        to_account_id,
+        amount,
+        idempotency_key,
+    )
+
+
+async def get_transactions_by_account(
+    account_id: str,
+    limit: int = 10,
+) -> list[Transaction]:
+    """Async variant of :func:`zenith.database.get_transactions_by_account`."""
+    return await run_in_executor(
+        operations.get_transactions_by_account,
+        account_id,
+        limit,
+    )
+
+
+async def get_transactions_page(
+    account_id: str,
+    limit: int = 10,
+    before: str | None = None,
+    after: str | None = None,
+    row_factory: Callable[[tuple], object] | None = None,
+) -> TransactionPage:
+    """Async variant of :func:`zenith.database.get_transactions_page`."""
+    return await run_in_executor(
+        operations.get_transactions_page,
+        account_id,
+        limit,
+        before=before,
+        after=after,
+        row_factory=row_factory,
+    )
+
+
+async def get_balance_at(account_id: str, moment: datetime) -> int:
+    """Async variant of :func:`zenith.database.get_balance_at`."""
+    return await run_in_executor(operations.get_balance_at, account_id, moment)
+
+
+async def verify_account(account_id: str, full: bool = False) -> AccountVerification:
+    """Async variant of :func:`zenith.database.verify_account`."""
+    return await run_in_executor(operations.verify_account, account_id, full)
+
+
+async def get_statement_chunk(
+    account_id: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: str | None = None,
+    limit: int = operations.STATEMENT_CHUNK_SIZE,
+) -> tuple[list[Transaction], str | None]:
+    """Async variant of :func:`zenith.database.get_statement_chunk`."""
+    return await run_in_executor(
+        operations.get_statement_chunk,
+        account_id,
+        start,
+        end,
+        after,
+        limit,
+    )
+
+
+async def iter_statement(
+    account_id: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    chunk_size: int = operations.STATEMENT_CHUNK_SIZE,
+) -> AsyncIterator[Transaction]:
+    """Async variant of :func:`zenith.database.iter_statement`.
+    
+    Each chunk is fetched on the database executor; the event loop only
+    sees one chunk of rows at a time.
+    """
+    after = None
+    while True:
+        transactions, after = await get_statement_chunk(
+            account_id,
+            start,
+            end,
+            after,
+            chunk_size,
+        )
+        for transaction in transactions:
+            yield transaction
+        if after is None:
+            return
+
+
+async def refresh_rollups() -> int:
+    """Async variant of :func:`zenith.database.refresh_rollups`.
+    
+    In a multi-worker server it is forwarded to the writer process.
+    """
+    client = get_writer_client()
+    if client is not None:
+        return await client.call("refresh_rollups")
+    
+    return await run_in_executor(rollups.refresh_rollups)
+
+
+async def read_rollups(start_day: str, end_day: str) -> list[tuple]:
+    """Async variant of :func:`zenith.database.read_rollups`."""
+    return await run_in_executor(rollups.read_rollups, start_day, end_day)
@@ -0,0 +1,456 @@
+"""Move old ledger rows into per-month archive files and read them back.
+
+Rows older than a cutoff are copied into one archive file per UTC month of
+their ``created_at``, ``<name>.archive-YYYY-MM<suffix>`` next to the
+database and shared by all shards, then deleted from their shard. The hot
+files keep only recent history, so the pages history reads and writes
+touch stay few enough to be cached. Archiving runs in short batches and is
+safe with the server up; run it periodically:
+    python -m src.zenith.database.archive
+    python -m src.zenith.database.archive --older-than-days 90 --compress
+
+Each account's archived rows are exactly its oldest ones, ``seq`` 1 up to
+just before its first row left in the hot file, so history reads only open
+archive files once they run past that row. Rows are committed to their
+archive before they are deleted, and archives are keyed by transaction ID,
+so an interrupted run leaves at most rows in both places, which readers
+skip and the next run deletes.
+
+Only rows already folded into the ledger rollups are archived, and their
+rollups are kept, so summaries still count archived history. With
+``--compress``, months that end before the cutoff are gzipped; a history
+read that reaches one loads it into memory.
+"""
+
+import argparse
+import functools
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from . import queries
+from .codec import from_micros, to_micros
+from .connection import (
+    get_connection,
+    get_database_path,
+    get_shard_count,
+    immediate_transaction,
+    retry_on_busy,
+)
+from .queries import TRANSACTION_COLUMNS
+from .rollups import CLAMP_ROLLUP_WATERMARK_SQL, fold_pending
+from ..metrics import instrument_operation, record_rows
+
+
+ARCHIVE_BATCH_SIZE = 5_000
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+
+ARCHIVE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id BLOB PRIMARY KEY,
+    account_id BLOB NOT NULL,
+    type TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    balance_after INTEGER NOT NULL,
+    ledger_rowid INTEGER NOT NULL
+)
+"""
+
+ARCHIVE_HISTORY_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_archive_history
+ON transactions (account_id, created_at, ledger_rowid)
+"""
+
+ARCHIVE_SEQ_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_archive_seq
+ON transactions (account_id, seq)
+"""
+
+# Archived rows keep the rowid they had in the hot file, which pagination
+# cursors carry, and are read in LEDGER_SELECT order with it in last place
+_ARCHIVE_SELECT = ", ".join(TRANSACTION_COLUMNS) + ", ledger_rowid"
+
+_INSERT_SQL = f"""
+INSERT OR IGNORE INTO transactions ({_ARCHIVE_SELECT})
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_PAGE_BEFORE_SQL = f"""
+SELECT {_ARCHIVE_SELECT} FROM transactions
+WHERE account_id = ? AND (created_at, ledger_rowid) < (?, ?)
+ORDER BY created_at DESC, ledger_rowid DESC
+LIMIT ?
+"""
+
+_PAGE_AFTER_SQL = f"""
+SELECT {_ARCHIVE_SELECT} FROM transactions
+WHERE account_id = ? AND (created_at, ledger_rowid) > (?, ?) AND created_at < ?
+ORDER BY created_at ASC, ledger_rowid ASC
+LIMIT ?
+"""
+
+_BALANCE_AT_SQL = """
+SELECT balance_after FROM transactions
+WHERE account_id = ? AND created_at <= ?
+ORDER BY created_at DESC, ledger_rowid DESC
+LIMIT 1
+"""
+
+_SEQ_RANGE_SQL = """
+SELECT seq, type, amount, balance_after FROM transactions
+WHERE account_id = ? AND seq BETWEEN ? AND ?
+ORDER BY seq
+"""
+
+# Past any stored timestamp or rowid
+_END = 2**63 - 1
+
+_CREATED_AT = TRANSACTION_COLUMNS.index("created_at")
+
+
+def get_archive_age() -> timedelta:
+    """Get how old ledger rows must be before they are archived.
+    
+    Read from ``ZENITH_ARCHIVE_AFTER_DAYS`` (default 365).
+    
+    Returns:
+        The minimum age of archived rows.
+        
+    Raises:
+        ValueError: If the configured number of days is negative.
+    """
+    days = int(os.getenv("ZENITH_ARCHIVE_AFTER_DAYS", str(DEFAULT_ARCHIVE_AFTER_DAYS)))
+    if days < 0:
+        raise ValueError("ZENITH_ARCHIVE_AFTER_DAYS cannot be negative")
+    return timedelta(days=days)
+
+
+def get_archive_path(month: str) -> Path:
+    """Get the archive file of a month.
+    
+    Args:
+        month: The month, ``YYYY-MM``.
+        
+    Returns:
+        Path to the uncompressed archive; the compressed one adds ``.gz``.
+    """
+    database_path = get_database_path()
+    return database_path.with_name(
+        f"{database_path.stem}.archive-{month}{database_path.suffix}"
+    )
+
+
+def archive_months() -> list[str]:
+    """List the months that have an archive file on disk.
+    
+    Returns:
+        Sorted ``YYYY-MM`` months, compressed or not.
+    """
+    database_path = get_database_path()
+    if not database_path.parent.exists():
+        return []
+    pattern = re.compile(
+        re.escape(database_path.stem)
+        + r"\.archive-(\d{4}-\d{2})"
+        + re.escape(database_path.suffix)
+        + r"(?:\.gz)?"
+    )
+    
+    months = set()
+    for path in database_path.parent.iterdir():
+        match = pattern.fullmatch(path.name)
+        if match:
+            months.add(match.group(1))
+    return sorted(months)
+
+
+@instrument_operation
+def archive_transactions(
+    older_than: datetime | None = None,
+    compress: bool = False,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> dict:
+    """Move ledger rows older than a cutoff from every shard into archives.
+    
+    Pending rows are folded into the rollups first, so everything before
+    the cutoff is eligible.
+    
+    Args:
+        older_than: Archive rows created before this moment (UTC if naive);
+            defaults to :func:`get_archive_age` ago.
+        compress: Gzip the archives of months that end before the cutoff.
+        batch_size: Maximum rows moved per transaction.
+        
+    Returns:
+        Summary with the rows archived, the months written to and the
+        compressed files.
+    """
+    if older_than is None:
+        older_than = datetime.now(timezone.utc) - get_archive_age()
+    cutoff = to_micros(older_than)
+    
+    archived = 0
+    months = set()
+    for shard in range(get_shard_count()):
+        with get_connection(shard=shard) as connection:
+            fold_pending(connection)
+            cursor = connection.cursor()
+            cursor.row_factory = None
+            
+            after = 0
+            while rows := queries.ARCHIVE_CANDIDATES.execute(
+                cursor,
+                (after, cutoff, batch_size),
+            ).fetchall():
+                by_month = defaultdict(list)
+                for row in rows:
+                    by_month[_month(row[_CREATED_AT])].append(row)
+                for month, month_rows in by_month.items():
+                    _append(month, month_rows)
+                
+                retry_on_busy(_delete_batch, connection, after, rows[-1][-1], cutoff)
+                archived += len(rows)
+                months.update(by_month)
+                after = rows[-1][-1]
+    record_rows("archive_transactions", archived)
+    
+    compressed = []
+    if compress:
+        # Later runs never add rows to a month that ends before this cutoff
+        cutoff_month = _month(cutoff)
+        for month in archive_months():
+            if month < cutoff_month and _compress(month):
+                compressed.append(str(_compressed_path(get_archive_path(month))))
+    
+    return {
+        "archived": archived,
+        "months": sorted(months),
+        "compressed": compressed,
+    }
+
+
+def read_archived_page(
+    account_key: bytes | str,
+    position: tuple[int, int] | None,
+    limit: int,
+    descending: bool,
+    end: int = _END,
+) -> list[tuple]:
+    """Read an account's archived rows past a history position.
+    
+    Args:
+        account_key: Stored form of the account ID.
+        position: ``(created_at, rowid)`` to read past, in stored form; None
+            reads from the newest archived row (descending reads only).
+        limit: Maximum number of rows.
+        descending: Read older rows, newest first; otherwise newer rows,
+            oldest first.
+        end: Exclusive upper bound on ``created_at`` of ascending reads.
+        
+    Returns:
+        Rows in stored form and LEDGER_SELECT order.
+    """
+    months = archive_months()
+    if descending:
+        if position is None:
+            position = (_END, _END)
+        else:
+            months = [month for month in months if month <= _month(position[0])]
+        months.reverse()
+        sql = _PAGE_BEFORE_SQL
+    else:
+        first, last = _month(position[0]), _month(min(end, to_micros(datetime.max)))
+        months = [month for month in months if first <= month <= last]
+        sql = _PAGE_AFTER_SQL
+    
+    rows = []
+    for month in months:
+        params = [account_key, *position]
+        if not descending:
+            params.append(end)
+        params.append(limit - len(rows))
+        rows.extend(_read(month, sql, params))
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def read_archived_balance(account_key: bytes | str, moment: int) -> int | None:
+    """Read an account's balance as of its last archived row at or before a moment.
+    
+    Args:
+        account_key: Stored form of the account ID.
+        moment: Point in time in stored form.
+        
+    Returns:
+        The balance in minor units, or None if no archived row qualifies.
+    """
+    months = [month for month in archive_months() if month <= _month(moment)]
+    for month in reversed(months):
+        rows = _read(month, _BALANCE_AT_SQL, (account_key, moment))
+        if rows:
+            return rows[0][0]
+    return None
+
+
+def read_archived_seqs(account_key: bytes | str, first: int, last: int) -> list[tuple]:
+    """Read a range of an account's archived rows by sequence number.
+    
+    Args:
+        account_key: Stored form of the account ID.
+        first: First sequence number.
+        last: Last sequence number, inclusive.
+        
+    Returns:
+        ``(seq, type, amount, balance_after)`` tuples in sequence order.
+    """
+    rows = []
+    for month in archive_months():
+        rows.extend(_read(month, _SEQ_RANGE_SQL, (account_key, first, last)))
+    return rows
+
+
+def _month(micros: int) -> str:
+    return from_micros(micros)[:7]
+
+
+def _compressed_path(path: Path) -> Path:
+    return path.with_name(path.name + ".gz")
+
+
+def _delete_batch(connection: sqlite3.Connection, after: int, upto: int, cutoff: int) -> None:
+    with immediate_transaction(connection):
+        cursor = connection.cursor()
+        queries.DELETE_ARCHIVED.execute(cursor, (after, upto, cutoff))
+        cursor.execute(CLAMP_ROLLUP_WATERMARK_SQL)
+
+
+def _append(month: str, rows: list[tuple]) -> None:
+    path = get_archive_path(month)
+    compressed = _compressed_path(path)
+    if compressed.exists() and not path.exists():
+        _replace_with_copy(compressed, path, gzip.open, open)
+        compressed.unlink()
+    elif not path.exists():
+        _create(path)
+    
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.executemany(_INSERT_SQL, rows)
+    finally:
+        connection.close()
+
+
+def _create(path: Path) -> None:
+    # Built aside and renamed, so readers never find a file without its table
+    partial = path.with_name(path.name + ".partial")
+    partial.unlink(missing_ok=True)
+    connection = sqlite3.connect(partial)
+    try:
+        connection.execute(ARCHIVE_TABLE_SQL)
+        connection.execute(ARCHIVE_HISTORY_INDEX_SQL)
+        connection.execute(ARCHIVE_SEQ_INDEX_SQL)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(partial, path)
+
+
+def _compress(month: str) -> bool:
+    path = get_archive_path(month)
+    if not path.exists():
+        return False
+    # Readers prefer the plain file, so it goes only once the copy is whole
+    _replace_with_copy(path, _compressed_path(path), open, gzip.open)
+    path.unlink()
+    return True
+
+
+def _replace_with_copy(source: Path, target: Path, open_source, open_target) -> None:
+    partial = target.with_name(target.name + ".partial")
+    with open_source(source, "rb") as reader, open_target(partial, "wb") as writer:
+        shutil.copyfileobj(reader, writer)
+    os.replace(partial, target)
+
+
+def _read(month: str, sql: str, params: tuple | list) -> list[tuple]:
+    connection = _open_for_read(month)
+    if connection is None:
+        return []
+    try:
+        return connection.execute(sql, params).fetchall()
+    finally:
+        connection.close()
+
+
+def _open_for_read(month: str) -> sqlite3.Connection | None:
+    path = get_archive_path(month)
+    try:
+        return sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+    except sqlite3.OperationalError:
+        pass
+    
+    compressed = _compressed_path(path)
+    try:
+        data = _decompressed(compressed, compressed.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    connection = sqlite3.connect(":memory:")
+    connection.deserialize(data)
+    return connection
+
+
+# Reads that reach a compressed month tend to page through it
+@functools.lru_cache(maxsize=2)
+def _decompressed(path: Path, mtime_ns: int) -> bytes:
+    with gzip.open(path, "rb") as reader:
+        return reader.read()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point.
+    
+    Args:
+        argv: Arguments excluding the program name; defaults to sys.argv.
+        
+    Returns:
+        Process exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--older-than-days",
+        type=int,
+        help="archive rows older than this; defaults to ZENITH_ARCHIVE_AFTER_DAYS",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="gzip the archives of months that end before the cutoff",
+    )
+    args = parser.parse_args(argv)
+    
+    older_than = None
+    if args.older_than_days is not None:
+        older_than = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+    
+    summary = archive_transactions(older_than, compress=args.compress)
+    print(
+        f"Archived {summary['archived']} transactions into "
+        f"{len(summary['months'])} monthly files"
+    )
+    for path in summary["compressed"]:
+        print(f"Compressed {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""Online backups of every database file, and restoring them.
+
+A backup copies each shard file with SQLite's online backup API, a few
+pages per step with a pause in between, from a read transaction opened on
+every shard before the first page is copied. In WAL mode readers never
+block writers, so deposits and withdrawals carry on at full speed. The
+held snapshots keep each copy consistent, and a backup is never restarted
+by those writes. Archive files are copied after the shards, so a row that
+the archive tool moves during a backup is in at least one of them. Take a
+backup with the server running:
+    python backup.py create
+    python backup.py create --to /backups/nightly --pages 1024 --pause 0.005
+
+Each backup is a directory holding the copies and a ``manifest.json``.
+Restore one with the server stopped:
+    python backup.py restore data/backups/20260101T000000000000Z
+
+Shards are snapshotted one after another, so a transfer between shards
+that commits while the snapshots are being taken can appear on one side
+only, as after a crash between its two commits.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .archive import archive_months, get_archive_path
+from .connection import close_connections, get_database_path, get_shard_path
+from .rebalance import find_shard_files
+from .schema import get_schema_version
+
+
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_PAUSE = 0.01
+
+MANIFEST_NAME = "manifest.json"
+
+
+def get_backup_dir() -> Path:
+    """Get the directory new backups are created in.
+    
+    Read from ``ZENITH_BACKUP_DIR``; defaults to ``backups`` next to the
+    database file.
+    
+    Returns:
+        The backup directory.
+    """
+    configured = os.getenv("ZENITH_BACKUP_DIR")
+    if configured:
+        return Path(configured)
+    return get_database_path().parent / "backups"
+
+
+def create_backup(
+    destination: Path | None = None,
+    pages_per_step: int = BACKUP_PAGES_PER_STEP,
+    pause: float = BACKUP_STEP_PAUSE,
+) -> dict:
+    """Back up every shard and archive file while the server keeps running.
+    
+    Args:
+        destination: New directory to write the backup to; defaults to a
+            timestamped directory under :func:`get_backup_dir`.
+        pages_per_step: Database pages copied per backup step.
+        pause: Seconds to pause between steps, limiting the I/O taken from
+            the server.
+            
+    Returns:
+        Summary with the backup path, the shard count, the files written,
+        their total size in bytes and the seconds taken.
+        
+    Raises:
+        FileExistsError: If the destination already exists.
+        ValueError: If ``pages_per_step`` is less than 1.
+        RuntimeError: If a copy fails its integrity check.
+    """
+    if pages_per_step < 1:
+        raise ValueError("pages_per_step must be at least 1")
+    
+    started = time.perf_counter()
+    created_at = datetime.now(timezone.utc)
+    if destination is None:
+        destination = get_backup_dir() / created_at.strftime("%Y%m%dT%H%M%S%fZ")
+    destination.mkdir(parents=True)
+    
+    manifest = {
+        "created_at": created_at.isoformat(timespec="microseconds"),
+        "schema_version": None,
+        "shards": {},
+        "archives": {},
+    }
+    
+    # Every shard's snapshot is taken before any is copied, so they are as
+    # close to one point in time as separate files allow
+    snapshots = {shard: _open_snapshot(get_shard_path(shard)) for shard in find_shard_files()}
+    try:
+        for shard, source in snapshots.items():
+            name = get_shard_path(shard).name
+            _copy(source, destination / name, pages_per_step, pause)
+            manifest["shards"][str(shard)] = name
+            manifest["schema_version"] = get_schema_version(source)
+    finally:
+        for source in snapshots.values():
+            source.close()
+    
+    for month in archive_months():
+        path = get_archive_path(month)
+        try:
+            source = _open_snapshot(path)
+        except sqlite3.OperationalError:
+            # Compressed months are never written in place
+            path = path.with_name(path.name + ".gz")
+            shutil.copy2(path, destination / path.name)
+        else:
+            try:
+                _copy(source, destination / path.name, pages_per_step, pause)
+            finally:
+                source.close()
+        manifest["archives"][month] = path.name
+    
+    (destination / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    
+    files = [*manifest["shards"].values(), *manifest["archives"].values()]
+    return {
+        "path": str(destination),
+        "shards": len(manifest["shards"]),
+        "files": len(files),
+        "size_bytes": sum((destination / name).stat().st_size for name in files),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def restore_backup(source: Path) -> dict:
+    """Replace every database file with the contents of a backup.
+    
+    Run with the server stopped. Every copy is checked before any live file
+    is touched; shard and archive files that are not in the backup are
+    removed, so the result is exactly the backed-up state.
+    
+    Args:
+        source: Backup directory written by :func:`create_backup`.
+        
+    Returns:
+        Summary with the shard count to run with and the files restored.
+        
+    Raises:
+        ValueError: If the backup is incomplete or a copy is damaged.
+    """
+    try:
+        manifest = json.loads((source / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        raise ValueError(f"No backup manifest in {source}") from None
+    
+    targets = {
+        source / name: get_shard_path(int(shard))
+        for shard, name in manifest["shards"].items()
+    }
+    for month, name in manifest["archives"].items():
+        target = get_archive_path(month)
+        if name.endswith(".gz"):
+            target = target.with_name(target.name + ".gz")
+        targets[source / name] = target
+    
+    for copy in targets:
+        if not copy.exists():
+            raise ValueError(f"Backup file missing: {copy}")
+        if copy.suffix != ".gz" and not _intact(copy):
+            raise ValueError(f"Backup file is damaged: {copy}")
+    
+    close_connections()
+    current = [get_shard_path(shard) for shard in find_shard_files()]
+    for month in archive_months():
+        path = get_archive_path(month)
+        current += [path, path.with_name(path.name + ".gz")]
+    for path in current:
+        if path not in targets.values():
+            _remove(path)
+    
+    for copy, target in targets.items():
+        partial = target.with_name(target.name + ".partial")
+        shutil.copyfile(copy, partial)
+        # A leftover WAL would be replayed over the restored pages
+        _remove(target)
+        os.replace(partial, target)
+    
+    return {
+        "created_at": manifest["created_at"],
+        "shards": len(manifest["shards"]),
+        "files": len(targets),
+    }
+
+
+def _open_snapshot(path: Path) -> sqlite3.Connection:
+    # Read-write, as a read-only connection cannot open a WAL file whose
+    # shared memory file is gone, but never creating a missing file; the
+    # read transaction stays open until the connection is closed
+    connection = sqlite3.connect(f"{path.as_uri()}?mode=rw", uri=True, isolation_level=None)
+    connection.execute("BEGIN")
+    connection.execute("SELECT COUNT(*) FROM sqlite_schema").fetchone()
+    return connection
+
+
+def _copy(source: sqlite3.Connection, path: Path, pages_per_step: int, pause: float) -> None:
+    def throttle(status: int, remaining: int, total: int) -> None:
+        if remaining and pause:
+            time.sleep(pause)
+    
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target, pages=pages_per_step, progress=throttle)
+    finally:
+        target.close()
+    if not _intact(path):
+        raise RuntimeError(f"Backup copy failed its integrity check: {path}")
+
+
+def _intact(path: Path) -> bool:
+    try:
+        connection = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        try:
+            return connection.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+        finally:
+            connection.close()
+    except sqlite3.DatabaseError:
+        return False
+
+
+def _remove(path: Path) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point.
+    
+    Args:
+        argv: Arguments excluding the program name; defaults to sys.argv.
+        
+    Returns:
+        Process exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    create = commands.add_parser("create", help="back up the running database")
+    create.add_argument("--to", type=Path, help="new directory to write the backup to")
+    create.add_argument(
+        "--pages",
+        type=int,
+        default=BACKUP_PAGES_PER_STEP,
+        help="database pages copied per step",
+    )
+    create.add_argument(
+        "--pause",
+        type=float,
+        default=BACKUP_STEP_PAUSE,
+        help="seconds to pause between steps",
+    )
+    
+    restore = commands.add_parser("restore", help="restore a backup; stop the server first")
+    restore.add_argument("path", type=Path, help="backup directory")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == "create":
+        summary = create_backup(args.to, args.pages, args.pause)
+        print(
+            f"Backed up {summary['files']} files ({summary['size_bytes']} bytes) "
+            f"to {summary['path']} in {summary['seconds']:.2f}s"
+        )
+        return 0
+    
+    try:
+        summary = restore_backup(args.path)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(
+        f"Restored {summary['files']} files from the backup of {summary['created_at']}; "
+        f"run with ZENITH_SHARDS={summary['shards']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""Group-commit writer: many queued mutations, one SQLite commit."""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from .connection import get_connection, get_shard_count, immediate_transaction
+from ..metrics import registry
+
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+
+@dataclass
+class _Request:
+    func: Callable[..., object]
+    args: tuple
+    future: Future = field(default_factory=Future)
+
+
+class GroupCommitWriter:
+    """Single writer thread that applies queued mutations in shared commits.
+    
+    Callers submit a function taking a cursor; the writer collects requests
+    for up to ``max_wait`` seconds or ``max_batch`` items, runs them in one
+    ``BEGIN IMMEDIATE`` transaction and commits once. Each request runs under
+    its own savepoint, so a request that raises is rolled back on its own and
+    its future gets the exception, while the rest of the batch still commits.
+    Futures resolve only after the shared commit has succeeded. A writer
+    serves one shard; each shard gets its own writer and write lock.
+    """
+    
+    def __init__(
+        self,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait: float = DEFAULT_MAX_WAIT_MS / 1000,
+        shard: int = 0,
+    ):
+        if max_batch < 1:
+            raise ValueError("Batch size must be at least 1")
+        
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.shard = shard
+        
+        self._queue: queue.SimpleQueue[_Request | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+        
+        self._batches = 0
+        self._operations = 0
+        self._largest_batch = 0
+    
+    def submit(self, func: Callable[..., object], *args) -> Future:
+        """Queue a mutation for the next group commit.
+        
+        Args:
+            func: Called as ``func(cursor, *args)`` inside the shared transaction.
+            *args: Extra arguments for ``func``.
+            
+        Returns:
+            Future resolved with ``func``'s result once the batch has committed.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Group-commit writer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=f"zenith-group-commit-{self.shard}",
+                    daemon=True,
+                )
+                self._thread.start()
+        
+        request = _Request(func, args)
+        self._queue.put(request)
+        return request.future
+    
+    def close(self) -> None:
+        """Flush queued requests and stop the writer thread."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+    
+    def stats(self) -> dict:
+        """Report batching counters.
+        
+        Returns:
+            Dictionary with batch count, operation count and largest batch.
+        """
+        return {
+            "batches": self._batches,
+            "operations": self._operations,
+            "largest_batch": self._largest_batch,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+    
+    def _run(self) -> None:
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            
+            batch = [request]
+            stopping = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    request = (
+                        self._queue.get(timeout=remaining)
+                        if remaining > 0
+                        else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            
+            self._commit(batch)
+            if stopping:
+                return
+    
+    def _commit(self, batch: list[_Request]) -> None:
+        batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        
+        outcomes: list[tuple[_Request, object, BaseException | None]] = []
+        try:
+            with get_connection(shard=self.shard) as connection:
+                with immediate_transaction(connection):
+                    cursor = connection.cursor()
+                    for request in batch:
+                        outcomes.append(self._apply(cursor, request))
+        except BaseException as error:
+            # The shared commit failed, so nothing in the batch persisted
+            for request in batch:
+                request.future.set_exception(error)
+            if not isinstance(error, Exception):
+                raise
+            return
+        
+        self._batches += 1
+        self._operations += len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+        
+        for request, result, error in outcomes:
+            if error is None:
+                request.future.set_result(result)
+            else:
+                request.future.set_exception(error)
+    
+    @staticmethod
+    def _apply(
+        cursor: sqlite3.Cursor,
+        request: _Request,
+    ) -> tuple[_Request, object, BaseException | None]:
+        cursor.execute("SAVEPOINT group_commit_item")
+        try:
+            result = request.func(cursor, *request.args)
+        except Exception as error:
+            cursor.execute("ROLLBACK TO group_commit_item")
+            cursor.execute("RELEASE group_commit_item")
+            return request, None, error
+        cursor.execute("RELEASE group_commit_item")
+        return request, result, None
+
+
+_writers: dict[int, GroupCommitWriter] = {}
+_writer_lock = threading.Lock()
+
+
+def get_group_commit_writer(shard: int = 0) -> GroupCommitWriter | None:
+    """Get a shard's shared group-commit writer if group commit is enabled.
+    
+    Group commit is opt-in via ``ZENITH_GROUP_COMMIT=1``; the window is tuned
+    with ``ZENITH_GROUP_COMMIT_MAX_BATCH`` and ``ZENITH_GROUP_COMMIT_MAX_WAIT_MS``.
+    
+    Args:
+        shard: Shard whose writes the writer applies.
+        
+    Returns:
+        The shard's GroupCommitWriter, or None when group commit is disabled.
+    """
+    if os.getenv("ZENITH_GROUP_COMMIT", "0") != "1":
+        return None
+    
+    writer = _writers.get(shard)
+    if writer is not None:
+        return writer
+    
+    if not 0 <= shard < get_shard_count():
+        raise ValueError(f"No shard {shard}")
+    
+    with _writer_lock:
+        if shard not in _writers:
+            max_batch = int(
+                os.getenv("ZENITH_GROUP_COMMIT_MAX_BATCH", str(DEFAULT_MAX_BATCH))
+            )
+            max_wait_ms = float(
+                os.getenv("ZENITH_GROUP_COMMIT_MAX_WAIT_MS", str(DEFAULT_MAX_WAIT_MS))
+            )
+            _writers[shard] = GroupCommitWriter(max_batch, max_wait_ms / 1000, shard)
+        return _writers[shard]
+
+
+def close_group_commit_writer() -> None:
+    """Flush and stop every shard's group-commit writer."""
+    with _writer_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    
+    for writer in writers:
+        writer.close()
+
+
+registry.register_stats(
+    "group_commit",
+    "Group-commit writer",
+    lambda: {str(shard): writer.stats() for shard, writer in list(_writers.items())},
+    label="shard",
+)
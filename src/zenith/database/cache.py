@@ -0,0 +1,186 @@
+"""In-process LRU/TTL cache in front of account lookups."""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from ..metrics import registry
+from ..models.types import Account
+
+
+DEFAULT_CAPACITY = 10_000
+DEFAULT_TTL = 30.0
+
+
+class AccountCache:
+    """Thread-safe LRU cache of accounts with a time-to-live per entry.
+    
+    Writers invalidate an account after committing. To stop a reader that
+    loaded a value before the commit from re-inserting it afterwards, every
+    fill carries the epoch observed before the database read and is dropped
+    if the account was invalidated since then.
+    """
+    
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, ttl: float = DEFAULT_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        
+        self._entries: OrderedDict[str, tuple[str, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Epoch of the latest invalidation per account, bounded like the cache;
+        # fills older than _floor_epoch are rejected once tombstones are pruned
+        self._epoch = 0
+        self._tombstones: OrderedDict[str, int] = OrderedDict()
+        self._floor_epoch = 0
+        
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.capacity > 0
+    
+    def epoch(self) -> int:
+        """Current invalidation epoch; pass it to :meth:`put` after a read."""
+        return self._epoch
+    
+    def get(self, account_id: str) -> Account | None:
+        """Look up a cached account.
+        
+        Args:
+            account_id: The unique account identifier.
+            
+        Returns:
+            The cached Account, or None on a miss or expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is None:
+                self._misses += 1
+                return None
+            
+            holder_name, balance, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[account_id]
+                self._misses += 1
+                return None
+            
+            self._entries.move_to_end(account_id)
+            self._hits += 1
+        
+        return Account(account_id=account_id, holder_name=holder_name, balance=balance)
+    
+    def put(self, account: Account, since_epoch: int) -> None:
+        """Cache an account read from the database.
+        
+        Args:
+            account: The account as read from the database.
+            since_epoch: Value of :meth:`epoch` taken before the read started.
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            if since_epoch < self._floor_epoch:
+                return
+            if self._tombstones.get(account.account_id, -1) > since_epoch:
+                return
+            
+            expires_at = time.monotonic() + self.ttl
+            self._entries[account.account_id] = (
+                account.holder_name,
+                account.balance,
+                expires_at,
+            )
+            self._entries.move_to_end(account.account_id)
+            
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def invalidate(self, *account_ids: str) -> None:
+        """Drop accounts whose stored state has changed.
+        
+        Args:
+            *account_ids: Accounts written by a committed transaction.
+        """
+        if not self.enabled:
+            return
+        
+        with self._lock:
+            self._epoch += 1
+            for account_id in account_ids:
+                self._entries.pop(account_id, None)
+                self._tombstones[account_id] = self._epoch
+                self._tombstones.move_to_end(account_id)
+                self._invalidations += 1
+            
+            while len(self._tombstones) > self.capacity:
+                _, epoch = self._tombstones.popitem(last=False)
+                self._floor_epoch = max(self._floor_epoch, epoch)
+    
+    def clear(self) -> None:
+        """Drop every cached account."""
+        with self._lock:
+            self._entries.clear()
+            self._tombstones.clear()
+            self._epoch += 1
+            self._floor_epoch = self._epoch
+    
+    def stats(self) -> dict:
+        """Report cache occupancy and hit/miss counters.
+        
+        Returns:
+            Dictionary of size, capacity, TTL and counters.
+        """
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+        }
+
+
+_cache: AccountCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_account_cache() -> AccountCache:
+    """Get the process-wide account cache, creating it on first use.
+    
+    Sized by ``ZENITH_ACCOUNT_CACHE_SIZE`` (0 disables caching) with entry
+    lifetime ``ZENITH_ACCOUNT_CACHE_TTL`` in seconds.
+    
+    Returns:
+        The shared AccountCache instance.
+    """
+    global _cache
+    
+    cache = _cache
+    if cache is not None:
+        return cache
+    
+    with _cache_lock:
+        if _cache is None:
+            _cache = AccountCache(
+                capacity=int(os.getenv("ZENITH_ACCOUNT_CACHE_SIZE", str(DEFAULT_CAPACITY))),
+                ttl=float(os.getenv("ZENITH_ACCOUNT_CACHE_TTL", str(DEFAULT_TTL))),
+            )
+        return _cache
+
+
+registry.register_stats(
+    "account_cache",
+    "Account cache",
+    lambda: _cache.stats() if _cache is not None else None,
+)
@@ -0,0 +1,100 @@
+"""Conversion between API values and their compact storage form.
+
+Account and transaction IDs are stored as 16-byte UUID blobs and ledger
+timestamps as integer microseconds since the Unix epoch, UTC. Everything
+above the database layer keeps canonical UUID strings and ISO 8601 text.
+"""
+
+import functools
+import re
+from datetime import datetime, timedelta, timezone
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_MICROSECOND = timedelta(microseconds=1)
+
+# The form str(uuid.UUID) produces, which is what the API hands out
+_CANONICAL_UUID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+def pack_id(value: str) -> bytes | str:
+    """Get the stored form of an account or transaction ID.
+    
+    Canonical UUID strings become their 16 bytes. Anything else, such as an
+    ID that predates UUIDs or a malformed lookup, stays text, which SQLite
+    never considers equal to a blob.
+    
+    Args:
+        value: ID as used by the API.
+        
+    Returns:
+        The value to bind in SQL.
+    """
+    if _CANONICAL_UUID.fullmatch(value):
+        return bytes.fromhex(value.replace("-", ""))
+    return value
+
+
+def unpack_id(value: bytes | str) -> str:
+    """Turn a stored ID back into its API form.
+    
+    Args:
+        value: ID as read from the database.
+        
+    Returns:
+        The canonical UUID string, or the stored text unchanged.
+    """
+    if isinstance(value, str):
+        return value
+    digits = value.hex()
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+
+def to_micros(moment: datetime) -> int:
+    """Get the stored form of a point in time.
+    
+    Args:
+        moment: Point in time; naive datetimes are taken as UTC.
+        
+    Returns:
+        Microseconds since the Unix epoch.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - EPOCH) // _MICROSECOND
+
+
+def from_micros(micros: int) -> str:
+    """Turn a stored timestamp back into its API form.
+    
+    Args:
+        micros: Microseconds since the Unix epoch.
+        
+    Returns:
+        Fixed-width ISO 8601 UTC text with microseconds, as
+        ``datetime.isoformat(timespec="microseconds")`` gives it.
+    """
+    seconds, fraction = divmod(micros, 1_000_000)
+    return f"{_second_text(seconds)}.{fraction:06d}+00:00"
+
+
+# Rows read together mostly share their second, so formatting it is cached
+@functools.lru_cache(maxsize=4096)
+def _second_text(seconds: int) -> str:
+    return (EPOCH + timedelta(seconds=seconds)).isoformat()[:19]
+
+
+def parse_micros(timestamp: str) -> int:
+    """Get the stored form of an ISO 8601 timestamp, e.g. from a cursor.
+    
+    Args:
+        timestamp: ISO 8601 text; without an offset it is taken as UTC.
+        
+    Returns:
+        Microseconds since the Unix epoch.
+        
+    Raises:
+        ValueError: If the text is not a valid timestamp.
+    """
+    return to_micros(datetime.fromisoformat(timestamp))
@@ -1,18 +1,81 @@
 """Database connection management."""
 
+import atexit
+import functools
+import os
+import random
 import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from queue import Empty, LifoQueue
+from typing import TypeVar
+
+from .profiles import DurabilityProfile, get_durability_profile
+from ..metrics import (
+    DB_BUSY_RETRIES,
+    DB_COMMIT_LATENCY,
+    DB_COMMITS,
+    DB_LOCK_WAIT,
+    DB_POOL_WAIT,
+    registry,
+)
+
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_POOL_TIMEOUT = 30.0
+HEALTH_CHECK_INTERVAL = 30.0
+
+# Prepared statements each connection keeps, well above the query registry
+DEFAULT_STATEMENT_CACHE_SIZE = 256
+
+# Attempts and first backoff for operations retried on SQLITE_BUSY
+BUSY_RETRY_ATTEMPTS = 5
+BUSY_RETRY_DELAY = 0.01
+
+T = TypeVar("T")
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no pooled connection becomes free before the timeout."""
+
+
+class PoolClosedError(RuntimeError):
+    """Raised when checking out from a pool that has been shut down."""
+
+
+class Connection(sqlite3.Connection):
+    """SQLite connection that can run callbacks once its transaction commits."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commit_hooks: list[Callable[[], None]] = []
 
 
 def get_database_path() -> Path:
     """Get the path to the SQLite database file.
     
+    Each distinct path is resolved, and its directory created, once per
+    process.
+    
     Returns:
-        Path to data/bank.db relative to project root.
+        Path from ``ZENITH_DATABASE_PATH`` if set, otherwise data/bank.db
+        relative to project root.
     """
-    # Get the project root (3 levels up from this file)
-    project_root = Path(__file__).parent.parent.parent.parent
-    database_path = project_root / "data" / "bank.db"
+    return _resolve_database_path(os.getenv("ZENITH_DATABASE_PATH"))
+
+
+@functools.cache
+def _resolve_database_path(override: str | None) -> Path:
+    if override:
+        database_path = Path(override)
+    else:
+        # Get the project root (3 levels up from this file)
+        project_root = Path(__file__).parent.parent.parent.parent
+        database_path = project_root / "data" / "bank.db"
     
     # Ensure data directory exists
     database_path.parent.mkdir(parents=True, exist_ok=True)
@@ -20,13 +83,458 @@ def get_database_path() -> Path:
     return database_path
 
 
-def get_connection() -> sqlite3.Connection:
-    """Get a database connection with row factory enabled.
+def configure_connection(
+    connection: sqlite3.Connection,
+    profile: DurabilityProfile | None = None,
+) -> None:
+    """Apply per-connection settings once, when the connection is opened.
+    
+    Args:
+        connection: Freshly opened SQLite connection.
+        profile: Durability profile to apply; defaults to the configured one.
+    """
+    connection.row_factory = sqlite3.Row
+    (profile or get_durability_profile()).apply(connection)
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections.
+    
+    Connections are opened lazily up to ``size`` and handed back to an idle
+    stack on release, so hot paths reuse a warm connection instead of paying
+    for ``sqlite3.connect()`` on every call. A thread that checks out a
+    connection while already holding one gets the same connection back, which
+    lets operations nest without exhausting the pool. Each connection keeps
+    up to ``statement_cache_size`` prepared statements, so the registered
+    queries are parsed and planned once per connection.
+    """
+    
+    def __init__(
+        self,
+        database_path: Path,
+        size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_POOL_TIMEOUT,
+        profile: DurabilityProfile | None = None,
+        statement_cache_size: int = DEFAULT_STATEMENT_CACHE_SIZE,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        
+        self.database_path = database_path
+        self.size = size
+        self.timeout = timeout
+        self.profile = profile or get_durability_profile()
+        self.statement_cache_size = statement_cache_size
+        
+        self._idle: LifoQueue[tuple[Connection, float]] = LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open_count = 0
+        self._closed = False
+        
+        self._checkouts = 0
+        self._waits = 0
+        self._discarded = 0
+    
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Check out a connection for the duration of the block.
+        
+        Yields:
+            A configured SQLite connection owned by the calling thread.
+        """
+        held = getattr(self._local, "connection", None)
+        if held is not None:
+            yield held
+            return
+        
+        connection = self._acquire()
+        self._local.connection = connection
+        try:
+            yield connection
+        finally:
+            self._local.connection = None
+            self._release(connection)
+    
+    def close(self) -> None:
+        """Close all idle connections and refuse further checkouts.
+        
+        Connections that are checked out when the pool closes are closed as
+        soon as they are released.
+        """
+        with self._lock:
+            self._closed = True
+        
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except Empty:
+                break
+            self._close_connection(connection)
+    
+    def stats(self) -> dict:
+        """Report pool occupancy and counters.
+        
+        Returns:
+            Dictionary of pool size, open/idle/in-use connections and counters.
+        """
+        idle = self._idle.qsize()
+        return {
+            "profile": self.profile.name,
+            "size": self.size,
+            "statement_cache_size": self.statement_cache_size,
+            "open": self._open_count,
+            "idle": idle,
+            "in_use": self._open_count - idle,
+            "checkouts": self._checkouts,
+            "waits": self._waits,
+            "discarded": self._discarded,
+        }
+    
+    def _acquire(self) -> Connection:
+        if self._closed:
+            raise PoolClosedError("Connection pool is closed")
+        
+        if not self._slots.acquire(blocking=False):
+            self._waits += 1
+            started = time.perf_counter()
+            acquired = self._slots.acquire(timeout=self.timeout)
+            DB_POOL_WAIT.labels().observe(time.perf_counter() - started)
+            if not acquired:
+                raise PoolExhaustedError(
+                    f"No database connection available after {self.timeout}s"
+                )
+        
+        try:
+            self._checkouts += 1
+            while True:
+                try:
+                    connection, released_at = self._idle.get_nowait()
+                except Empty:
+                    return self._open_connection()
+                
+                # Only probe connections that sat idle long enough to go stale
+                if time.monotonic() - released_at < HEALTH_CHECK_INTERVAL:
+                    return connection
+                if self._is_healthy(connection):
+                    return connection
+                self._discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+    
+    def _release(self, connection: Connection) -> None:
+        connection.commit_hooks.clear()
+        try:
+            # Never hand an open transaction to the next caller
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            self._discard(connection)
+        else:
+            if self._closed:
+                self._close_connection(connection)
+            else:
+                self._idle.put((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+    
+    def _open_connection(self) -> Connection:
+        connection = sqlite3.connect(
+            self.database_path,
+            check_same_thread=False,
+            factory=Connection,
+            cached_statements=self.statement_cache_size,
+        )
+        try:
+            configure_connection(connection, self.profile)
+        except BaseException:
+            connection.close()
+            raise
+        
+        with self._lock:
+            self._open_count += 1
+        return connection
+    
+    def _close_connection(self, connection: sqlite3.Connection) -> None:
+        with self._lock:
+            self._open_count -= 1
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+    
+    def _discard(self, connection: sqlite3.Connection) -> None:
+        self._discarded += 1
+        self._close_connection(connection)
+    
+    @staticmethod
+    def _is_healthy(connection: sqlite3.Connection) -> bool:
+        try:
+            connection.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+
+_pools: dict[int, ConnectionPool] = {}
+_pool_lock = threading.Lock()
+_shard_count: int | None = None
+
+
+def get_shard_count() -> int:
+    """Get the number of database shards accounts are spread across.
+    
+    Read once from ``ZENITH_SHARDS`` (default 1) and fixed until
+    :func:`close_connections`.
     
     Returns:
-        SQLite connection object with Row factory for dict-like access.
+        The shard count, at least 1.
+    """
+    global _shard_count
+    
+    count = _shard_count
+    if count is not None:
+        return count
+    
+    with _pool_lock:
+        if _shard_count is None:
+            count = int(os.getenv("ZENITH_SHARDS", "1"))
+            if count < 1:
+                raise ValueError("ZENITH_SHARDS must be at least 1")
+            _shard_count = count
+        return _shard_count
+
+
+def shard_for(account_id: str, shard_count: int | None = None) -> int:
+    """Map an account to its shard with a hash that is stable across processes.
+    
+    Args:
+        account_id: The account identifier.
+        shard_count: Number of shards; defaults to the configured count.
+        
+    Returns:
+        Shard index in ``range(shard_count)``.
+    """
+    count = shard_count or get_shard_count()
+    if count == 1:
+        return 0
+    return zlib.crc32(account_id.encode()) % count
+
+
+def get_shard_path(shard: int) -> Path:
+    """Get the database file of a shard.
+    
+    Shard 0 is the file from :func:`get_database_path`, so an unsharded
+    database is shard 0 of a one-shard layout; shard ``i`` lives next to it
+    as ``<name>.shard<i><suffix>``.
+    
+    Args:
+        shard: Shard index.
+        
+    Returns:
+        Path to the shard's SQLite file.
     """
     database_path = get_database_path()
-    connection = sqlite3.connect(database_path)
-    connection.row_factory = sqlite3.Row
-    return connection
+    if shard == 0:
+        return database_path
+    return database_path.with_name(
+        f"{database_path.stem}.shard{shard}{database_path.suffix}"
+    )
+
+
+def get_pool(shard: int = 0) -> ConnectionPool:
+    """Get the process-wide connection pool of a shard, creating it on first use.
+    
+    The pool size comes from the ``ZENITH_DB_POOL_SIZE`` environment variable
+    and the per-connection statement cache size from
+    ``ZENITH_STATEMENT_CACHE_SIZE``. A new pool brings its file up to the
+    current schema before it is handed out, so schema setup runs lazily on a
+    process's first use of each shard and never again after that.
+    
+    Args:
+        shard: Shard index; the default shard 0 is the only one when unsharded.
+        
+    Returns:
+        The shared ConnectionPool instance for that shard.
+    """
+    pool = _pools.get(shard)
+    if pool is not None:
+        return pool
+    
+    if not 0 <= shard < get_shard_count():
+        raise ValueError(f"No shard {shard}")
+    
+    with _pool_lock:
+        if shard not in _pools:
+            size = int(os.getenv("ZENITH_DB_POOL_SIZE", str(DEFAULT_POOL_SIZE)))
+            statement_cache_size = int(
+                os.getenv("ZENITH_STATEMENT_CACHE_SIZE", str(DEFAULT_STATEMENT_CACHE_SIZE))
+            )
+            pool = ConnectionPool(
+                get_shard_path(shard),
+                size=size,
+                statement_cache_size=statement_cache_size,
+            )
+            try:
+                _prepare_schema(pool)
+            except BaseException:
+                pool.close()
+                raise
+            _pools[shard] = pool
+        return _pools[shard]
+
+
+def _prepare_schema(pool: ConnectionPool) -> None:
+    # Deferred: the schema module imports this one
+    from .schema import apply_migrations
+    
+    with pool.connection() as connection:
+        apply_migrations(connection)
+
+
+@contextmanager
+def get_connection(
+    account_id: str | None = None,
+    shard: int | None = None,
+) -> Iterator[Connection]:
+    """Check out a pooled database connection with row factory enabled.
+    
+    Args:
+        account_id: Route to the shard holding this account.
+        shard: Route to this shard explicitly; defaults to shard 0.
+        
+    Yields:
+        SQLite connection object with Row factory for dict-like access.
+    """
+    if shard is None:
+        shard = shard_for(account_id) if account_id is not None else 0
+    with get_pool(shard).connection() as connection:
+        yield connection
+
+
+@contextmanager
+def immediate_transaction(connection: Connection) -> Iterator[None]:
+    """Run the block inside ``BEGIN IMMEDIATE``, committing once on success.
+    
+    Taking the write lock up front means the block never has to upgrade a
+    read lock mid-transaction, which is where lost updates and
+    ``database is locked`` errors come from. Callbacks registered with
+    :func:`after_commit` inside the block run after the commit succeeds and
+    are dropped on rollback, including when the commit itself fails.
+    
+    Args:
+        connection: Connection to run the transaction on.
+    """
+    connection.commit_hooks.clear()
+    with DB_LOCK_WAIT.labels().time():
+        connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+        commit(connection)
+    except BaseException:
+        connection.commit_hooks.clear()
+        connection.rollback()
+        raise
+    
+    hooks = connection.commit_hooks[:]
+    connection.commit_hooks.clear()
+    for hook in hooks:
+        hook()
+
+
+def is_busy_error(error: BaseException) -> bool:
+    """Tell whether an error means SQLite gave up waiting for a lock.
+    
+    Args:
+        error: Exception raised by a database call.
+        
+    Returns:
+        True for SQLITE_BUSY and SQLITE_LOCKED errors.
+    """
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    return code in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED) or (
+        "database is locked" in str(error)
+    )
+
+
+def retry_on_busy(
+    func: Callable[..., T],
+    *args,
+    attempts: int = BUSY_RETRY_ATTEMPTS,
+) -> T:
+    """Call ``func``, retrying with jittered backoff while SQLite is busy.
+    
+    ``busy_timeout`` already makes each lock attempt wait; this bounds what
+    happens after it expires under heavy contention. ``func`` must roll
+    back everything it did before raising, as :func:`immediate_transaction`
+    does, so that a retry starts from scratch.
+    
+    Args:
+        func: The transactional operation to run.
+        *args: Arguments passed to ``func``.
+        attempts: Total number of calls before the busy error is re-raised.
+        
+    Returns:
+        Whatever ``func`` returns.
+    """
+    delay = BUSY_RETRY_DELAY
+    for _ in range(attempts - 1):
+        try:
+            return func(*args)
+        except sqlite3.OperationalError as error:
+            if not is_busy_error(error):
+                raise
+        DB_BUSY_RETRIES.labels(operation=func.__name__).inc()
+        time.sleep(random.uniform(0, delay))
+        delay *= 2
+    return func(*args)
+
+
+def commit(connection: sqlite3.Connection) -> None:
+    """Commit the connection's transaction, recording count and latency.
+    
+    Args:
+        connection: Connection with pending changes.
+    """
+    with DB_COMMIT_LATENCY.labels().time():
+        connection.commit()
+    DB_COMMITS.labels().inc()
+
+
+def after_commit(connection: Connection, callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the current immediate transaction commits.
+    
+    Args:
+        connection: Connection with an open :func:`immediate_transaction`.
+        callback: Called with no arguments after a successful commit.
+    """
+    connection.commit_hooks.append(callback)
+
+
+def close_connections() -> None:
+    """Close every shard's pool; the next checkout opens fresh ones.
+    
+    The shard count is re-read from the environment on next use.
+    """
+    global _shard_count
+    
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        _shard_count = None
+    
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_connections)
+registry.register_stats(
+    "pool",
+    "Connection pool",
+    lambda: {str(shard): pool.stats() for shard, pool in list(_pools.items())},
+    label="shard",
+)
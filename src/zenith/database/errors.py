@@ -0,0 +1,54 @@
+"""Exceptions raised by the database operation layer."""
+
+
+class BankingError(Exception):
+    """Base class for domain errors raised by database operations."""
+
+
+class AccountNotFoundError(BankingError):
+    """Raised when an operation targets an account that does not exist."""
+    
+    def __init__(self, account_id: str):
+        super().__init__(account_id)
+        self.account_id = account_id
+
+
+class InsufficientFundsError(BankingError):
+    """Raised when a withdrawal exceeds the available balance."""
+    
+    def __init__(self, account_id: str, balance: int, requested: int):
+        super().__init__(account_id, balance, requested)
+        self.account_id = account_id
+        self.balance = balance
+        self.requested = requested
+
+
+class BalanceLimitError(BankingError):
+    """Raised when a credit would take a balance past MAX_MINOR_UNITS."""
+    
+    def __init__(self, account_id: str, balance: int, requested: int):
+        super().__init__(account_id, balance, requested)
+        self.account_id = account_id
+        self.balance = balance
+        self.requested = requested
+
+
+class IdempotencyConflictError(BankingError):
+    """Raised when an idempotency key is reused for a different request."""
+    
+    def __init__(self, key: str):
+        super().__init__(key)
+        self.key = key
+
+
+class PartialCommitError(Exception):
+    """Raised when a cross-shard write committed on one shard but not the other.
+    
+    The write is half applied and must not be retried blindly; the shard
+    that committed has to be reconciled by hand.
+    """
+    
+    def __init__(self, committed_shard: int, failed_shard: int):
+        super().__init__(committed_shard, failed_shard)
+        self.committed_shard = committed_shard
+        self.failed_shard = failed_shard
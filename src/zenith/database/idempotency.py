@@ -0,0 +1,221 @@
+"""Idempotency keys for mutating operations.
+
+An operation called with an idempotency key stores the key, a fingerprint
+of its arguments and its encoded result in the ``idempotency_keys`` table
+of the shard it writes, in the same transaction as the write itself. A
+retry with the same key finds that row under the write lock and returns
+the stored result without touching any balance. Recently used keys are
+also kept in an in-process hot set, so most retries never reach SQLite.
+
+Keys are looked up on the shard of the account being written, so reusing
+a key for a different account is only detected while the key is hot or
+when both accounts share a shard.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from . import queries
+from .codec import pack_id
+from .connection import after_commit
+from .errors import IdempotencyConflictError
+from ..metrics import registry
+
+
+DEFAULT_CAPACITY = 10_000
+DEFAULT_TTL = 24 * 60 * 60
+
+# Expired rows deleted alongside each stored key
+EVICTION_BATCH = 64
+
+
+class IdempotencyCache:
+    """Thread-safe LRU hot set of recently completed idempotent requests.
+    
+    Entries are only added after the transaction that stored the key has
+    committed, so a hit always describes a durable result.
+    """
+    
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, ttl: float = DEFAULT_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        
+        self._entries: OrderedDict[str, tuple[str, str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+    
+    def get(self, key: str, request: str) -> str | None:
+        """Look up the stored result of a completed request.
+        
+        Args:
+            key: The client's idempotency key.
+            request: Fingerprint of the retried request.
+            
+        Returns:
+            The encoded result, or None on a miss or expired entry.
+            
+        Raises:
+            IdempotencyConflictError: If the key was used for another request.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[2]:
+                self._entries.pop(key, None)
+                self._misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self._hits += 1
+        
+        stored_request, result, _ = entry
+        if stored_request != request:
+            raise IdempotencyConflictError(key)
+        return result
+    
+    def put(self, key: str, request: str, result: str) -> None:
+        """Remember a committed request.
+        
+        Args:
+            key: The client's idempotency key.
+            request: Fingerprint of the request.
+            result: The encoded result returned to the client.
+        """
+        if self.capacity <= 0:
+            return
+        
+        with self._lock:
+            self._entries[key] = (request, result, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def clear(self) -> None:
+        """Drop every remembered request."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> dict:
+        """Report hot-set occupancy and hit/miss counters.
+        
+        Returns:
+            Dictionary of size, capacity, TTL and counters.
+        """
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+        }
+
+
+def fingerprint(operation: str, *args) -> str:
+    """Describe a request so that a reused key can be told apart from a retry.
+    
+    Args:
+        operation: Name of the mutating operation.
+        *args: Its JSON-serializable arguments, excluding the key.
+        
+    Returns:
+        Canonical text of the operation and its arguments.
+    """
+    return json.dumps([operation, *args], separators=(",", ":"))
+
+
+def lookup(cursor: sqlite3.Cursor, key: str, request: str) -> str | None:
+    """Find the stored result for a key; call with the write lock held.
+    
+    Args:
+        cursor: Cursor inside the transaction that would perform the write.
+        key: The client's idempotency key.
+        request: Fingerprint of the current request.
+        
+    Returns:
+        The encoded result, or None if the key is unknown or expired.
+        
+    Raises:
+        IdempotencyConflictError: If the key was used for another request.
+    """
+    row = queries.SELECT_IDEMPOTENCY_KEY.execute(cursor, (key,)).fetchone()
+    if row is None or row["created_at"] < time.time() - get_idempotency_cache().ttl:
+        return None
+    if row["request"] != request:
+        raise IdempotencyConflictError(key)
+    
+    get_idempotency_cache().put(key, request, row["result"])
+    return row["result"]
+
+
+def remember(
+    cursor: sqlite3.Cursor,
+    key: str,
+    request: str,
+    account_id: str,
+    result: str,
+) -> None:
+    """Store a key with the result of the write made in this transaction.
+    
+    A bounded batch of expired keys is deleted at the same time, so the
+    table stays near the number of keys used within one TTL.
+    
+    Args:
+        cursor: Cursor inside the transaction performing the write.
+        key: The client's idempotency key.
+        request: Fingerprint of the request.
+        account_id: The account written; keys move with it on rebalance.
+        result: The encoded result to return to retries.
+    """
+    cache = get_idempotency_cache()
+    now = int(time.time())
+    
+    queries.EVICT_IDEMPOTENCY_KEYS.execute(cursor, (now - cache.ttl, EVICTION_BATCH))
+    queries.INSERT_IDEMPOTENCY_KEY.execute(
+        cursor,
+        (key, request, result, pack_id(account_id), now),
+    )
+    after_commit(cursor.connection, lambda: cache.put(key, request, result))
+
+
+_cache: IdempotencyCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_idempotency_cache() -> IdempotencyCache:
+    """Get the process-wide idempotency hot set, creating it on first use.
+    
+    Sized by ``ZENITH_IDEMPOTENCY_CACHE_SIZE`` (0 disables it); keys expire
+    after ``ZENITH_IDEMPOTENCY_TTL`` seconds, in the hot set and on disk.
+    
+    Returns:
+        The shared IdempotencyCache instance.
+    """
+    global _cache
+    
+    cache = _cache
+    if cache is not None:
+        return cache
+    
+    with _cache_lock:
+        if _cache is None:
+            _cache = IdempotencyCache(
+                capacity=int(os.getenv("ZENITH_IDEMPOTENCY_CACHE_SIZE", str(DEFAULT_CAPACITY))),
+                ttl=float(os.getenv("ZENITH_IDEMPOTENCY_TTL", str(DEFAULT_TTL))),
+            )
+        return _cache
+
+
+registry.register_stats(
+    "idempotency_cache",
+    "Idempotency hot set",
+    lambda: _cache.stats() if _cache is not None else None,
+)
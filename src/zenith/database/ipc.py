@@ -0,0 +1,181 @@
+"""Forwarding of database writes from worker processes to the writer process.
+
+In multi-worker mode every server process reads SQLite directly, but the
+mutating calls of :mod:`zenith.database.aio` are sent over a
+``multiprocessing`` queue to a single writer process, which applies them
+with group commit. Only one process ever takes SQLite's write lock.
+"""
+
+import asyncio
+import itertools
+import pickle
+import threading
+import uuid
+from concurrent.futures import Future
+from multiprocessing.queues import Queue
+
+
+# aio coroutines the writer process will run on a worker's behalf
+WRITE_OPERATIONS = frozenset({
+    "create_account",
+    "update_account_balance",
+    "record_transaction",
+    "apply_transaction",
+    "apply_transactions",
+    "transfer",
+    "refresh_rollups",
+})
+
+# Sent on every response queue when the writer process has been restarted
+WRITER_RESTARTED = "writer-restarted"
+
+DEFAULT_WRITE_TIMEOUT = 30.0
+
+
+class WriterUnavailableError(RuntimeError):
+    """Raised when a forwarded write gets no answer from the writer process."""
+
+
+class WriterClient:
+    """Worker-side handle that forwards writes to the writer process.
+    
+    Requests go out on the shared request queue tagged with this worker's
+    index; a listener thread matches replies on the worker's own response
+    queue to the waiting futures. Request IDs are unique to the client, so
+    a late reply to a previous worker on the same queue matches nothing.
+    """
+    
+    def __init__(
+        self,
+        worker: int,
+        requests: Queue,
+        responses: Queue,
+        timeout: float = DEFAULT_WRITE_TIMEOUT,
+    ):
+        self.worker = worker
+        self.timeout = timeout
+        
+        self._requests = requests
+        self._responses = responses
+        self._prefix = uuid.uuid4().hex
+        self._ids = itertools.count()
+        self._pending: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._listener = threading.Thread(
+            target=self._listen,
+            name=f"zenith-writer-client-{worker}",
+            daemon=True,
+        )
+        self._listener.start()
+    
+    async def call(self, operation: str, *args):
+        """Run a write operation in the writer process and await its result.
+        
+        Args:
+            operation: Name of the :mod:`zenith.database.aio` coroutine.
+            *args: Its arguments; they must be picklable.
+            
+        Returns:
+            The coroutine's result; its exception is re-raised here.
+            
+        Raises:
+            WriterUnavailableError: If the writer restarted or did not answer
+                within the timeout; the write may or may not have been applied.
+        """
+        future = self.submit(operation, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except TimeoutError:
+            raise WriterUnavailableError(
+                f"No reply from the writer process after {self.timeout}s"
+            ) from None
+    
+    def submit(self, operation: str, *args) -> Future:
+        """Queue a write operation for the writer process.
+        
+        Args:
+            operation: Name of the :mod:`zenith.database.aio` coroutine.
+            *args: Its arguments; they must be picklable.
+            
+        Returns:
+            Future resolved with the operation's result.
+        """
+        if operation not in WRITE_OPERATIONS:
+            raise ValueError(f"Not a forwarded write operation: {operation}")
+        
+        future: Future = Future()
+        with self._lock:
+            request_id = f"{self._prefix}-{next(self._ids)}"
+            self._pending[request_id] = future
+        self._requests.put((self.worker, request_id, operation, args))
+        return future
+    
+    def _listen(self) -> None:
+        while True:
+            message = self._responses.get()
+            if message is None:
+                return
+            
+            if message == WRITER_RESTARTED:
+                # Requests in flight died with the old writer
+                with self._lock:
+                    pending = list(self._pending.values())
+                    self._pending.clear()
+                for future in pending:
+                    future.set_exception(
+                        WriterUnavailableError("Writer process restarted")
+                    )
+                continue
+            
+            request_id, result, error = message
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None or future.cancelled():
+                # The caller already gave up waiting
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+def encode_reply(request_id: str, result: object, error: BaseException | None) -> tuple:
+    """Build a reply message that is guaranteed to pickle.
+    
+    ``multiprocessing`` pickles queued objects on a background thread, where
+    a failure would be lost and leave the caller waiting forever, so an
+    unpicklable exception is replaced with a RuntimeError carrying its text.
+    
+    Args:
+        request_id: The request being answered.
+        result: The operation's result, or None on error.
+        error: The exception the operation raised, if any.
+        
+    Returns:
+        The ``(request_id, result, error)`` message.
+    """
+    if error is not None:
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = RuntimeError(f"{type(error).__name__}: {error}")
+    return request_id, result, error
+
+
+_client: WriterClient | None = None
+
+
+def get_writer_client() -> WriterClient | None:
+    """Get this process's writer client, or None outside multi-worker mode."""
+    return _client
+
+
+def set_writer_client(client: WriterClient | None) -> None:
+    """Install the writer client used to forward this process's writes.
+    
+    Args:
+        client: The client, or None to write locally again.
+    """
+    global _client
+    
+    _client = client
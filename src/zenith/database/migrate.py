@@ -0,0 +1,131 @@
+"""Bring every shard file up to the current schema ahead of time.
+
+Files are otherwise migrated on a process's first use, under their write
+lock. Migrations that rewrite whole tables, such as the move to compact IDs
+and timestamps, take a while on a large ledger, so run this with the server
+stopped before starting a new version:
+    python -m src.zenith.database.migrate            # migrate every shard
+    python -m src.zenith.database.migrate --check    # exit 1 if any is behind
+    python -m src.zenith.database.migrate --vacuum   # also shrink the files
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from .connection import (
+    Connection,
+    close_connections,
+    configure_connection,
+    get_shard_count,
+    get_shard_path,
+)
+from .rebalance import find_shard_files
+from .schema import SCHEMA_VERSION, apply_migrations, get_schema_version
+
+
+def pending_shards() -> list[int]:
+    """List the shard files on disk that are behind SCHEMA_VERSION.
+    
+    Returns:
+        Sorted shard indexes.
+    """
+    pending = []
+    for shard in find_shard_files():
+        connection = _open(get_shard_path(shard))
+        try:
+            if get_schema_version(connection) < SCHEMA_VERSION:
+                pending.append(shard)
+        finally:
+            connection.close()
+    return pending
+
+
+def migrate(vacuum: bool = False) -> list[dict]:
+    """Apply pending migrations to every shard file.
+    
+    Covers the files of the configured shard count, creating any that are
+    missing, and any other shard files found on disk.
+    
+    Args:
+        vacuum: Rebuild each file afterwards, so pages freed by table
+            rewrites are returned to the filesystem.
+            
+    Returns:
+        One entry per shard with its path, the schema versions before and
+        after, the seconds taken and the file size in bytes.
+    """
+    close_connections()
+    results = []
+    for shard in sorted(set(find_shard_files()) | set(range(get_shard_count()))):
+        path = get_shard_path(shard)
+        connection = _open(path)
+        try:
+            started = time.perf_counter()
+            before = get_schema_version(connection)
+            apply_migrations(connection)
+            if vacuum:
+                connection.execute("VACUUM")
+            results.append({
+                "shard": shard,
+                "path": str(path),
+                "from_version": before,
+                "to_version": get_schema_version(connection),
+                "seconds": time.perf_counter() - started,
+                "size_bytes": path.stat().st_size,
+            })
+        finally:
+            connection.close()
+    return results
+
+
+def _open(path: Path) -> Connection:
+    # A pool would migrate the file as soon as it is opened
+    connection = sqlite3.connect(path, factory=Connection)
+    configure_connection(connection)
+    return connection
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point.
+    
+    Args:
+        argv: Arguments excluding the program name; defaults to sys.argv.
+        
+    Returns:
+        Process exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only report shard files that are behind; exit 1 if there are any",
+    )
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="rebuild each file after migrating to reclaim free pages",
+    )
+    args = parser.parse_args(argv)
+    
+    if args.check:
+        pending = pending_shards()
+        for shard in pending:
+            print(f"Shard {shard} ({get_shard_path(shard)}) needs migrating")
+        if not pending:
+            print(f"All shard files are at schema version {SCHEMA_VERSION}")
+        return 1 if pending else 0
+    
+    for result in migrate(vacuum=args.vacuum):
+        print(
+            f"Shard {result['shard']}: version {result['from_version']} -> "
+            f"{result['to_version']} in {result['seconds']:.2f}s, "
+            f"{result['size_bytes']} bytes"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
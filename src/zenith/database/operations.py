@@ -1,44 +1,151 @@
-"""Database CRUD operations for accounts and transactions."""
+"""Database CRUD operations for accounts and transactions.
 
+All balances and amounts are integers in minor units (e.g. cents); see
+``zenith.models.money`` for conversion at the API boundary. IDs and
+timestamps are bound and read in their compact stored form; see ``codec``.
+History reads continue into the archive files when they run past an
+account's oldest row in the hot file; see ``archive``.
+"""
+
+import base64
+import json
+import sqlite3
 import uuid
+from collections.abc import Callable, Iterator
+from dataclasses import asdict
 from datetime import datetime, timezone
 
-from .connection import get_connection
-from ..models.types import Account, Transaction
+from . import archive, idempotency, queries
+from .cache import get_account_cache
+from .codec import from_micros, pack_id, parse_micros, to_micros, unpack_id
+from .connection import (
+    after_commit,
+    commit,
+    get_connection,
+    get_shard_count,
+    immediate_transaction,
+    retry_on_busy,
+    shard_for,
+)
+from .errors import (
+    AccountNotFoundError,
+    BalanceLimitError,
+    BankingError,
+    IdempotencyConflictError,
+    InsufficientFundsError,
+    PartialCommitError,
+)
+from .schema import SNAPSHOT_INTERVAL
+from .queries import TRANSACTION_COLUMNS
+from ..metrics import instrument_operation, record_rows
+from ..models.money import MAX_MINOR_UNITS
+from ..models.types import (
+    Account,
+    AccountPage,
+    AccountVerification,
+    Transaction,
+    TransactionPage,
+    TransactionType,
+)
+
+
+STATEMENT_CHUNK_SIZE = 500
+MAX_ACCOUNT_PAGE_SIZE = 500
+MAX_TRANSACTION_PAGE_SIZE = 1000
+
+# Sorts after any character that can follow a prefix, closing its range
+_PREFIX_END = "\U0010ffff"
+
+# SQLite's NOCASE collation folds ASCII letters only
+_NOCASE_FOLD = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "abcdefghijklmnopqrstuvwxyz",
+)
 
+_CREATED_AT = TRANSACTION_COLUMNS.index("created_at")
+_SEQ = TRANSACTION_COLUMNS.index("seq")
 
-def create_account(holder_name: str) -> Account:
+# Accounts created with an idempotency key get an ID derived from the key
+IDEMPOTENT_ACCOUNT_NAMESPACE = uuid.UUID("5b0c3f8e-6c1d-4f7e-9a53-2d1e8b7c4a90")
+
+
+@instrument_operation
+def create_account(holder_name: str, idempotency_key: str | None = None) -> Account:
     """Create a new bank account.
     
     Args:
         holder_name: Name of the account holder.
-        
+        idempotency_key: Optional client key; a retry with the same key
+            returns the account created by the first call.
+            
     Returns:
         The newly created Account object.
+        
+    Raises:
+        IdempotencyConflictError: If the key was used for another request.
     """
-    account_id = str(uuid.uuid4())
-    initial_balance = 0.0
+    initial_balance = 0
+    if idempotency_key is None:
+        account_id = str(uuid.uuid4())
+    else:
+        # Derived from the key, so a retry lands on the shard that stored it
+        account_id = str(uuid.uuid5(IDEMPOTENT_ACCOUNT_NAMESPACE, idempotency_key))
+        request = idempotency.fingerprint("create_account", holder_name)
+        stored = idempotency.get_idempotency_cache().get(idempotency_key, request)
+        if stored is not None:
+            return Account(**json.loads(stored))
     
-    connection = get_connection()
-    cursor = connection.cursor()
-    
-    cursor.execute(
-        "INSERT INTO accounts (account_id, holder_name, balance) VALUES (?, ?, ?)",
-        (account_id, holder_name, initial_balance),
-    )
-    
-    connection.commit()
-    connection.close()
-    
-    return Account(
+    account = Account(
         account_id=account_id,
         holder_name=holder_name,
         balance=initial_balance,
     )
+    cache = get_account_cache()
+    epoch = cache.epoch()
+    
+    with get_connection(account_id) as connection:
+        with immediate_transaction(connection):
+            cursor = connection.cursor()
+            
+            if idempotency_key is not None:
+                stored = idempotency.lookup(cursor, idempotency_key, request)
+                if stored is not None:
+                    return Account(**json.loads(stored))
+            
+            queries.INSERT_ACCOUNT.execute(
+                cursor,
+                (pack_id(account_id), holder_name, initial_balance),
+            )
+            if not cursor.rowcount:
+                # Created with this key before it expired: the same request
+                # only if it was for the same holder
+                row = queries.SELECT_ACCOUNT.execute(cursor, (pack_id(account_id),)).fetchone()
+                if row["holder_name"] != holder_name:
+                    raise IdempotencyConflictError(idempotency_key)
+                return Account(
+                    account_id=account_id,
+                    holder_name=row["holder_name"],
+                    balance=row["balance"],
+                )
+            
+            if idempotency_key is not None:
+                idempotency.remember(
+                    cursor,
+                    idempotency_key,
+                    request,
+                    account_id,
+                    json.dumps(asdict(account)),
+                )
+    record_rows("create_account", 1)
+    
+    cache.put(account, epoch)
+    
+    return account
 
 
+@instrument_operation
 def get_account_by_id(account_id: str) -> Account | None:
-    """Fetch an account by its ID.
+    """Fetch an account by its ID, serving hot accounts from the cache.
     
     Args:
         account_id: The unique account identifier.
@@ -46,84 +153,833 @@ def get_account_by_id(account_id: str) -> Account | None:
     Returns:
         Account object if found, None otherwise.
     """
-    connection = get_connection()
-    cursor = connection.cursor()
-    
-    cursor.execute(
-        "SELECT account_id, holder_name, balance FROM accounts WHERE account_id = ?",
-        (account_id,),
-    )
+    cache = get_account_cache()
+    if cache.enabled:
+        account = cache.get(account_id)
+        if account is not None:
+            return account
+    epoch = cache.epoch()
     
-    row = cursor.fetchone()
-    connection.close()
+    with get_connection(account_id) as connection:
+        row = queries.SELECT_ACCOUNT.execute(
+            connection.cursor(),
+            (pack_id(account_id),),
+        ).fetchone()
     
     if row is None:
         return None
+    record_rows("get_account_by_id", 1)
     
-    return Account(
-        account_id=row["account_id"],
+    account = Account(
+        account_id=account_id,
         holder_name=row["holder_name"],
         balance=row["balance"],
     )
+    cache.put(account, epoch)
+    
+    return account
 
 
-def update_account_balance(account_id: str, new_balance: float) -> None:
-    """Update the balance of an account.
+@instrument_operation
+def get_accounts_by_ids(account_ids: list[str]) -> dict[str, Account]:
+    """Fetch many accounts with one ``WHERE account_id IN (...)`` lookup per shard.
     
     Args:
-        account_id: The unique account identifier.
-        new_balance: The new balance to set.
+        account_ids: Account identifiers to look up; duplicates are allowed.
+        
+    Returns:
+        Mapping of account ID to Account for the accounts that exist.
+    """
+    rows: list[sqlite3.Row] = []
+    for shard, positions in partition_by_shard(account_ids).items():
+        with get_connection(shard=shard) as connection:
+            rows.extend(
+                _select_accounts(
+                    connection.cursor(),
+                    [account_ids[position] for position in positions],
+                )
+            )
+    record_rows("get_accounts_by_ids", len(rows))
+    
+    accounts = {}
+    for row in rows:
+        account_id = unpack_id(row["account_id"])
+        accounts[account_id] = Account(
+            account_id=account_id,
+            holder_name=row["holder_name"],
+            balance=row["balance"],
+        )
+    return accounts
+
+
+@instrument_operation
+def find_accounts(
+    holder_name_prefix: str,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> AccountPage:
+    """Find accounts whose holder name starts with a prefix, ignoring case.
+    
+    Each shard seeks the ``(holder_name COLLATE NOCASE, account_id)`` index
+    to the cursor position and reads at most one page, so a page costs the
+    same however many accounts exist. Case folding follows SQLite's NOCASE
+    collation, which only folds ASCII letters.
+    
+    Args:
+        holder_name_prefix: Start of the holder name; empty matches everyone.
+        limit: Maximum number of accounts to return.
+        cursor: ``next_cursor`` from the previous page of the same search.
+        
+    Returns:
+        AccountPage ordered by holder name, then account ID.
+        
+    Raises:
+        ValueError: If the limit is out of range or the cursor is malformed.
     """
-    connection = get_connection()
-    cursor = connection.cursor()
+    _check_page_limit(limit)
+    if cursor is None:
+        # Account IDs are never empty, so this starts at the prefix itself
+        holder_name, account_id = holder_name_prefix, ""
+    else:
+        holder_name, account_id = _decode_account_cursor(cursor, 2)
     
-    cursor.execute(
-        "UPDATE accounts SET balance = ? WHERE account_id = ?",
-        (new_balance, account_id),
+    rows = _read_account_pages(
+        queries.FIND_ACCOUNTS,
+        (holder_name, pack_id(account_id), holder_name_prefix + _PREFIX_END, limit + 1),
+        key=lambda row: (
+            row["holder_name"].translate(_NOCASE_FOLD),
+            _id_order(row["account_id"]),
+        ),
     )
+    record_rows("find_accounts", len(rows))
+    
+    return _account_page(
+        rows,
+        limit,
+        lambda row: _encode_account_cursor(row["holder_name"], unpack_id(row["account_id"])),
+    )
+
+
+@instrument_operation
+def list_accounts(cursor: str | None = None, limit: int = 20) -> AccountPage:
+    """List all accounts in account ID order with keyset pagination.
+    
+    Args:
+        cursor: ``next_cursor`` from the previous page.
+        limit: Maximum number of accounts to return.
+        
+    Returns:
+        AccountPage ordered by account ID.
+        
+    Raises:
+        ValueError: If the limit is out of range or the cursor is malformed.
+    """
+    _check_page_limit(limit)
+    account_id = ""
+    if cursor is not None:
+        (account_id,) = _decode_account_cursor(cursor, 1)
+    
+    rows = _read_account_pages(
+        queries.LIST_ACCOUNTS,
+        (pack_id(account_id), limit + 1),
+        key=lambda row: _id_order(row["account_id"]),
+    )
+    record_rows("list_accounts", len(rows))
+    
+    return _account_page(
+        rows,
+        limit,
+        lambda row: _encode_account_cursor(unpack_id(row["account_id"])),
+    )
+
+
+def _check_page_limit(limit: int, maximum: int = MAX_ACCOUNT_PAGE_SIZE) -> None:
+    if not 1 <= limit <= maximum:
+        raise ValueError(f"Limit must be between 1 and {maximum}")
+
+
+def _read_account_pages(
+    statement: queries.Statement,
+    params: tuple,
+    key: Callable[[sqlite3.Row], object],
+) -> list[sqlite3.Row]:
+    """Read one page from every shard and merge them in ``key`` order."""
+    rows: list[sqlite3.Row] = []
+    for shard in range(get_shard_count()):
+        with get_connection(shard=shard) as connection:
+            rows.extend(statement.execute(connection.cursor(), params).fetchall())
+    
+    if get_shard_count() > 1:
+        rows.sort(key=key)
+    return rows
+
+
+def _id_order(stored_id: bytes | str) -> tuple[bool, bytes | str]:
+    # SQLite sorts text before blobs, and blobs bytewise like their UUID text
+    return isinstance(stored_id, bytes), stored_id
+
+
+def _account_page(
+    rows: list[sqlite3.Row],
+    limit: int,
+    encode_cursor: Callable[[sqlite3.Row], str],
+) -> AccountPage:
+    page = AccountPage(
+        accounts=[
+            Account(
+                account_id=unpack_id(row["account_id"]),
+                holder_name=row["holder_name"],
+                balance=row["balance"],
+            )
+            for row in rows[:limit]
+        ]
+    )
+    if len(rows) > limit:
+        page.next_cursor = encode_cursor(rows[limit - 1])
+    return page
+
+
+def _encode_account_cursor(*position: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def _decode_account_cursor(cursor: str, size: int) -> list[str]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if (
+        not isinstance(position, list)
+        or len(position) != size
+        or not all(isinstance(part, str) for part in position)
+    ):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+@instrument_operation
+def update_account_balance(account_id: str, new_balance: int) -> None:
+    """Update the balance of an account.
+    
+    Args:
+        account_id: The unique account identifier.
+        new_balance: The new balance to set, in minor units.
+    """
+    with get_connection(account_id) as connection:
+        cursor = queries.SET_BALANCE.execute(
+            connection.cursor(),
+            (new_balance, pack_id(account_id)),
+        )
+        commit(connection)
+    record_rows("update_account_balance", cursor.rowcount)
     
-    connection.commit()
-    connection.close()
+    get_account_cache().invalidate(account_id)
 
 
+@instrument_operation
 def record_transaction(
     account_id: str,
     transaction_type: str,
-    amount: float,
+    amount: int,
 ) -> Transaction:
     """Record a new transaction.
     
     Args:
         account_id: The account involved in the transaction.
         transaction_type: Either 'DEPOSIT' or 'WITHDRAWAL'.
-        amount: The transaction amount (always positive).
+        amount: The transaction amount in minor units (always positive).
         
     Returns:
         The newly created Transaction object.
+        
+    Raises:
+        AccountNotFoundError: If the account does not exist.
+    """
+    with get_connection(account_id) as connection:
+        with immediate_transaction(connection):
+            cursor = connection.cursor()
+            
+            # The balance is set separately, so the row records it as it stands
+            row = queries.NEXT_SEQ.execute(cursor, (pack_id(account_id),)).fetchone()
+            if row is None:
+                raise AccountNotFoundError(account_id)
+            
+            transaction = _insert_transaction(
+                cursor,
+                account_id,
+                transaction_type,
+                amount,
+                row["ledger_seq"],
+                row["balance"],
+            )
+    record_rows("record_transaction", 1)
+    
+    return transaction
+
+
+@instrument_operation
+def apply_transaction(
+    account_id: str,
+    transaction_type: str,
+    amount: int,
+    idempotency_key: str | None = None,
+) -> tuple[Transaction, int]:
+    """Apply a deposit or withdrawal and record it in one atomic step.
+    
+    The balance check, the balance update and the ledger insert run inside
+    a single ``BEGIN IMMEDIATE`` transaction with one commit, so concurrent
+    callers cannot interleave between the read and the write.
+    
+    Args:
+        account_id: The account to apply the transaction to.
+        transaction_type: Either 'DEPOSIT' or 'WITHDRAWAL'.
+        amount: The transaction amount in minor units (always positive).
+        idempotency_key: Optional client key; a retry with the same key
+            returns the original result without applying it again.
+            
+    Returns:
+        Tuple of the recorded Transaction and the account's new balance.
+        
+    Raises:
+        AccountNotFoundError: If the account does not exist.
+        InsufficientFundsError: If a withdrawal exceeds the balance.
+        BalanceLimitError: If a deposit would take the balance past
+            MAX_MINOR_UNITS.
+        IdempotencyConflictError: If the key was used for another request.
+    """
+    if idempotency_key is not None:
+        replayed = replay_cached(
+            idempotency_key,
+            "apply_transaction",
+            account_id,
+            transaction_type,
+            amount,
+        )
+        if replayed is not None:
+            return replayed[0], replayed[0].balance_after
+    
+    with get_connection(account_id) as connection:
+        with immediate_transaction(connection):
+            return apply_transaction_locked(
+                connection.cursor(),
+                account_id,
+                transaction_type,
+                amount,
+                idempotency_key,
+            )
+
+
+@instrument_operation
+def apply_transactions(
+    transaction_type: str,
+    items: list[tuple[str, int]],
+) -> list[tuple[Transaction, int] | BankingError]:
+    """Apply a batch of deposits or withdrawals in one transaction.
+    
+    Balances for every account in the batch are read with ``IN`` lookups,
+    the operations are checked in order against the running balances, and
+    the resulting balance updates and ledger rows are written with
+    ``executemany`` before a single commit. A failing item does not stop
+    the rest of the batch. When accounts are sharded, each shard's part of
+    the batch commits on its own.
+    
+    Args:
+        transaction_type: Either 'DEPOSIT' or 'WITHDRAWAL' for every item.
+        items: (account_id, amount) pairs, applied in order.
+        
+    Returns:
+        One entry per operation: the recorded Transaction and new balance,
+        or the BankingError explaining why that item was rejected.
+    """
+    results: list[tuple[Transaction, int] | BankingError] = [None] * len(items)
+    for shard, positions in partition_by_shard([item[0] for item in items]).items():
+        with get_connection(shard=shard) as connection:
+            with immediate_transaction(connection):
+                outcomes = apply_transactions_locked(
+                    connection.cursor(),
+                    transaction_type,
+                    [items[position] for position in positions],
+                )
+        for position, outcome in zip(positions, outcomes):
+            results[position] = outcome
+    
+    return results
+
+
+@instrument_operation
+def transfer(
+    from_account_id: str,
+    to_account_id: str,
+    amount: int,
+    idempotency_key: str | None = None,
+) -> tuple[Transaction, Transaction]:
+    """Move funds between two accounts in one atomic step.
+    
+    The debit, the credit and both ledger rows are written under the write
+    lock and committed together. Accounts on different shards are locked in
+    shard order, so concurrent transfers in opposite directions cannot
+    deadlock; both locks are held before either shard commits. Attempts that
+    find the database busy are rolled back and retried with backoff, unless
+    one shard has already committed.
+    
+    Args:
+        from_account_id: The account to debit.
+        to_account_id: The account to credit.
+        amount: The amount in minor units (always positive).
+        idempotency_key: Optional client key; a retry with the same key
+            returns the original result without moving funds again.
+            
+    Returns:
+        Tuple of the TRANSFER_OUT and TRANSFER_IN transactions; their
+        ``balance_after`` are the two accounts' new balances.
+        
+    Raises:
+        ValueError: If both accounts are the same.
+        AccountNotFoundError: If either account does not exist.
+        InsufficientFundsError: If the amount exceeds the source balance.
+        BalanceLimitError: If the credit would take the target balance past
+            MAX_MINOR_UNITS.
+        IdempotencyConflictError: If the key was used for another request.
+        PartialCommitError: If the accounts are on different shards and only
+            one shard committed.
+    """
+    if from_account_id == to_account_id:
+        raise ValueError("Cannot transfer to the same account")
+    if idempotency_key is not None:
+        replayed = replay_cached(
+            idempotency_key,
+            "transfer",
+            from_account_id,
+            to_account_id,
+            amount,
+        )
+        if replayed is not None:
+            return replayed[0], replayed[1]
+    
+    return retry_on_busy(
+        _run_transfer,
+        from_account_id,
+        to_account_id,
+        amount,
+        idempotency_key,
+    )
+
+
+def _run_transfer(
+    from_account_id: str,
+    to_account_id: str,
+    amount: int,
+    idempotency_key: str | None,
+) -> tuple[Transaction, Transaction]:
+    from_shard = shard_for(from_account_id)
+    to_shard = shard_for(to_account_id)
+    
+    if from_shard == to_shard:
+        with get_connection(shard=from_shard) as connection:
+            with immediate_transaction(connection):
+                return transfer_locked(
+                    connection.cursor(),
+                    from_account_id,
+                    to_account_id,
+                    amount,
+                    idempotency_key,
+                )
+    
+    # Lock in shard order; the inner (second) shard commits first
+    first, second = sorted((from_shard, to_shard))
+    second_committed = False
+    with (
+        get_connection(shard=first) as first_connection,
+        get_connection(shard=second) as second_connection,
+    ):
+        try:
+            with immediate_transaction(first_connection):
+                with immediate_transaction(second_connection):
+                    cursors = {
+                        first: first_connection.cursor(),
+                        second: second_connection.cursor(),
+                    }
+                    result = transfer_locked(
+                        cursors[from_shard],
+                        from_account_id,
+                        to_account_id,
+                        amount,
+                        idempotency_key,
+                        cursors[to_shard],
+                    )
+                second_committed = True
+        except sqlite3.Error as error:
+            # Replaying would apply the committed side twice
+            if second_committed:
+                raise PartialCommitError(second, first) from error
+            raise
+    return result
+
+
+def transfer_locked(
+    cursor: sqlite3.Cursor,
+    from_account_id: str,
+    to_account_id: str,
+    amount: int,
+    idempotency_key: str | None = None,
+    to_cursor: sqlite3.Cursor | None = None,
+) -> tuple[Transaction, Transaction]:
+    """Move funds inside write transactions the caller already holds.
+    
+    The body of :func:`transfer`, for callers such as the group-commit
+    writer that own the transaction and commit it themselves.
+    
+    Args:
+        cursor: Cursor in the source shard's write transaction.
+        from_account_id: The account to debit.
+        to_account_id: The account to credit.
+        amount: The amount to move in minor units.
+        idempotency_key: Optional client key, stored with the debit on the
+            source shard.
+        to_cursor: Cursor in the target shard's write transaction when the
+            accounts are on different shards.
+            
+    Returns:
+        Tuple of the TRANSFER_OUT and TRANSFER_IN transactions.
+        
+    Raises:
+        AccountNotFoundError: If either account does not exist.
+        InsufficientFundsError: If the amount exceeds the source balance.
+        BalanceLimitError: If the credit would take the target balance past
+            MAX_MINOR_UNITS.
+        IdempotencyConflictError: If the key was used for another request.
+    """
+    if idempotency_key is not None:
+        request = idempotency.fingerprint("transfer", from_account_id, to_account_id, amount)
+        stored = idempotency.lookup(cursor, idempotency_key, request)
+        if stored is not None:
+            debit, credit = _decode_transactions(stored)
+            return debit, credit
+    
+    debit, _ = apply_transaction_locked(
+        cursor,
+        from_account_id,
+        TransactionType.TRANSFER_OUT,
+        amount,
+    )
+    credit, _ = apply_transaction_locked(
+        to_cursor or cursor,
+        to_account_id,
+        TransactionType.TRANSFER_IN,
+        amount,
+    )
+    
+    if idempotency_key is not None:
+        idempotency.remember(
+            cursor,
+            idempotency_key,
+            request,
+            from_account_id,
+            _encode_transactions(debit, credit),
+        )
+    return debit, credit
+
+
+def apply_transaction_locked(
+    cursor: sqlite3.Cursor,
+    account_id: str,
+    transaction_type: str,
+    amount: int,
+    idempotency_key: str | None = None,
+) -> tuple[Transaction, int]:
+    """Apply a deposit, withdrawal or transfer leg inside a held write transaction.
+    
+    The body of :func:`apply_transaction`, for callers that own the
+    transaction and commit it themselves.
+    
+    Args:
+        cursor: Cursor in the account's shard's write transaction.
+        account_id: The account to apply the transaction to.
+        transaction_type: A credit or debit TransactionType.
+        amount: The transaction amount in minor units (always positive).
+        idempotency_key: Optional client key, stored with the result.
+        
+    Returns:
+        Tuple of the recorded Transaction and the account's new balance.
+        
+    Raises:
+        ValueError: If the transaction type is unknown.
+        AccountNotFoundError: If the account does not exist.
+        InsufficientFundsError: If a debit exceeds the balance.
+        BalanceLimitError: If a credit would take the balance past
+            MAX_MINOR_UNITS.
+        IdempotencyConflictError: If the key was used for another request.
+    """
+    if idempotency_key is not None:
+        request = idempotency.fingerprint(
+            "apply_transaction",
+            account_id,
+            transaction_type,
+            amount,
+        )
+        stored = idempotency.lookup(cursor, idempotency_key, request)
+        if stored is not None:
+            (transaction,) = _decode_transactions(stored)
+            return transaction, transaction.balance_after
+    
+    account_key = pack_id(account_id)
+    if transaction_type in TransactionType.CREDITS:
+        # Bounded so the sum never overflows SQLite's 64-bit integers
+        queries.CREDIT_ACCOUNT.execute(cursor, (amount, account_key, MAX_MINOR_UNITS - amount))
+    elif transaction_type in (TransactionType.WITHDRAWAL, TransactionType.TRANSFER_OUT):
+        queries.DEBIT_ACCOUNT.execute(cursor, (amount, account_key, amount))
+    else:
+        raise ValueError(f"Unknown transaction type: {transaction_type}")
+    
+    row = cursor.fetchone()
+    if row is None:
+        # Nothing matched: the account is missing, funds are short or the
+        # balance would pass its limit
+        account_row = queries.SELECT_ACCOUNT_STATE.execute(cursor, (account_key,)).fetchone()
+        if account_row is None:
+            raise AccountNotFoundError(account_id)
+        if transaction_type in TransactionType.CREDITS:
+            raise BalanceLimitError(account_id, account_row["balance"], amount)
+        raise InsufficientFundsError(account_id, account_row["balance"], amount)
+    
+    new_balance = row["balance"]
+    transaction = _insert_transaction(
+        cursor,
+        account_id,
+        transaction_type,
+        amount,
+        row["ledger_seq"],
+        new_balance,
+    )
+    _invalidate_after_commit(cursor, account_id)
+    record_rows("apply_transaction", 2)
+    
+    if idempotency_key is not None:
+        idempotency.remember(
+            cursor,
+            idempotency_key,
+            request,
+            account_id,
+            _encode_transactions(transaction),
+        )
+    
+    return transaction, new_balance
+
+
+def apply_transactions_locked(
+    cursor: sqlite3.Cursor,
+    transaction_type: str,
+    items: list[tuple[str, int]],
+) -> list[tuple[Transaction, int] | BankingError]:
+    """Apply a batch of deposits or withdrawals inside a held write transaction.
+    
+    The body of :func:`apply_transactions` for one shard; every account in
+    ``items`` must live on the cursor's shard.
+    
+    Args:
+        cursor: Cursor in the shard's write transaction.
+        transaction_type: Either 'DEPOSIT' or 'WITHDRAWAL' for every item.
+        items: (account_id, amount) pairs, applied in order.
+        
+    Returns:
+        One entry per operation: the recorded Transaction and new balance,
+        or the BankingError explaining why that item was rejected.
+        
+    Raises:
+        ValueError: If the transaction type is not DEPOSIT or WITHDRAWAL.
     """
-    transaction_id = str(uuid.uuid4())
-    created_at = datetime.now(timezone.utc).isoformat()
+    if transaction_type not in (TransactionType.DEPOSIT, TransactionType.WITHDRAWAL):
+        raise ValueError(f"Unknown transaction type: {transaction_type}")
+    
+    rows = _select_accounts(cursor, [account_id for account_id, _ in items])
+    balances = {unpack_id(row["account_id"]): row["balance"] for row in rows}
+    sequences = {unpack_id(row["account_id"]): row["ledger_seq"] for row in rows}
+    
+    results: list[tuple[Transaction, int] | BankingError] = []
+    ledger_rows: list[tuple] = []
+    touched: set[str] = set()
+    for account_id, amount in items:
+        balance = balances.get(account_id)
+        if balance is None:
+            results.append(AccountNotFoundError(account_id))
+            continue
+        
+        if transaction_type == TransactionType.WITHDRAWAL:
+            if balance < amount:
+                results.append(InsufficientFundsError(account_id, balance, amount))
+                continue
+            balance = balance - amount
+        else:
+            if balance > MAX_MINOR_UNITS - amount:
+                results.append(BalanceLimitError(account_id, balance, amount))
+                continue
+            balance = balance + amount
+        
+        balances[account_id] = balance
+        sequences[account_id] += 1
+        touched.add(account_id)
+        transaction, ledger_row = _new_transaction(
+            account_id,
+            transaction_type,
+            amount,
+            sequences[account_id],
+            balance,
+        )
+        ledger_rows.append(ledger_row)
+        results.append((transaction, balance))
     
-    connection = get_connection()
-    cursor = connection.cursor()
+    _invalidate_after_commit(cursor, *touched)
+    record_rows("apply_transactions", len(touched) + len(ledger_rows))
     
-    cursor.execute(
-        """INSERT INTO transactions 
-           (transaction_id, account_id, type, amount, created_at) 
-           VALUES (?, ?, ?, ?, ?)""",
-        (transaction_id, account_id, transaction_type, amount, created_at),
+    # The write lock is held, so absolute balances are safe to set
+    queries.SET_BALANCE_AND_SEQ.executemany(
+        cursor,
+        [
+            (balances[account_id], sequences[account_id], pack_id(account_id))
+            for account_id in touched
+        ],
+    )
+    queries.INSERT_TRANSACTION.executemany(cursor, ledger_rows)
+    queries.INSERT_SNAPSHOT.executemany(
+        cursor,
+        [
+            _snapshot_row(ledger_row)
+            for ledger_row in ledger_rows
+            if ledger_row[_SEQ] % SNAPSHOT_INTERVAL == 0
+        ],
     )
     
-    connection.commit()
-    connection.close()
+    return results
+
+
+def partition_by_shard(account_ids: list[str]) -> dict[int, list[int]]:
+    """Group list positions by the shard of the account at each position.
+    
+    Args:
+        account_ids: Account identifiers; duplicates are allowed.
+        
+    Returns:
+        Mapping of shard index to the positions of its accounts, in order.
+    """
+    if get_shard_count() == 1:
+        return {0: list(range(len(account_ids)))} if account_ids else {}
+    
+    partitions: dict[int, list[int]] = {}
+    for position, account_id in enumerate(account_ids):
+        partitions.setdefault(shard_for(account_id), []).append(position)
+    return partitions
+
+
+def replay_cached(idempotency_key: str, operation: str, *args) -> list[Transaction] | None:
+    """Look up the result of a completed request in the in-memory key cache.
     
-    return Transaction(
-        transaction_id=transaction_id,
+    Lets a retry return without queueing for the write lock. Keys that
+    are only in the database are checked later, inside the transaction.
+    
+    Args:
+        idempotency_key: The client key.
+        operation: Name of the operation the key was used with.
+        *args: The operation's arguments, as fingerprinted when stored.
+        
+    Returns:
+        The stored transactions, or None if the key is not cached.
+        
+    Raises:
+        IdempotencyConflictError: If the key was used for another request.
+    """
+    request = idempotency.fingerprint(operation, *args)
+    stored = idempotency.get_idempotency_cache().get(idempotency_key, request)
+    return _decode_transactions(stored) if stored is not None else None
+
+
+def _encode_transactions(*transactions: Transaction) -> str:
+    return json.dumps([asdict(transaction) for transaction in transactions])
+
+
+def _decode_transactions(result: str) -> list[Transaction]:
+    return [Transaction(**fields) for fields in json.loads(result)]
+
+
+def _invalidate_after_commit(cursor: sqlite3.Cursor, *account_ids: str) -> None:
+    if account_ids:
+        cache = get_account_cache()
+        after_commit(cursor.connection, lambda: cache.invalidate(*account_ids))
+
+
+def _select_accounts(
+    cursor: sqlite3.Cursor,
+    account_ids: list[str],
+) -> list[sqlite3.Row]:
+    # One blob keeps the SQL text, and so the prepared statement, the same
+    # for any number of IDs; IDs that are not UUIDs are looked up one by one
+    keys = [pack_id(account_id) for account_id in dict.fromkeys(account_ids)]
+    ids = b"".join(key for key in keys if isinstance(key, bytes))
+    rows = queries.SELECT_ACCOUNTS.execute(cursor, (ids,)).fetchall()
+    for key in keys:
+        if isinstance(key, str):
+            row = queries.SELECT_TEXT_ID_ACCOUNT.execute(cursor, (key,)).fetchone()
+            if row is not None:
+                rows.append(row)
+    return rows
+
+
+def _new_transaction(
+    account_id: str,
+    transaction_type: str,
+    amount: int,
+    seq: int,
+    balance_after: int,
+) -> tuple[Transaction, tuple]:
+    """Build a ledger entry and the INSERT_TRANSACTION row that stores it."""
+    transaction_id = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    transaction = Transaction(
+        transaction_id=str(transaction_id),
         account_id=account_id,
         type=transaction_type,
         amount=amount,
-        created_at=created_at,
+        created_at=now.isoformat(timespec="microseconds"),
+        seq=seq,
+        balance_after=balance_after,
     )
+    ledger_row = (
+        transaction_id.bytes,
+        pack_id(account_id),
+        transaction_type,
+        amount,
+        to_micros(now),
+        seq,
+        balance_after,
+    )
+    return transaction, ledger_row
+
+
+def _snapshot_row(ledger_row: tuple) -> tuple:
+    # INSERT_SNAPSHOT row checkpointing the balance at a stored ledger row
+    return ledger_row[1], ledger_row[_SEQ], ledger_row[-1], ledger_row[_CREATED_AT]
+
+
+def _insert_transaction(
+    cursor: sqlite3.Cursor,
+    account_id: str,
+    transaction_type: str,
+    amount: int,
+    seq: int,
+    balance_after: int,
+) -> Transaction:
+    transaction, ledger_row = _new_transaction(
+        account_id,
+        transaction_type,
+        amount,
+        seq,
+        balance_after,
+    )
+    
+    queries.INSERT_TRANSACTION.execute(cursor, ledger_row)
+    if seq % SNAPSHOT_INTERVAL == 0:
+        queries.INSERT_SNAPSHOT.execute(cursor, _snapshot_row(ledger_row))
+    
+    return transaction
 
 
 def get_transactions_by_account(
@@ -139,28 +995,402 @@ def get_transactions_by_account(
     Returns:
         List of Transaction objects, ordered by most recent first.
     """
-    connection = get_connection()
-    cursor = connection.cursor()
+    return get_transactions_page(account_id, limit).transactions
+
+
+@instrument_operation
+def get_transactions_page(
+    account_id: str,
+    limit: int = 10,
+    before: str | None = None,
+    after: str | None = None,
+    row_factory: Callable[[tuple], object] | None = None,
+) -> TransactionPage:
+    """Get one page of an account's history using keyset pagination.
+    
+    Pages are located by seeking the ``(account_id, created_at)`` index to
+    the cursor position, so reading deep into the history costs the same as
+    reading the first page.
+    
+    Args:
+        account_id: The account to get transactions for.
+        limit: Maximum number of transactions to return.
+        before: Cursor from a previous page; return transactions older than it.
+        after: Cursor from a previous page; return transactions newer than it.
+        row_factory: Builds each page entry from a plain row tuple in
+            TRANSACTION_COLUMNS order, e.g. straight into a response dict;
+            defaults to Transaction objects.
+            
+    Returns:
+        TransactionPage ordered by most recent first.
+        
+    Raises:
+        ValueError: If the limit is out of range, both cursors are given or
+            a cursor is malformed.
+    """
+    _check_page_limit(limit, MAX_TRANSACTION_PAGE_SIZE)
+    if before is not None and after is not None:
+        raise ValueError("Specify at most one of before or after")
     
-    cursor.execute(
-        """SELECT transaction_id, account_id, type, amount, created_at 
-           FROM transactions 
-           WHERE account_id = ? 
-           ORDER BY created_at DESC 
-           LIMIT ?""",
-        (account_id, limit),
+    # Fetch one extra row to learn whether another page exists
+    account_key = pack_id(account_id)
+    position = None
+    if after is not None:
+        position = _decode_cursor(after)
+        statement = queries.LEDGER_PAGE_AFTER
+        params = (account_key, *position, limit + 1)
+    elif before is not None:
+        position = _decode_cursor(before)
+        statement = queries.LEDGER_PAGE_BEFORE
+        params = (account_key, *position, limit + 1)
+    else:
+        statement = queries.LEDGER_PAGE
+        params = (account_key, limit + 1)
+    descending = after is None
+    
+    with get_connection(account_id) as connection:
+        cursor = connection.cursor()
+        # Plain tuples are cheaper to build than sqlite3.Row
+        cursor.row_factory = None
+        rows = statement.execute(cursor, params).fetchall()
+        reaches_archive = _reaches_archive(
+            cursor,
+            account_key,
+            rows,
+            limit + 1,
+            position,
+            descending,
+        )
+    if reaches_archive:
+        archived = archive.read_archived_page(account_key, position, limit + 1, descending)
+        rows = _merge_archived(rows, archived, limit + 1, descending)
+    record_rows("get_transactions_page", len(rows))
+    
+    has_more = len(rows) > limit
+    rows = [_decode_ledger_row(row, account_id) for row in rows[:limit]]
+    if after is not None:
+        rows.reverse()
+    
+    make_entry = row_factory or _row_to_transaction
+    page = TransactionPage(transactions=list(map(make_entry, rows)))
+    
+    if rows:
+        # A cursor on the opposite side means rows exist beyond it
+        older = has_more if after is None else True
+        newer = has_more if after is not None else before is not None
+        if older:
+            page.next_cursor = _encode_cursor(rows[-1])
+        if newer:
+            page.prev_cursor = _encode_cursor(rows[0])
+    
+    return page
+
+
+@instrument_operation
+def get_balance_at(account_id: str, moment: datetime) -> int:
+    """Get an account's balance as it stood at a point in time.
+    
+    Every ledger row carries the balance after it was applied, so this is a
+    single index seek to the last row at or before ``moment``, continued
+    into the archives only if it finds none in the hot file.
+    
+    Args:
+        account_id: The account to look up.
+        moment: Point in time; naive datetimes are taken as UTC.
+        
+    Returns:
+        The balance in minor units (0 before the account's first transaction).
+        
+    Raises:
+        AccountNotFoundError: If the account does not exist.
+    """
+    account_key = pack_id(account_id)
+    micros = to_micros(moment)
+    with get_connection(account_id) as connection:
+        cursor = connection.cursor()
+        
+        row = queries.BALANCE_AT.execute(cursor, (account_key, micros)).fetchone()
+        if row is not None:
+            record_rows("get_balance_at", 1)
+            return row["balance_after"]
+        
+        if queries.ACCOUNT_EXISTS.execute(cursor, (account_key,)).fetchone() is None:
+            raise AccountNotFoundError(account_id)
+        reaches_archive = _reaches_archive(cursor, account_key, [], 1, None, True)
+    
+    if reaches_archive:
+        balance = archive.read_archived_balance(account_key, micros)
+        if balance is not None:
+            record_rows("get_balance_at", 1)
+            return balance
+    return 0
+
+
+@instrument_operation
+def verify_account(account_id: str, full: bool = False) -> AccountVerification:
+    """Check an account's stored balance against its ledger.
+    
+    Replays the ledger forward from the account's latest snapshot, checking
+    that sequence numbers have no gaps, that each row's ``balance_after``
+    follows from the previous one, and that the result matches the stored
+    balance. All reads of the hot file happen in one read transaction, so
+    concurrent writes cannot produce false mismatches; rows archived from
+    the start of the ledger are read from the archive files.
+    
+    Args:
+        account_id: The account to verify.
+        full: Replay from the first transaction instead of the latest snapshot.
+        
+    Returns:
+        AccountVerification listing any problems found.
+        
+    Raises:
+        AccountNotFoundError: If the account does not exist.
+    """
+    with get_connection(account_id) as connection:
+        cursor = connection.cursor()
+        cursor.execute("BEGIN")
+        try:
+            return _verify_account(cursor, account_id, full)
+        finally:
+            connection.rollback()
+
+
+def _verify_account(
+    cursor: sqlite3.Cursor,
+    account_id: str,
+    full: bool,
+) -> AccountVerification:
+    account_key = pack_id(account_id)
+    account_row = queries.SELECT_ACCOUNT_STATE.execute(cursor, (account_key,)).fetchone()
+    if account_row is None:
+        raise AccountNotFoundError(account_id)
+    
+    problems: list[str] = []
+    from_seq, balance = 0, 0
+    if not full:
+        snapshot = queries.LATEST_SNAPSHOT.execute(cursor, (account_key,)).fetchone()
+        if snapshot is not None:
+            from_seq, balance = snapshot["seq"], snapshot["balance"]
+            anchor = queries.BALANCE_AT_SEQ.execute(
+                cursor,
+                (account_key, from_seq),
+            ).fetchone()
+            if anchor is None:
+                archived = archive.read_archived_seqs(account_key, from_seq, from_seq)
+                anchor = archived[0] if archived else None
+            if anchor is None or anchor[-1] != balance:
+                problems.append(f"snapshot at seq {from_seq} does not match the ledger")
+    
+    rows = queries.LEDGER_SINCE_SEQ.execute(cursor, (account_key, from_seq)).fetchall()
+    # Rows missing from the start of the hot file may have been archived;
+    # archiving commits them there before deleting them, so none are lost
+    # to a concurrent run
+    next_hot_seq = rows[0]["seq"] if rows else account_row["ledger_seq"] + 1
+    if next_hot_seq > from_seq + 1:
+        rows[:0] = archive.read_archived_seqs(account_key, from_seq + 1, next_hot_seq - 1)
+    
+    expected_seq = from_seq
+    checked = 0
+    for seq, transaction_type, amount, balance_after in rows:
+        checked += 1
+        expected_seq += 1
+        if seq != expected_seq:
+            problems.append(f"expected seq {expected_seq}, found {seq}")
+            expected_seq = seq
+        
+        if transaction_type in TransactionType.CREDITS:
+            balance += amount
+        else:
+            balance -= amount
+        if balance_after != balance:
+            problems.append(
+                f"seq {seq}: balance_after {balance_after}, "
+                f"ledger gives {balance}"
+            )
+            # Carry on from the recorded value so one bad row is reported once
+            balance = balance_after
+    record_rows("verify_account", checked)
+    
+    if expected_seq != account_row["ledger_seq"]:
+        problems.append(
+            f"account is at seq {account_row['ledger_seq']}, ledger ends at {expected_seq}"
+        )
+    if balance != account_row["balance"]:
+        problems.append(
+            f"stored balance {account_row['balance']} differs from ledger balance {balance}"
+        )
+    
+    return AccountVerification(
+        account_id=account_id,
+        balance=account_row["balance"],
+        ledger_balance=balance,
+        from_seq=from_seq,
+        transactions_checked=checked,
+        problems=problems,
     )
+
+
+@instrument_operation
+def get_statement_chunk(
+    account_id: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: str | None = None,
+    limit: int = STATEMENT_CHUNK_SIZE,
+) -> tuple[list[Transaction], str | None]:
+    """Read one chunk of an account statement in chronological order.
+    
+    Args:
+        account_id: The account to export.
+        start: Include transactions at or after this moment (UTC if naive).
+        end: Include transactions strictly before this moment (UTC if naive).
+        after: Cursor returned with the previous chunk.
+        limit: Maximum number of transactions in the chunk.
+        
+    Returns:
+        The transactions, oldest first, and a cursor for the next chunk
+        (None when the range is exhausted).
+        
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    # Open ends become the widest bounds; rowids start at 1, so a position
+    # of (start, 0) includes every row created at ``start``
+    if after is not None:
+        position = _decode_cursor(after)
+    else:
+        position = (to_micros(start or datetime.min), 0)
+    account_key = pack_id(account_id)
+    end_micros = to_micros(end or datetime.max)
     
-    rows = cursor.fetchall()
-    connection.close()
+    with get_connection(account_id) as connection:
+        cursor = connection.cursor()
+        cursor.row_factory = None
+        rows = queries.LEDGER_RANGE.execute(
+            cursor,
+            (account_key, *position, end_micros, limit + 1),
+        ).fetchall()
+        reaches_archive = _reaches_archive(cursor, account_key, rows, limit + 1, position, False)
+    if reaches_archive:
+        archived = archive.read_archived_page(account_key, position, limit + 1, False, end_micros)
+        rows = _merge_archived(rows, archived, limit + 1, False)
+    record_rows("get_statement_chunk", len(rows))
     
-    return [
-        Transaction(
-            transaction_id=row["transaction_id"],
-            account_id=row["account_id"],
-            type=row["type"],
-            amount=row["amount"],
-            created_at=row["created_at"],
+    rows = [_decode_ledger_row(row, account_id) for row in rows]
+    next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return list(map(_row_to_transaction, rows[:limit])), next_cursor
+
+
+def iter_statement(
+    account_id: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    chunk_size: int = STATEMENT_CHUNK_SIZE,
+) -> Iterator[Transaction]:
+    """Stream an account's transactions for a date range, oldest first.
+    
+    Rows are read in keyset-paginated chunks on short connection checkouts,
+    so memory stays bounded by ``chunk_size`` however long the history is,
+    and an abandoned iterator never pins a pooled connection or a read
+    transaction.
+    
+    Args:
+        account_id: The account to export.
+        start: Include transactions at or after this moment (UTC if naive).
+        end: Include transactions strictly before this moment (UTC if naive).
+        chunk_size: Rows fetched per query.
+        
+    Yields:
+        Transaction objects in chronological order.
+    """
+    after = None
+    while True:
+        transactions, after = get_statement_chunk(
+            account_id,
+            start,
+            end,
+            after,
+            chunk_size,
         )
-        for row in rows
-    ]
+        yield from transactions
+        if after is None:
+            return
+
+
+def _reaches_archive(
+    cursor: sqlite3.Cursor,
+    account_key: bytes | str,
+    rows: list[tuple],
+    wanted: int,
+    position: tuple[int, int] | None,
+    descending: bool,
+) -> bool:
+    # An account's archived rows are its oldest, up to its first hot row, so
+    # a read needs them only if it runs past that row; most reads can tell
+    # from the rows they already have
+    if descending and len(rows) >= wanted:
+        return False
+    if rows and (rows[-1] if descending else rows[0])[_SEQ] == 1:
+        return False
+    
+    first = queries.LEDGER_FIRST.execute(cursor, (account_key,)).fetchone()
+    if first is None:
+        state = queries.SELECT_ACCOUNT_STATE.execute(cursor, (account_key,)).fetchone()
+        return state is not None and state[1] > 0
+    first_seq, created_at, rowid = first
+    return first_seq > 1 and (descending or position < (created_at, rowid))
+
+
+def _merge_archived(
+    rows: list[tuple],
+    archived: list[tuple],
+    limit: int,
+    descending: bool,
+) -> list[tuple]:
+    # Archived rows all precede the hot ones; a row archived while this read
+    # ran can show up on both sides, with the same position
+    merged = {row[0]: row for row in (*archived, *rows)}
+    ordered = sorted(
+        merged.values(),
+        key=lambda row: (row[_CREATED_AT], row[-1]),
+        reverse=descending,
+    )
+    return ordered[:limit]
+
+
+def _decode_ledger_row(row: tuple, account_id: str) -> tuple:
+    # Stored IDs and timestamps to API form; every row is the caller's account
+    transaction_id, _, transaction_type, amount, created_at, seq, balance_after, rowid = row
+    return (
+        unpack_id(transaction_id),
+        account_id,
+        transaction_type,
+        amount,
+        from_micros(created_at),
+        seq,
+        balance_after,
+        rowid,
+    )
+
+
+def _row_to_transaction(row: tuple) -> Transaction:
+    # Positional: the model's fields are in TRANSACTION_COLUMNS order
+    return Transaction(row[0], row[1], row[2], row[3], row[4], row[5], row[6])
+
+
+def _encode_cursor(row: tuple) -> str:
+    payload = json.dumps([row[_CREATED_AT], row[-1]]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[int, int]:
+    # Cursors carry the timestamp as text, as they did before it was stored
+    # as an integer, so cursors issued before the migration still work
+    try:
+        created_at, rowid = json.loads(base64.urlsafe_b64decode(cursor))
+        if not isinstance(created_at, str) or not isinstance(rowid, int):
+            raise ValueError
+        return parse_micros(created_at), rowid
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
@@ -0,0 +1,94 @@
+"""Durability profiles: SQLite pragma sets applied to every connection."""
+
+import os
+import sqlite3
+from dataclasses import dataclass
+
+
+DEFAULT_PROFILE = "balanced"
+
+
+@dataclass(frozen=True)
+class DurabilityProfile:
+    """A named set of journaling, sync and caching pragmas."""
+    
+    name: str
+    journal_mode: str
+    synchronous: str
+    cache_size: int
+    mmap_size: int
+    temp_store: str
+    busy_timeout: int
+    
+    def apply(self, connection: sqlite3.Connection) -> None:
+        """Apply the profile's pragmas to a connection.
+        
+        Args:
+            connection: Connection outside of any transaction.
+        """
+        # busy_timeout goes first so switching journal mode can wait on locks
+        connection.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
+        connection.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        connection.execute(f"PRAGMA cache_size = {self.cache_size}")
+        connection.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        connection.execute(f"PRAGMA temp_store = {self.temp_store}")
+
+
+PROFILES = {
+    # Every commit is fsynced; WAL still lets readers run beside the writer
+    "strict": DurabilityProfile(
+        name="strict",
+        journal_mode="WAL",
+        synchronous="FULL",
+        cache_size=-16_000,
+        mmap_size=0,
+        temp_store="DEFAULT",
+        busy_timeout=5000,
+    ),
+    # WAL is only fsynced at checkpoints; a power loss may drop the last commits
+    "balanced": DurabilityProfile(
+        name="balanced",
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size=-64_000,
+        mmap_size=256 * 1024 * 1024,
+        temp_store="MEMORY",
+        busy_timeout=5000,
+    ),
+    # No fsyncs at all; for benchmarks and throwaway databases only
+    "bench": DurabilityProfile(
+        name="bench",
+        journal_mode="WAL",
+        synchronous="OFF",
+        cache_size=-256_000,
+        mmap_size=1024 * 1024 * 1024,
+        temp_store="MEMORY",
+        busy_timeout=5000,
+    ),
+}
+
+
+def get_durability_profile(name: str | None = None) -> DurabilityProfile:
+    """Resolve a durability profile by name.
+    
+    Args:
+        name: Profile name; defaults to the ``ZENITH_DURABILITY`` environment
+            variable, falling back to "balanced".
+            
+    Returns:
+        The matching DurabilityProfile.
+        
+    Raises:
+        ValueError: If the profile name is unknown.
+    """
+    if name is None:
+        name = os.getenv("ZENITH_DURABILITY", DEFAULT_PROFILE)
+    
+    try:
+        return PROFILES[name.lower()]
+    except KeyError:
+        choices = ", ".join(PROFILES)
+        raise ValueError(
+            f"Unknown durability profile {name!r} (expected one of: {choices})"
+        ) from None
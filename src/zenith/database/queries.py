@@ -0,0 +1,384 @@
+"""Registry of the named SQL statements run by the database operations.
+
+Every statement on the hot path is registered here once, under a name, and
+run through its :class:`Statement`. The SQL text handed to SQLite is then
+the same on every call, so each pooled connection prepares it once and
+reuses it from its statement cache, and executions are counted and timed
+per statement name.
+"""
+
+import sqlite3
+import time
+from collections.abc import Iterable
+
+from ..metrics import DB_STATEMENT_LATENCY
+
+
+class Statement:
+    """A named, registered SQL statement with its own latency series."""
+    
+    __slots__ = ("name", "sql", "_latency")
+    
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self._latency = DB_STATEMENT_LATENCY.labels(statement=name)
+    
+    def execute(self, cursor: sqlite3.Cursor, params: tuple | list = ()) -> sqlite3.Cursor:
+        """Run the statement on a cursor.
+        
+        For queries the recorded time covers stepping to the first row;
+        fetching the rest is not included.
+        
+        Args:
+            cursor: Cursor to run on; its connection caches the prepared statement.
+            params: Bound parameters.
+            
+        Returns:
+            The cursor, ready to fetch from.
+        """
+        started = time.perf_counter()
+        try:
+            return cursor.execute(self.sql, params)
+        finally:
+            self._latency.observe(time.perf_counter() - started)
+    
+    def executemany(self, cursor: sqlite3.Cursor, rows: Iterable) -> sqlite3.Cursor:
+        """Run the statement once per parameter row.
+        
+        Args:
+            cursor: Cursor to run on.
+            rows: Parameter rows.
+            
+        Returns:
+            The cursor.
+        """
+        started = time.perf_counter()
+        try:
+            return cursor.executemany(self.sql, rows)
+        finally:
+            self._latency.observe(time.perf_counter() - started)
+    
+    def __repr__(self) -> str:
+        return f"Statement({self.name!r})"
+
+
+_statements: dict[str, Statement] = {}
+
+
+def register(name: str, sql: str) -> Statement:
+    """Add a statement to the registry.
+    
+    Args:
+        name: Unique statement name, used as its metrics label.
+        sql: The SQL text.
+        
+    Returns:
+        The registered Statement.
+        
+    Raises:
+        ValueError: If another statement already uses the name.
+    """
+    if name in _statements:
+        raise ValueError(f"Statement already registered: {name}")
+    
+    statement = _statements[name] = Statement(name, sql)
+    return statement
+
+
+def get_statement(name: str) -> Statement:
+    """Look up a registered statement by name.
+    
+    Args:
+        name: The statement's registered name.
+        
+    Returns:
+        The Statement.
+        
+    Raises:
+        KeyError: If no statement has that name.
+    """
+    return _statements[name]
+
+
+def registered_statements() -> list[Statement]:
+    """Get every registered statement, in registration order."""
+    return list(_statements.values())
+
+
+# Column order of ledger reads, each followed by the rowid used for cursors;
+# row factories given to the history functions receive plain tuples in it,
+# with IDs and timestamps already converted back to their API form
+TRANSACTION_COLUMNS = (
+    "transaction_id",
+    "account_id",
+    "type",
+    "amount",
+    "created_at",
+    "seq",
+    "balance_after",
+)
+LEDGER_SELECT = ", ".join(TRANSACTION_COLUMNS) + ", rowid"
+
+
+# Accounts
+
+INSERT_ACCOUNT = register(
+    "insert_account",
+    """INSERT INTO accounts (account_id, holder_name, balance)
+       VALUES (?, ?, ?)
+       ON CONFLICT (account_id) DO NOTHING""",
+)
+SELECT_ACCOUNT = register(
+    "select_account",
+    "SELECT account_id, holder_name, balance FROM accounts WHERE account_id = ?",
+)
+# One statement for any number of IDs, passed as one blob of 16-byte IDs
+SELECT_ACCOUNTS = register(
+    "select_accounts",
+    """WITH RECURSIVE
+           packed (ids) AS (SELECT ?),
+           positions (position) AS (
+               SELECT 1
+               UNION ALL
+               SELECT position + 16 FROM positions, packed
+               WHERE position + 16 <= length(ids)
+           )
+       SELECT account_id, holder_name, balance, ledger_seq FROM accounts
+       WHERE account_id IN (SELECT substr(ids, position, 16) FROM positions, packed)""",
+)
+# IDs that predate UUIDs are stored as text and cannot go in the blob above
+SELECT_TEXT_ID_ACCOUNT = register(
+    "select_text_id_account",
+    "SELECT account_id, holder_name, balance, ledger_seq FROM accounts WHERE account_id = ?",
+)
+SELECT_ACCOUNT_STATE = register(
+    "select_account_state",
+    "SELECT balance, ledger_seq FROM accounts WHERE account_id = ?",
+)
+ACCOUNT_EXISTS = register(
+    "account_exists",
+    "SELECT 1 FROM accounts WHERE account_id = ?",
+)
+SET_BALANCE = register(
+    "set_balance",
+    "UPDATE accounts SET balance = ? WHERE account_id = ?",
+)
+SET_BALANCE_AND_SEQ = register(
+    "set_balance_and_seq",
+    "UPDATE accounts SET balance = ?, ledger_seq = ? WHERE account_id = ?",
+)
+NEXT_SEQ = register(
+    "next_seq",
+    """UPDATE accounts SET ledger_seq = ledger_seq + 1
+       WHERE account_id = ?
+       RETURNING balance, ledger_seq""",
+)
+CREDIT_ACCOUNT = register(
+    "credit_account",
+    """UPDATE accounts
+       SET balance = balance + ?, ledger_seq = ledger_seq + 1
+       WHERE account_id = ? AND balance <= ?
+       RETURNING balance, ledger_seq""",
+)
+DEBIT_ACCOUNT = register(
+    "debit_account",
+    """UPDATE accounts
+       SET balance = balance - ?, ledger_seq = ledger_seq + 1
+       WHERE account_id = ? AND balance >= ?
+       RETURNING balance, ledger_seq""",
+)
+# Keyset page of idx_accounts_holder_name from a (holder_name, account_id)
+# position up to the end of a name prefix; the row value seeks the index
+FIND_ACCOUNTS = register(
+    "find_accounts",
+    """SELECT account_id, holder_name, balance FROM accounts
+       WHERE (holder_name, account_id) > (? COLLATE NOCASE, ?)
+         AND holder_name < ? COLLATE NOCASE
+       ORDER BY holder_name COLLATE NOCASE, account_id
+       LIMIT ?""",
+)
+LIST_ACCOUNTS = register(
+    "list_accounts",
+    """SELECT account_id, holder_name, balance FROM accounts
+       WHERE account_id > ?
+       ORDER BY account_id
+       LIMIT ?""",
+)
+
+
+# Ledger
+
+INSERT_TRANSACTION = register(
+    "insert_transaction",
+    """INSERT INTO transactions
+       (transaction_id, account_id, type, amount, created_at, seq, balance_after)
+       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+)
+INSERT_SNAPSHOT = register(
+    "insert_snapshot",
+    """INSERT INTO account_snapshots
+       (account_id, seq, balance, created_at)
+       VALUES (?, ?, ?, ?)""",
+)
+LEDGER_PAGE = register(
+    "ledger_page",
+    f"""SELECT {LEDGER_SELECT}
+        FROM transactions
+        WHERE account_id = ?
+        ORDER BY created_at DESC, rowid DESC
+        LIMIT ?""",
+)
+LEDGER_PAGE_BEFORE = register(
+    "ledger_page_before",
+    f"""SELECT {LEDGER_SELECT}
+        FROM transactions
+        WHERE account_id = ? AND (created_at, rowid) < (?, ?)
+        ORDER BY created_at DESC, rowid DESC
+        LIMIT ?""",
+)
+LEDGER_PAGE_AFTER = register(
+    "ledger_page_after",
+    f"""SELECT {LEDGER_SELECT}
+        FROM transactions
+        WHERE account_id = ? AND (created_at, rowid) > (?, ?)
+        ORDER BY created_at ASC, rowid ASC
+        LIMIT ?""",
+)
+# Both bounds are always bound, so every statement chunk shares one statement
+LEDGER_RANGE = register(
+    "ledger_range",
+    f"""SELECT {LEDGER_SELECT}
+        FROM transactions
+        WHERE account_id = ? AND (created_at, rowid) > (?, ?) AND created_at < ?
+        ORDER BY created_at ASC, rowid ASC
+        LIMIT ?""",
+)
+BALANCE_AT = register(
+    "balance_at",
+    """SELECT balance_after FROM transactions
+       WHERE account_id = ? AND created_at <= ?
+       ORDER BY created_at DESC, rowid DESC
+       LIMIT 1""",
+)
+BALANCE_AT_SEQ = register(
+    "balance_at_seq",
+    "SELECT balance_after FROM transactions WHERE account_id = ? AND seq = ?",
+)
+LATEST_SNAPSHOT = register(
+    "latest_snapshot",
+    """SELECT seq, balance FROM account_snapshots
+       WHERE account_id = ?
+       ORDER BY seq DESC
+       LIMIT 1""",
+)
+LEDGER_SINCE_SEQ = register(
+    "ledger_since_seq",
+    """SELECT seq, type, amount, balance_after FROM transactions
+       WHERE account_id = ? AND seq > ?
+       ORDER BY seq""",
+)
+# The account's oldest row still in the hot file; rows before it are archived
+LEDGER_FIRST = register(
+    "ledger_first",
+    """SELECT seq, created_at, rowid FROM transactions
+       WHERE account_id = ?
+       ORDER BY seq
+       LIMIT 1""",
+)
+
+
+# Ledger rollups
+
+LEDGER_MAX_ROWID = register(
+    "ledger_max_rowid",
+    "SELECT IFNULL(MAX(rowid), 0) FROM transactions",
+)
+ROLLUP_WATERMARK = register(
+    "rollup_watermark",
+    "SELECT CAST(value AS INTEGER) FROM settings WHERE key = 'rollup_rowid'",
+)
+SET_ROLLUP_WATERMARK = register(
+    "set_rollup_watermark",
+    """INSERT INTO settings (key, value) VALUES ('rollup_rowid', ?)
+       ON CONFLICT (key) DO UPDATE SET value = excluded.value""",
+)
+FOLD_LEDGER = register(
+    "fold_ledger",
+    """INSERT INTO ledger_rollups (day, account_id, type, count, amount)
+       SELECT date(created_at / 1000000, 'unixepoch'), account_id, type,
+              COUNT(*), SUM(amount)
+       FROM transactions
+       WHERE rowid > ? AND rowid <= ?
+       GROUP BY 1, 2, 3
+       ON CONFLICT (day, account_id, type) DO UPDATE
+       SET count = count + excluded.count,
+           amount = CASE WHEN typeof(amount) = 'integer' AND amount <= ? - excluded.amount
+                         THEN amount + excluded.amount END""",
+)
+LEDGER_FOLD_ROWS = register(
+    "ledger_fold_rows",
+    """SELECT date(created_at / 1000000, 'unixepoch'), account_id, type, amount
+       FROM transactions
+       WHERE rowid > ? AND rowid <= ?""",
+)
+ROLLUP_ROW = register(
+    "rollup_row",
+    """SELECT count, amount FROM ledger_rollups
+       WHERE day = ? AND account_id = ? AND type = ?""",
+)
+SET_ROLLUP = register(
+    "set_rollup",
+    """INSERT INTO ledger_rollups (day, account_id, type, count, amount)
+       VALUES (?, ?, ?, ?, ?)
+       ON CONFLICT (day, account_id, type) DO UPDATE
+       SET count = excluded.count, amount = excluded.amount""",
+)
+ROLLUP_WINDOW = register(
+    "rollup_window",
+    """SELECT day, account_id, type, count, amount FROM ledger_rollups
+       WHERE day >= ? AND day <= ?""",
+)
+
+
+# Ledger archive
+
+# Rows past the first bound rowid that are older than a cutoff and already
+# folded into the rollups, in rowid order
+ARCHIVE_CANDIDATES = register(
+    "archive_candidates",
+    f"""SELECT {LEDGER_SELECT}
+        FROM transactions
+        WHERE rowid > ? AND created_at < ?
+          AND rowid <= (SELECT CAST(value AS INTEGER) FROM settings WHERE key = 'rollup_rowid')
+        ORDER BY rowid
+        LIMIT ?""",
+)
+DELETE_ARCHIVED = register(
+    "delete_archived",
+    "DELETE FROM transactions WHERE rowid > ? AND rowid <= ? AND created_at < ?",
+)
+
+
+# Idempotency keys
+
+SELECT_IDEMPOTENCY_KEY = register(
+    "select_idempotency_key",
+    "SELECT request, result, created_at FROM idempotency_keys WHERE key = ?",
+)
+EVICT_IDEMPOTENCY_KEYS = register(
+    "evict_idempotency_keys",
+    """DELETE FROM idempotency_keys WHERE key IN (
+           SELECT key FROM idempotency_keys
+           WHERE created_at < ?
+           ORDER BY created_at
+           LIMIT ?
+       )""",
+)
+# Replaces the row of an expired key that has not been evicted yet
+INSERT_IDEMPOTENCY_KEY = register(
+    "insert_idempotency_key",
+    """INSERT OR REPLACE INTO idempotency_keys
+       (key, request, result, account_id, created_at)
+       VALUES (?, ?, ?, ?, ?)""",
+)
@@ -0,0 +1,251 @@
+"""Move accounts between shard files after the shard count changes.
+
+Run with the server stopped, then restart it with the new ``ZENITH_SHARDS``:
+    python -m src.zenith.database.rebalance --shards 4
+
+Each account's rows are copied to their new shard and committed there
+before they are deleted from the old one, so an interrupted run loses
+nothing and can simply be repeated. Pagination cursors issued before a
+rebalance are not valid afterwards for accounts that moved. Every shard's
+ledger rollups are brought up to date first and then moved with their
+accounts, so they keep counting rows that have been archived. Archive
+files are shared by all shards and are left as they are.
+"""
+
+import argparse
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+from .codec import unpack_id
+from .connection import (
+    Connection,
+    close_connections,
+    configure_connection,
+    get_database_path,
+    get_shard_path,
+    immediate_transaction,
+    shard_for,
+)
+from .rollups import CLAMP_ROLLUP_WATERMARK_SQL, fold_pending
+from .schema import apply_migrations
+
+
+def find_shard_files() -> list[int]:
+    """List the shard indexes that have a database file on disk.
+    
+    Returns:
+        Sorted shard indexes, including 0 if the base file exists.
+    """
+    database_path = get_database_path()
+    pattern = re.compile(
+        re.escape(database_path.stem) + r"\.shard(\d+)" + re.escape(database_path.suffix)
+    )
+    
+    shards = {0} if database_path.exists() else set()
+    for path in database_path.parent.iterdir():
+        match = pattern.fullmatch(path.name)
+        if match:
+            shards.add(int(match.group(1)))
+    return sorted(shards)
+
+
+def rebalance(shard_count: int) -> dict:
+    """Redistribute every account to its shard under a new shard count.
+    
+    Args:
+        shard_count: The shard count the server will run with.
+        
+    Returns:
+        Summary with accounts and transactions moved and shard files removed.
+        
+    Raises:
+        ValueError: If ``shard_count`` is less than 1.
+    """
+    if shard_count < 1:
+        raise ValueError("Shard count must be at least 1")
+    
+    close_connections()
+    sources = find_shard_files()
+    for shard in sorted(set(sources) | set(range(shard_count))):
+        connection = _open(get_shard_path(shard), shard_count)
+        try:
+            apply_migrations(connection)
+            fold_pending(connection)
+        finally:
+            connection.close()
+    
+    moved_accounts = 0
+    moved_transactions = 0
+    for source in sources:
+        connection = _open(get_shard_path(source), shard_count)
+        try:
+            for target in range(shard_count):
+                if target != source:
+                    accounts, transactions = _move(connection, target)
+                    moved_accounts += accounts
+                    moved_transactions += transactions
+        finally:
+            connection.close()
+    
+    removed = [
+        str(get_shard_path(shard))
+        for shard in sources
+        if shard >= shard_count and _remove_if_empty(get_shard_path(shard), shard_count)
+    ]
+    
+    return {
+        "shards": shard_count,
+        "moved_accounts": moved_accounts,
+        "moved_transactions": moved_transactions,
+        "removed_files": removed,
+    }
+
+
+def _open(path: Path, shard_count: int) -> Connection:
+    connection = sqlite3.connect(path, factory=Connection)
+    configure_connection(connection)
+    # Shards are chosen by the ID's text, whatever form it is stored in
+    connection.create_function(
+        "zenith_shard",
+        1,
+        lambda account_id: shard_for(unpack_id(account_id), shard_count),
+        deterministic=True,
+    )
+    return connection
+
+
+def _move(connection: Connection, target: int) -> tuple[int, int]:
+    accounts = connection.execute(
+        "SELECT COUNT(*) FROM accounts WHERE zenith_shard(account_id) = ?",
+        (target,),
+    ).fetchone()[0]
+    if not accounts:
+        return 0, 0
+    
+    connection.execute("ATTACH DATABASE ? AS target", (str(get_shard_path(target)),))
+    try:
+        # Copy and commit first; a crash before the delete leaves duplicates
+        # that the next run overwrites, never a missing account
+        with immediate_transaction(connection):
+            # Both files are fully folded, so the moved rollups are exact;
+            # they replace any an interrupted run copied already
+            connection.execute(
+                """DELETE FROM target.ledger_rollups WHERE account_id IN (
+                       SELECT account_id FROM main.accounts
+                       WHERE zenith_shard(account_id) = ?
+                   )""",
+                (target,),
+            )
+            connection.execute(
+                """INSERT INTO target.ledger_rollups
+                   (day, account_id, type, count, amount)
+                   SELECT day, account_id, type, count, amount
+                   FROM main.ledger_rollups
+                   WHERE zenith_shard(account_id) = ?""",
+                (target,),
+            )
+            connection.execute(
+                """INSERT OR REPLACE INTO target.accounts
+                   (account_id, holder_name, balance, ledger_seq)
+                   SELECT account_id, holder_name, balance, ledger_seq
+                   FROM main.accounts
+                   WHERE zenith_shard(account_id) = ?""",
+                (target,),
+            )
+            transactions = connection.execute(
+                """INSERT OR REPLACE INTO target.transactions
+                   (transaction_id, account_id, type, amount, created_at,
+                    seq, balance_after)
+                   SELECT transaction_id, account_id, type, amount, created_at,
+                          seq, balance_after
+                   FROM main.transactions
+                   WHERE zenith_shard(account_id) = ?
+                   ORDER BY created_at, rowid""",
+                (target,),
+            ).rowcount
+            # The copied rows are counted by the moved rollups already
+            connection.execute(
+                """INSERT INTO target.settings (key, value)
+                   SELECT 'rollup_rowid', IFNULL(MAX(rowid), 0) FROM target.transactions
+                   WHERE true
+                   ON CONFLICT (key) DO UPDATE SET value = excluded.value"""
+            )
+            connection.execute(
+                """INSERT OR REPLACE INTO target.account_snapshots
+                   (account_id, seq, balance, created_at)
+                   SELECT account_id, seq, balance, created_at
+                   FROM main.account_snapshots
+                   WHERE zenith_shard(account_id) = ?""",
+                (target,),
+            )
+            connection.execute(
+                """INSERT OR REPLACE INTO target.idempotency_keys
+                   (key, request, result, account_id, created_at)
+                   SELECT key, request, result, account_id, created_at
+                   FROM main.idempotency_keys
+                   WHERE zenith_shard(account_id) = ?""",
+                (target,),
+            )
+        
+        with immediate_transaction(connection):
+            for table in (
+                "idempotency_keys",
+                "account_snapshots",
+                "ledger_rollups",
+                "transactions",
+                "accounts",
+            ):
+                connection.execute(
+                    f"DELETE FROM main.{table} WHERE zenith_shard(account_id) = ?",
+                    (target,),
+                )
+            connection.execute(CLAMP_ROLLUP_WATERMARK_SQL)
+    finally:
+        connection.execute("DETACH DATABASE target")
+    
+    return accounts, transactions
+
+
+def _remove_if_empty(path: Path, shard_count: int) -> bool:
+    connection = _open(path, shard_count)
+    try:
+        empty = not connection.execute(
+            """SELECT EXISTS (SELECT 1 FROM accounts)
+                   OR EXISTS (SELECT 1 FROM transactions)"""
+        ).fetchone()[0]
+    finally:
+        connection.close()
+    
+    if empty:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+    return empty
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point.
+    
+    Args:
+        argv: Arguments excluding the program name; defaults to sys.argv.
+        
+    Returns:
+        Process exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, required=True, help="new shard count")
+    args = parser.parse_args(argv)
+    
+    summary = rebalance(args.shards)
+    print(
+        f"Moved {summary['moved_accounts']} accounts and "
+        f"{summary['moved_transactions']} transactions across {summary['shards']} shards"
+    )
+    for path in summary["removed_files"]:
+        print(f"Removed empty shard file {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""Per-day ledger rollups for analytics reads.
+
+``ledger_rollups`` holds one row per UTC day, account and transaction type
+with its count and amount. It is maintained in micro-batches rather than
+on each write: :func:`refresh_rollups` folds the ledger rows added since a
+rowid watermark, kept in ``settings``, in short transactions of at most
+``ROLLUP_BATCH_SIZE`` rows, so the write path of ``record_transaction``
+never touches it and a large backlog never holds the write lock for long.
+A :class:`RollupFolder` thread in the process that owns the writes folds
+every ``ZENITH_ROLLUP_INTERVAL`` seconds, so rollups trail the ledger by
+about that much and dashboard reads never fold themselves.
+
+Ledger rowids only grow, except that SQLite hands out the largest rowid
+again after it is deleted. Anything that deletes ledger rows must clamp the
+watermark to the new largest rowid in the same transaction. Rows that leave
+the ledger for good take their rollups with them; archived rows, which are
+still part of the ledger, keep theirs.
+
+Amounts are exact. A rollup amount past the 64-bit integer range, which
+SQL arithmetic would turn into an approximate REAL, is stored as a BLOB of
+its decimal digits instead and read back as a Python int.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from . import queries
+from .codec import unpack_id
+from .connection import get_connection, get_shard_count, immediate_transaction, retry_on_busy
+from .ipc import get_writer_client
+from ..metrics import instrument_operation, record_rows, registry
+from ..models.money import MAX_MINOR_UNITS
+
+
+ROLLUP_BATCH_SIZE = 10_000
+DEFAULT_ROLLUP_INTERVAL = 5.0
+
+# The clamp that code deleting ledger rows runs after the delete
+CLAMP_ROLLUP_WATERMARK_SQL = """
+UPDATE settings
+SET value = MIN(CAST(value AS INTEGER), (SELECT IFNULL(MAX(rowid), 0) FROM transactions))
+WHERE key = 'rollup_rowid'
+"""
+
+
+@instrument_operation
+def refresh_rollups(batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """Fold ledger rows written since the last refresh into the rollups.
+    
+    Args:
+        batch_size: Maximum ledger rows folded per transaction.
+        
+    Returns:
+        Number of ledger rows folded, across all shards.
+    """
+    folded = 0
+    for shard in range(get_shard_count()):
+        with get_connection(shard=shard) as connection:
+            folded += fold_pending(connection, batch_size)
+    record_rows("refresh_rollups", folded)
+    return folded
+
+
+def fold_pending(connection: sqlite3.Connection, batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """Fold every ledger row of one database file that is past the watermark.
+    
+    Args:
+        connection: Connection to the shard file.
+        batch_size: Maximum ledger rows folded per transaction.
+        
+    Returns:
+        Number of ledger rows folded.
+    """
+    folded = 0
+    while batch := retry_on_busy(_fold_batch, connection, batch_size):
+        folded += batch
+    return folded
+
+
+def _fold_batch(connection: sqlite3.Connection, batch_size: int) -> int:
+    # Checked first without the write lock, which an idle tick never needs
+    watermark, upto = _fold_range(connection.cursor(), batch_size)
+    if upto <= watermark:
+        return 0
+    
+    with immediate_transaction(connection):
+        cursor = connection.cursor()
+        watermark, upto = _fold_range(cursor, batch_size)
+        if upto > watermark:
+            try:
+                queries.FOLD_LEDGER.execute(cursor, (watermark, upto, MAX_MINOR_UNITS))
+            except (sqlite3.IntegrityError, sqlite3.OperationalError) as error:
+                # SUM() raises on overflow, and FOLD_LEDGER sets the NOT NULL
+                # amount to NULL rather than overflow an existing rollup;
+                # either way the statement is undone
+                overflow = isinstance(error, sqlite3.IntegrityError) or "overflow" in str(error)
+                if not overflow:
+                    raise
+                _fold_exact(cursor, watermark, upto)
+            queries.SET_ROLLUP_WATERMARK.execute(cursor, (str(upto),))
+    return max(upto - watermark, 0)
+
+
+def _fold_range(cursor: sqlite3.Cursor, batch_size: int) -> tuple[int, int]:
+    row = queries.ROLLUP_WATERMARK.execute(cursor).fetchone()
+    watermark = row[0] if row is not None else 0
+    latest = queries.LEDGER_MAX_ROWID.execute(cursor).fetchone()[0]
+    return watermark, min(latest, watermark + batch_size)
+
+
+def _fold_exact(cursor: sqlite3.Cursor, watermark: int, upto: int) -> None:
+    # Sums with Python ints, which cannot overflow
+    totals: dict[tuple, list[int]] = {}
+    rows = queries.LEDGER_FOLD_ROWS.execute(cursor, (watermark, upto)).fetchall()
+    for day, account_id, transaction_type, amount in rows:
+        total = totals.setdefault((day, account_id, transaction_type), [0, 0])
+        total[0] += 1
+        total[1] += amount
+    
+    for key, (count, amount) in totals.items():
+        row = queries.ROLLUP_ROW.execute(cursor, key).fetchone()
+        if row is not None:
+            count += row[0]
+            amount += int(row[1])
+        stored = amount if amount <= MAX_MINOR_UNITS else str(amount).encode()
+        queries.SET_ROLLUP.execute(cursor, (*key, count, stored))
+
+
+class RollupFolder:
+    """Background thread that folds new ledger rows into the rollups.
+    
+    Every ``interval`` seconds it runs :func:`refresh_rollups`. A failed
+    run, e.g. on a database that stays busy, is counted and retried on the
+    next tick.
+    """
+    
+    def __init__(
+        self,
+        interval: float = DEFAULT_ROLLUP_INTERVAL,
+        batch_size: int = ROLLUP_BATCH_SIZE,
+    ):
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        
+        self.interval = interval
+        self.batch_size = batch_size
+        
+        self._stop = threading.Event()
+        self._runs = 0
+        self._rows = 0
+        self._failures = 0
+        self._failing = False
+        self._last_run: float | None = None
+        self._thread = threading.Thread(
+            target=self._run,
+            name="zenith-rollup-folder",
+            daemon=True,
+        )
+        self._thread.start()
+    
+    @property
+    def failing(self) -> bool:
+        """Whether the latest run failed, leaving the rollups behind."""
+        return self._failing
+    
+    def close(self) -> None:
+        """Stop the thread, waiting for a run in progress to finish."""
+        self._stop.set()
+        self._thread.join()
+    
+    def stats(self) -> dict:
+        """Report folding counters.
+        
+        Returns:
+            Dictionary with run, row and failure counts, the interval and
+            the seconds since the last successful run.
+        """
+        last_run = self._last_run
+        return {
+            "runs": self._runs,
+            "rows": self._rows,
+            "failures": self._failures,
+            "interval_seconds": self.interval,
+            "seconds_since_run": time.monotonic() - last_run if last_run is not None else None,
+        }
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._rows += refresh_rollups(self.batch_size)
+            except Exception:
+                self._failures += 1
+                self._failing = True
+                continue
+            self._runs += 1
+            self._failing = False
+            self._last_run = time.monotonic()
+
+
+_folder: RollupFolder | None = None
+_folder_lock = threading.Lock()
+
+
+def get_rollup_interval() -> float:
+    """Get the background folding interval.
+    
+    Read from ``ZENITH_ROLLUP_INTERVAL`` in seconds; ``0`` turns background
+    folding off, and summaries then fold when they are read.
+    
+    Returns:
+        The interval in seconds.
+    """
+    return float(os.getenv("ZENITH_ROLLUP_INTERVAL", str(DEFAULT_ROLLUP_INTERVAL)))
+
+
+def start_rollup_folder() -> RollupFolder | None:
+    """Start this process's background folder, unless it is disabled.
+    
+    Call it in the process that applies writes: the single-process server
+    or the multi-worker writer process.
+    
+    Returns:
+        The running RollupFolder, or None when the interval is 0.
+    """
+    global _folder
+    
+    interval = get_rollup_interval()
+    with _folder_lock:
+        if _folder is None and interval > 0:
+            _folder = RollupFolder(interval)
+        return _folder
+
+
+def get_rollup_folder() -> RollupFolder | None:
+    """Get this process's background folder, or None if none is running."""
+    return _folder
+
+
+def close_rollup_folder() -> None:
+    """Stop this process's background folder, if one is running."""
+    global _folder
+    
+    with _folder_lock:
+        folder, _folder = _folder, None
+    if folder is not None:
+        folder.close()
+
+
+def folded_in_background() -> bool:
+    """Whether a background folder keeps this process's rollups current.
+    
+    True when this process runs one, or when it forwards writes to a writer
+    process that starts one.
+    
+    Returns:
+        False when reads have to fold the rollups themselves.
+    """
+    if _folder is not None:
+        return True
+    return get_writer_client() is not None and get_rollup_interval() > 0
+
+
+@instrument_operation
+def read_rollups(start_day: str, end_day: str) -> list[tuple]:
+    """Read the rollup rows of a window of days from every shard.
+    
+    Only rows folded by the last :func:`refresh_rollups` are included.
+    
+    Args:
+        start_day: First day of the window, ``YYYY-MM-DD``.
+        end_day: Last day of the window, inclusive.
+        
+    Returns:
+        ``(day, account_id, type, count, amount)`` tuples, in no particular
+        order; amounts are exact ints in minor units.
+    """
+    rows = []
+    for shard in range(get_shard_count()):
+        with get_connection(shard=shard) as connection:
+            cursor = connection.cursor()
+            cursor.row_factory = None
+            queries.ROLLUP_WINDOW.execute(cursor, (start_day, end_day))
+            rows.extend(
+                (day, unpack_id(account_id), transaction_type, count, int(amount))
+                for day, account_id, transaction_type, count, amount in cursor
+            )
+    record_rows("read_rollups", len(rows))
+    return rows
+
+
+registry.register_stats(
+    "rollup_folder",
+    "Background rollup folder",
+    lambda: _folder.stats() if _folder is not None else None,
+)
@@ -1,6 +1,16 @@
 """Database schema definitions and initialization."""
 
-from .connection import get_connection
+import sqlite3
+from collections.abc import Callable
+
+from .codec import pack_id, parse_micros
+from .connection import (
+    Connection,
+    get_connection,
+    get_shard_count,
+    immediate_transaction,
+)
+from ..models.money import MINOR_UNIT_DIGITS, MINOR_UNIT_SCALE
 
 
 ACCOUNTS_TABLE_SQL = """
@@ -22,14 +32,366 @@ CREATE TABLE IF NOT EXISTS transactions (
 )
 """
 
+# Ascending index; history reads walk it backwards for newest-first order,
+# which also yields rowid descending for the keyset tie-breaker
+TRANSACTIONS_HISTORY_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_transactions_account_created
+ON transactions (account_id, created_at)
+"""
+
+# Ledger rows between per-account balance snapshots
+SNAPSHOT_INTERVAL = 1000
+
+TRANSACTIONS_SEQUENCE_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_account_seq
+ON transactions (account_id, seq)
+"""
+
+SNAPSHOTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS account_snapshots (
+    account_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    balance INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (account_id, seq),
+    FOREIGN KEY (account_id) REFERENCES accounts (account_id)
+) WITHOUT ROWID
+"""
+
+# Keys of completed idempotent requests; created_at is Unix seconds
+IDEMPOTENCY_KEYS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    request TEXT NOT NULL,
+    result TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+IDEMPOTENCY_KEYS_EXPIRY_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created
+ON idempotency_keys (created_at)
+"""
+
+# Case-insensitive name order with the account ID as tie-breaker, for prefix
+# search with keyset pagination
+ACCOUNTS_HOLDER_NAME_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_accounts_holder_name
+ON accounts (holder_name COLLATE NOCASE, account_id)
+"""
+
+# Per-day, per-account, per-type ledger totals, folded in from the ledger
+# in micro-batches (see rollups.py); day is the UTC date, YYYY-MM-DD
+LEDGER_ROLLUPS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS ledger_rollups (
+    day TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (day, account_id, type)
+) WITHOUT ROWID
+"""
+
+SETTINGS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+)
+"""
+
+
+def _migrate_to_minor_units(cursor: sqlite3.Cursor) -> None:
+    """Rebuild money columns as INTEGER minor units.
+    
+    SQLite cannot change a column's type in place, and a REAL column would
+    turn stored integers back into floats, so both tables are copied into
+    new INTEGER-typed tables with the values scaled and rounded.
+    """
+    cursor.execute(SETTINGS_TABLE_SQL)
+    cursor.execute(
+        "INSERT INTO settings (key, value) VALUES ('minor_unit_digits', ?)",
+        (str(MINOR_UNIT_DIGITS),),
+    )
+    
+    cursor.execute("""
+        CREATE TABLE accounts_minor (
+            account_id TEXT PRIMARY KEY,
+            holder_name TEXT NOT NULL,
+            balance INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute(
+        """INSERT INTO accounts_minor (account_id, holder_name, balance)
+           SELECT account_id, holder_name, CAST(ROUND(balance * ?) AS INTEGER)
+           FROM accounts""",
+        (MINOR_UNIT_SCALE,),
+    )
+    cursor.execute("DROP TABLE accounts")
+    cursor.execute("ALTER TABLE accounts_minor RENAME TO accounts")
+    
+    cursor.execute("""
+        CREATE TABLE transactions_minor (
+            transaction_id TEXT PRIMARY KEY,
+            account_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (account_id) REFERENCES accounts (account_id)
+        )
+    """)
+    cursor.execute(
+        """INSERT INTO transactions_minor
+           (rowid, transaction_id, account_id, type, amount, created_at)
+           SELECT rowid, transaction_id, account_id, type,
+                  CAST(ROUND(amount * ?) AS INTEGER), created_at
+           FROM transactions""",
+        (MINOR_UNIT_SCALE,),
+    )
+    cursor.execute("DROP TABLE transactions")
+    cursor.execute("ALTER TABLE transactions_minor RENAME TO transactions")
+    cursor.execute(TRANSACTIONS_HISTORY_INDEX_SQL)
+
+
+def _add_running_balances(cursor: sqlite3.Cursor) -> None:
+    """Number each account's ledger and store the balance after every row.
+    
+    Existing rows are backfilled from the ledger itself with window
+    functions, in ``(created_at, rowid)`` order, and a snapshot is written
+    at every ``SNAPSHOT_INTERVAL``-th row of each account.
+    """
+    cursor.execute(
+        "ALTER TABLE accounts ADD COLUMN ledger_seq INTEGER NOT NULL DEFAULT 0"
+    )
+    cursor.execute("ALTER TABLE transactions ADD COLUMN seq INTEGER")
+    cursor.execute("ALTER TABLE transactions ADD COLUMN balance_after INTEGER")
+    
+    cursor.execute("""
+        WITH ledger AS (
+            SELECT rowid AS id,
+                   ROW_NUMBER() OVER running AS seq,
+                   SUM(CASE type WHEN 'DEPOSIT' THEN amount ELSE -amount END)
+                       OVER running AS balance_after
+            FROM transactions
+            WINDOW running AS (PARTITION BY account_id ORDER BY created_at, rowid)
+        )
+        UPDATE transactions
+        SET seq = ledger.seq, balance_after = ledger.balance_after
+        FROM ledger
+        WHERE transactions.rowid = ledger.id
+    """)
+    cursor.execute("""
+        UPDATE accounts SET ledger_seq = (
+            SELECT COUNT(*) FROM transactions
+            WHERE transactions.account_id = accounts.account_id
+        )
+    """)
+    cursor.execute(TRANSACTIONS_SEQUENCE_INDEX_SQL)
+    
+    cursor.execute(SNAPSHOTS_TABLE_SQL)
+    cursor.execute(
+        """INSERT INTO account_snapshots (account_id, seq, balance, created_at)
+           SELECT account_id, seq, balance_after, created_at FROM transactions
+           WHERE seq % ? = 0""",
+        (SNAPSHOT_INTERVAL,),
+    )
+
+
+def _compact_storage(cursor: sqlite3.Cursor) -> None:
+    """Store IDs as 16-byte UUID blobs and ledger timestamps as integers.
+    
+    Every table holding an account ID is rebuilt with the values converted
+    by the same functions the operations use, so IDs that are not UUIDs
+    stay text and still match. Ledger rowids are kept, so history cursors
+    and the rollup watermark stay valid. Accounts become a WITHOUT ROWID
+    table keyed on the ID; the ledger keeps its rowid, which orders
+    insertion for the rollups.
+    """
+    connection = cursor.connection
+    connection.create_function("zenith_pack_id", 1, pack_id, deterministic=True)
+    connection.create_function("zenith_micros", 1, parse_micros, deterministic=True)
+    
+    cursor.execute("""
+        CREATE TABLE accounts_compact (
+            account_id BLOB PRIMARY KEY,
+            holder_name TEXT NOT NULL,
+            balance INTEGER NOT NULL DEFAULT 0,
+            ledger_seq INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        INSERT INTO accounts_compact (account_id, holder_name, balance, ledger_seq)
+        SELECT zenith_pack_id(account_id), holder_name, balance, ledger_seq
+        FROM accounts
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE transactions_compact (
+            transaction_id BLOB PRIMARY KEY,
+            account_id BLOB NOT NULL,
+            type TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            seq INTEGER,
+            balance_after INTEGER,
+            FOREIGN KEY (account_id) REFERENCES accounts (account_id)
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO transactions_compact
+        (rowid, transaction_id, account_id, type, amount, created_at, seq, balance_after)
+        SELECT rowid, zenith_pack_id(transaction_id), zenith_pack_id(account_id), type,
+               amount, zenith_micros(created_at), seq, balance_after
+        FROM transactions
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE account_snapshots_compact (
+            account_id BLOB NOT NULL,
+            seq INTEGER NOT NULL,
+            balance INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            PRIMARY KEY (account_id, seq),
+            FOREIGN KEY (account_id) REFERENCES accounts (account_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        INSERT INTO account_snapshots_compact (account_id, seq, balance, created_at)
+        SELECT zenith_pack_id(account_id), seq, balance, zenith_micros(created_at)
+        FROM account_snapshots
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE idempotency_keys_compact (
+            key TEXT PRIMARY KEY,
+            request TEXT NOT NULL,
+            result TEXT NOT NULL,
+            account_id BLOB NOT NULL,
+            created_at INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        INSERT INTO idempotency_keys_compact (key, request, result, account_id, created_at)
+        SELECT key, request, result, zenith_pack_id(account_id), created_at
+        FROM idempotency_keys
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE ledger_rollups_compact (
+            day TEXT NOT NULL,
+            account_id BLOB NOT NULL,
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            PRIMARY KEY (day, account_id, type)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        INSERT INTO ledger_rollups_compact (day, account_id, type, count, amount)
+        SELECT day, zenith_pack_id(account_id), type, count, amount
+        FROM ledger_rollups
+    """)
+    
+    for table in (
+        "accounts",
+        "transactions",
+        "account_snapshots",
+        "idempotency_keys",
+        "ledger_rollups",
+    ):
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {table}_compact RENAME TO {table}")
+    
+    for statement in (
+        ACCOUNTS_HOLDER_NAME_INDEX_SQL,
+        TRANSACTIONS_HISTORY_INDEX_SQL,
+        TRANSACTIONS_SEQUENCE_INDEX_SQL,
+        IDEMPOTENCY_KEYS_EXPIRY_INDEX_SQL,
+    ):
+        cursor.execute(statement)
+
+
+# Each entry upgrades the schema by one version, tracked in PRAGMA user_version.
+# An entry is a tuple of SQL statements or a function given a cursor.
+# Append new migrations; never edit or reorder applied ones.
+MIGRATIONS: list[tuple[str, ...] | Callable[[sqlite3.Cursor], None]] = [
+    (ACCOUNTS_TABLE_SQL, TRANSACTIONS_TABLE_SQL),
+    (TRANSACTIONS_HISTORY_INDEX_SQL,),
+    _migrate_to_minor_units,
+    _add_running_balances,
+    (IDEMPOTENCY_KEYS_TABLE_SQL, IDEMPOTENCY_KEYS_EXPIRY_INDEX_SQL),
+    (ACCOUNTS_HOLDER_NAME_INDEX_SQL,),
+    (LEDGER_ROLLUPS_TABLE_SQL,),
+    _compact_storage,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(connection: sqlite3.Connection) -> int:
+    """Read the schema version stored in the database file.
+    
+    Args:
+        connection: Connection to the database.
+        
+    Returns:
+        The applied schema version (0 for a new database).
+    """
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
 
 def initialize_database() -> None:
-    """Create database tables if they don't exist."""
-    connection = get_connection()
-    cursor = connection.cursor()
+    """Create database tables and apply any pending migrations on every shard.
+    
+    Optional: each shard is migrated anyway when its connection pool is
+    first created. Calling this up front moves that cost to startup.
+    Files already at SCHEMA_VERSION only have their ``user_version`` read.
+    Migrations run inside one ``BEGIN IMMEDIATE`` transaction, so concurrent
+    processes starting against the same file apply each version only once.
     
-    cursor.execute(ACCOUNTS_TABLE_SQL)
-    cursor.execute(TRANSACTIONS_TABLE_SQL)
+    Journal mode, synchronous level and cache settings are not set here:
+    every pooled connection applies the configured durability profile when
+    it is opened, so the first checkout already switches the file to WAL.
+    """
+    for shard in range(get_shard_count()):
+        with get_connection(shard=shard) as connection:
+            apply_migrations(connection)
+
+
+def apply_migrations(connection: Connection) -> None:
+    """Bring one database file up to SCHEMA_VERSION.
     
-    connection.commit()
-    connection.close()
+    Args:
+        connection: Connection to the file to migrate.
+        
+    Raises:
+        RuntimeError: If the file was created with different minor-unit digits.
+    """
+    if get_schema_version(connection) < SCHEMA_VERSION:
+        with immediate_transaction(connection):
+            cursor = connection.cursor()
+            
+            # Re-read under the write lock in case another process migrated
+            version = get_schema_version(connection)
+            for migration in MIGRATIONS[version:]:
+                if callable(migration):
+                    migration(cursor)
+                else:
+                    for statement in migration:
+                        cursor.execute(statement)
+            
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    _check_minor_unit_digits(connection)
+
+
+def _check_minor_unit_digits(connection: sqlite3.Connection) -> None:
+    row = connection.execute(
+        "SELECT value FROM settings WHERE key = 'minor_unit_digits'"
+    ).fetchone()
+    if row is not None and int(row["value"]) != MINOR_UNIT_DIGITS:
+        raise RuntimeError(
+            f"Database stores amounts with {row['value']} minor-unit digits "
+            f"but ZENITH_MINOR_UNIT_DIGITS is {MINOR_UNIT_DIGITS}"
+        )
@@ -0,0 +1,440 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Tools and database operations record into module-level counters and
+histograms; subsystems such as the connection pool register collectors
+that report their current state at scrape time.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+
+# Latency buckets in seconds, from 50us to 10s
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# A collector returns (name, help, labels, value) gauge samples
+Collector = Callable[[], list[tuple[str, str, dict[str, str], float]]]
+
+
+class _CounterChild:
+    def __init__(self, lock: threading.Lock):
+        self._lock = lock
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    def __init__(self, lock: threading.Lock, buckets: tuple[float, ...]):
+        self._lock = lock
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+    
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+    
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket."""
+        with self._lock:
+            counts = self.counts[:]
+            total = self.count
+        if total == 0:
+            return 0.0
+        
+        target = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= target and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class _Metric:
+    kind = ""
+    
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+    
+    def labels(self, **labels: str):
+        """Get the child series for a label set, creating it on first use."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+    
+    def find(self, **labels: str):
+        """Get the child series for a label set, or None if it was never used."""
+        return self._children.get(tuple(str(labels[name]) for name in self.labelnames))
+    
+    def series(self) -> list[tuple[dict[str, str], object]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, key)), child) for key, child in items]
+    
+    def _new_child(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally labelled."""
+    
+    kind = "counter"
+    
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild(self._lock)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values, optionally labelled."""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+    
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(threading.Lock(), self.buckets)
+
+
+class MetricsRegistry:
+    """Holds metric families and collectors, and renders them for scraping."""
+    
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Collector] = []
+        self._lock = threading.Lock()
+    
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        """Register (or fetch) a counter family."""
+        return self._register(Counter(name, help, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Register (or fetch) a histogram family."""
+        return self._register(Histogram(name, help, labelnames, buckets))
+    
+    def register_collector(self, collector: Collector) -> None:
+        """Add a callback that reports gauge samples at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+    
+    def register_stats(
+        self,
+        prefix: str,
+        description: str,
+        source: Callable[[], dict | None],
+        label: str | None = None,
+    ) -> None:
+        """Expose the numeric fields of a ``stats()`` dict as gauges.
+        
+        Each numeric field ``key`` becomes the gauge ``zenith_<prefix>_<key>``;
+        nothing is reported while ``source`` returns None.
+        
+        Args:
+            prefix: Subsystem name used in the gauge names, e.g. ``pool``.
+            description: Help text prefix for the gauges.
+            source: Returns the subsystem's current stats, or None. With
+                ``label`` set it returns a mapping of label value to stats.
+            label: Label distinguishing several instances, e.g. ``shard``.
+        """
+        def collect() -> list[tuple[str, str, dict[str, str], float]]:
+            stats = source()
+            if not stats:
+                return []
+            instances = stats.items() if label else [(None, stats)]
+            return [
+                (
+                    f"zenith_{prefix}_{key}",
+                    f"{description}: {key}",
+                    {label: instance} if label else {},
+                    float(value),
+                )
+                for instance, instance_stats in instances
+                for key, value in instance_stats.items()
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+            ]
+        
+        self.register_collector(collect)
+    
+    def get(self, name: str) -> _Metric | None:
+        """Look up a registered metric family by name."""
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format.
+        
+        Returns:
+            The exposition text, ending with a newline.
+        """
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, child in metric.series():
+                if isinstance(child, _CounterChild):
+                    lines.append(f"{metric.name}{_format_labels(labels)} {child.value}")
+                    continue
+                
+                cumulative = 0
+                for bound, count in zip((*child.buckets, float("inf")), child.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = _format_labels({**labels, "le": le})
+                    lines.append(f"{metric.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {child.sum}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {child.count}")
+        
+        described: set[str] = set()
+        for name, help, labels, value in self.collect_gauges():
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        
+        return "\n".join(lines) + "\n"
+    
+    def collect_gauges(self) -> list[tuple[str, str, dict[str, str], float]]:
+        """Run every collector and return its gauge samples sorted by name."""
+        samples = []
+        for collector in list(self._collectors):
+            samples.extend(collector())
+        return sorted(samples, key=lambda sample: sample[0])
+    
+    def _register(self, metric: _Metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = (
+        '{}="{}"'.format(key, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+registry = MetricsRegistry()
+
+TOOL_LATENCY = registry.histogram(
+    "zenith_tool_latency_seconds",
+    "MCP tool call latency",
+    ("tool",),
+)
+TOOL_CALLS = registry.counter(
+    "zenith_tool_calls_total",
+    "MCP tool calls by outcome",
+    ("tool", "outcome"),
+)
+DB_OPERATION_LATENCY = registry.histogram(
+    "zenith_db_operation_seconds",
+    "Database operation latency",
+    ("operation",),
+)
+DB_RESULT_ROWS = registry.counter(
+    "zenith_db_result_rows_total",
+    "Rows returned or written by database operations, not rows scanned",
+    ("operation",),
+)
+DB_COMMITS = registry.counter(
+    "zenith_db_commits_total",
+    "SQLite commits",
+)
+DB_COMMIT_LATENCY = registry.histogram(
+    "zenith_db_commit_seconds",
+    "Time spent in SQLite COMMIT",
+)
+DB_LOCK_WAIT = registry.histogram(
+    "zenith_db_lock_wait_seconds",
+    "Time spent acquiring the SQLite write lock (BEGIN IMMEDIATE)",
+)
+DB_POOL_WAIT = registry.histogram(
+    "zenith_db_pool_wait_seconds",
+    "Time spent waiting for a free pooled connection",
+)
+DB_STATEMENT_LATENCY = registry.histogram(
+    "zenith_db_statement_seconds",
+    "Execution time of registered SQL statements",
+    ("statement",),
+)
+DB_BUSY_RETRIES = registry.counter(
+    "zenith_db_busy_retries_total",
+    "Operations retried after SQLite reported the database busy",
+    ("operation",),
+)
+
+
+def instrument_tool(func):
+    """Record latency and outcome of an async MCP tool.
+    
+    A call counts as an error when it raises or returns a dict with an
+    ``error`` key.
+    
+    Args:
+        func: The async tool function.
+        
+    Returns:
+        The wrapped function, with its signature preserved for FastMCP.
+    """
+    latency = TOOL_LATENCY.labels(tool=func.__name__)
+    
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await func(*args, **kwargs)
+            if not (isinstance(result, dict) and "error" in result):
+                outcome = "ok"
+            return result
+        finally:
+            latency.observe(time.perf_counter() - started)
+            TOOL_CALLS.labels(tool=func.__name__, outcome=outcome).inc()
+    
+    return wrapper
+
+
+def instrument_operation(func):
+    """Record the latency of a blocking database operation.
+    
+    Args:
+        func: The database operation.
+        
+    Returns:
+        The wrapped function.
+    """
+    latency = DB_OPERATION_LATENCY.labels(operation=func.__name__)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            latency.observe(time.perf_counter() - started)
+    
+    return wrapper
+
+
+def record_rows(operation: str, count: int) -> None:
+    """Count rows a database operation returned or wrote.
+    
+    SQLite does not report how many rows a statement scanned, so this is
+    the size of the result, not the work done to produce it.
+    
+    Args:
+        operation: Operation name, matching its latency series.
+        count: Number of rows.
+    """
+    if count:
+        DB_RESULT_ROWS.labels(operation=operation).inc(count)
+
+
+def snapshot() -> dict:
+    """Summarize tool and database metrics as plain data.
+    
+    Only reads the metrics; series that were never used are reported as
+    zero rather than created.
+    
+    Returns:
+        Per-tool call counts, error counts and estimated latency
+        percentiles in ms, database operation and statement timings, and
+        collector gauges.
+    """
+    tools = {}
+    for labels, child in TOOL_LATENCY.series():
+        name = labels["tool"]
+        errors = TOOL_CALLS.find(tool=name, outcome="error")
+        tools[name] = {
+            "calls": child.count,
+            "errors": int(errors.value) if errors else 0,
+            "mean_ms": 1000 * child.sum / child.count if child.count else 0.0,
+            "p50_ms": 1000 * child.quantile(0.50),
+            "p95_ms": 1000 * child.quantile(0.95),
+            "p99_ms": 1000 * child.quantile(0.99),
+        }
+    
+    operations = {
+        labels["operation"]: {
+            "calls": child.count,
+            "mean_ms": 1000 * child.sum / child.count if child.count else 0.0,
+            "p99_ms": 1000 * child.quantile(0.99),
+        }
+        for labels, child in DB_OPERATION_LATENCY.series()
+    }
+    statements = {
+        labels["statement"]: {
+            "executions": child.count,
+            "mean_ms": 1000 * child.sum / child.count if child.count else 0.0,
+            "p99_ms": 1000 * child.quantile(0.99),
+        }
+        for labels, child in DB_STATEMENT_LATENCY.series()
+    }
+    
+    commits = DB_COMMITS.find()
+    commit = DB_COMMIT_LATENCY.find()
+    lock_wait = DB_LOCK_WAIT.find()
+    gauges: dict[str, float] = {}
+    for name, _, labels, value in registry.collect_gauges():
+        suffix = ",".join(f"{key}={value}" for key, value in labels.items())
+        gauges[f"{name}{{{suffix}}}" if suffix else name] = value
+    
+    return {
+        "tools": tools,
+        "db_operations": operations,
+        "db_statements": statements,
+        "commits": int(commits.value) if commits else 0,
+        "commit_p99_ms": 1000 * commit.quantile(0.99) if commit else 0.0,
+        "lock_wait_p99_ms": 1000 * lock_wait.quantile(0.99) if lock_wait else 0.0,
+        "gauges": gauges,
+    }
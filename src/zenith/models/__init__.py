@@ -1,3 +1,22 @@
-from .types import Account, Transaction, TransactionType
+from .money import MAX_MINOR_UNITS, MINOR_UNIT_DIGITS, from_minor_units, to_minor_units
+from .types import (
+    Account,
+    AccountPage,
+    AccountVerification,
+    Transaction,
+    TransactionPage,
+    TransactionType,
+)
 
-__all__ = ["Account", "Transaction", "TransactionType"]
+__all__ = [
+    "Account",
+    "AccountPage",
+    "AccountVerification",
+    "Transaction",
+    "TransactionPage",
+    "TransactionType",
+    "MAX_MINOR_UNITS",
+    "MINOR_UNIT_DIGITS",
+    "from_minor_units",
+    "to_minor_units",
+]
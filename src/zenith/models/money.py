@@ -0,0 +1,61 @@
+"""Conversion between decimal amounts and integer minor units."""
+
+import os
+
+
+# Decimal places of the currency's minor unit (2 for cents). Stored balances
+# are scaled by this, so it must not change once a database holds data.
+MINOR_UNIT_DIGITS = int(os.getenv("ZENITH_MINOR_UNIT_DIGITS", "2"))
+MINOR_UNIT_SCALE = 10 ** MINOR_UNIT_DIGITS
+
+# Largest amount or balance in minor units; SQLite integers are 64-bit
+MAX_MINOR_UNITS = 2 ** 63 - 1
+
+# Slack for binary float error when scaling, e.g. 0.1 * 100 = 10.000000000000002
+_SCALE_TOLERANCE = 1e-9
+
+
+def to_minor_units(amount: float) -> int:
+    """Convert a decimal amount to integer minor units.
+    
+    Args:
+        amount: Amount in major units, e.g. 12.34.
+        
+    Returns:
+        The amount in minor units, e.g. 1234.
+        
+    Raises:
+        ValueError: If the amount is not finite, has more decimal places
+            than the minor unit can represent, is nonzero but smaller than
+            one minor unit, or exceeds MAX_MINOR_UNITS.
+    """
+    scaled = amount * MINOR_UNIT_SCALE
+    try:
+        minor = round(scaled)
+    except (OverflowError, ValueError):
+        raise ValueError("Amount must be a finite number") from None
+    
+    if abs(scaled - minor) > _SCALE_TOLERANCE * max(1.0, abs(scaled)):
+        raise ValueError(
+            f"Amount must have at most {MINOR_UNIT_DIGITS} decimal places"
+        )
+    if minor == 0 and amount != 0:
+        # Within the tolerance of zero, e.g. 1e-12, but not zero itself
+        raise ValueError(f"Amount must be at least {from_minor_units(1)}")
+    if abs(minor) > MAX_MINOR_UNITS:
+        raise ValueError(
+            f"Amount must not exceed {MAX_MINOR_UNITS // MINOR_UNIT_SCALE}"
+        )
+    return minor
+
+
+def from_minor_units(value: int) -> float:
+    """Convert integer minor units back to a decimal amount.
+    
+    Args:
+        value: Amount in minor units.
+        
+    Returns:
+        The amount in major units.
+    """
+    return value / MINOR_UNIT_SCALE
@@ -1,6 +1,6 @@
 """Type definitions and constants for the banking system."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 class TransactionType:
@@ -8,23 +8,86 @@ class TransactionType:
     
     DEPOSIT = "DEPOSIT"
     WITHDRAWAL = "WITHDRAWAL"
+    TRANSFER_IN = "TRANSFER_IN"
+    TRANSFER_OUT = "TRANSFER_OUT"
+    
+    # Types that add to the balance; every other type subtracts
+    CREDITS = frozenset({DEPOSIT, TRANSFER_IN})
 
 
-@dataclass
+# Slotted: no per-instance __dict__, so ledger reads allocate less. Not
+# frozen, since frozen dataclasses make construction several times slower.
+@dataclass(slots=True)
 class Account:
-    """Represents a bank account."""
+    """Represents a bank account; ``balance`` is in minor units."""
     
     account_id: str
     holder_name: str
-    balance: float
+    balance: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
-    """Represents a transaction record."""
+    """Represents a transaction record; ``amount`` is in minor units.
+    
+    ``seq`` numbers an account's ledger rows from 1 and ``balance_after`` is
+    the account balance once this transaction was applied.
+    """
     
     transaction_id: str
     account_id: str
     type: str
-    amount: float
+    amount: int
     created_at: str
+    seq: int | None = None
+    balance_after: int | None = None
+
+
+@dataclass(slots=True)
+class TransactionPage:
+    """One page of an account's transaction history, newest first.
+    
+    ``next_cursor`` continues towards older transactions (pass it as
+    ``before``); ``prev_cursor`` continues towards newer ones (pass it as
+    ``after``). Either is None when there is nothing further that way.
+    ``transactions`` holds whatever the read's ``row_factory`` built, which
+    is Transaction objects by default.
+    """
+    
+    transactions: list[Transaction] = field(default_factory=list)
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
+@dataclass(slots=True)
+class AccountPage:
+    """One page of an account listing or search.
+    
+    ``next_cursor`` continues the listing after the last account and is
+    None on the last page.
+    """
+    
+    accounts: list[Account] = field(default_factory=list)
+    next_cursor: str | None = None
+
+
+@dataclass
+class AccountVerification:
+    """Result of checking an account's balance against its ledger.
+    
+    Verification replays the ledger from ``from_seq`` (the latest snapshot,
+    or 0 for a full check); ``ledger_balance`` is the balance the ledger
+    arrives at and ``balance`` the one stored on the account.
+    """
+    
+    account_id: str
+    balance: int
+    ledger_balance: int
+    from_seq: int
+    transactions_checked: int
+    problems: list[str] = field(default_factory=list)
+    
+    @property
+    def ok(self) -> bool:
+        """Whether the ledger and the stored balance agree."""
+        return not self.problems
@@ -1,122 +1,249 @@
 """FastMCP server with banking tools."""
 
+import asyncio
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import TypedDict
+
 from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
+from .analytics import FLOWS, RollupColumns, summarize
 from .database import (
-    initialize_database,
-    create_account as db_create_account,
-    get_account_by_id,
-    update_account_balance,
-    record_transaction,
-    get_transactions_by_account,
+    AccountNotFoundError,
+    BalanceLimitError,
+    IdempotencyConflictError,
+    InsufficientFundsError,
+    WriterUnavailableError,
+    aio,
+    create_backup as create_database_backup,
+    folded_in_background,
+    get_rollup_folder,
 )
-from .models import TransactionType
+from .metrics import instrument_tool, registry, snapshot
+from .models import AccountPage, TransactionType, from_minor_units, to_minor_units
+from .statements import STATEMENT_FORMATS, format_statement, stream_statement
 
 
 # Initialize the MCP server
 mcp = FastMCP("Banking Server")
 
+# Upper bound on rows returned by one export_statement call
+MAX_EXPORT_ROWS = 10_000
+
+# Window of get_ledger_summary when no start date is given, and its maximum
+DEFAULT_SUMMARY_DAYS = 30
+MAX_SUMMARY_DAYS = 366
+
+
+class BatchOperation(TypedDict):
+    """One entry of a batch deposit or withdrawal."""
+    
+    account_id: str
+    amount: float
+
 
 @mcp.tool()
-def create_account(holder_name: str) -> dict:
+@instrument_tool
+async def create_account(holder_name: str, idempotency_key: str | None = None) -> dict:
     """Create a new bank account.
     
     Args:
         holder_name: Name of the account holder.
-        
+        idempotency_key: Optional unique key; retrying with the same key
+            returns the original account instead of creating another.
+            
     Returns:
         Account details including the generated account ID.
     """
-    account = db_create_account(holder_name)
+    try:
+        account = await aio.create_account(holder_name, idempotency_key)
+    except IdempotencyConflictError as error:
+        return _idempotency_conflict(error)
+    except WriterUnavailableError as error:
+        return _writer_unavailable(error)
     
     return {
         "message": "Account created successfully",
         "account_id": account.account_id,
         "holder_name": account.holder_name,
-        "balance": account.balance,
+        "balance": from_minor_units(account.balance),
     }
 
 
 @mcp.tool()
-def deposit(account_id: str, amount: float) -> dict:
+@instrument_tool
+async def deposit(
+    account_id: str,
+    amount: float,
+    idempotency_key: str | None = None,
+) -> dict:
     """Add funds to an existing account.
     
     Args:
         account_id: The unique account identifier.
         amount: The amount to deposit (must be positive).
-        
+        idempotency_key: Optional unique key; retrying with the same key
+            returns the original result without depositing again.
+            
     Returns:
         Updated account balance or error message.
     """
     # Validate amount
     if amount <= 0:
         return {"error": "Amount must be positive"}
+    try:
+        minor_amount = to_minor_units(amount)
+    except ValueError as error:
+        return {"error": str(error)}
     
-    # Find account
-    account = get_account_by_id(account_id)
-    if account is None:
+    # Update balance and record transaction atomically
+    try:
+        _, new_balance = await aio.apply_transaction(
+            account_id,
+            TransactionType.DEPOSIT,
+            minor_amount,
+            idempotency_key,
+        )
+    except AccountNotFoundError:
         return {"error": "Account not found", "account_id": account_id}
-    
-    # Update balance
-    new_balance = account.balance + amount
-    update_account_balance(account_id, new_balance)
-    
-    # Record transaction
-    record_transaction(account_id, TransactionType.DEPOSIT, amount)
+    except BalanceLimitError as error:
+        return _balance_limit(error)
+    except IdempotencyConflictError as error:
+        return _idempotency_conflict(error)
+    except WriterUnavailableError as error:
+        return _writer_unavailable(error)
     
     return {
         "message": "Deposit successful",
         "account_id": account_id,
         "deposited": amount,
-        "new_balance": new_balance,
+        "new_balance": from_minor_units(new_balance),
     }
 
 
 @mcp.tool()
-def withdraw(account_id: str, amount: float) -> dict:
+@instrument_tool
+async def withdraw(
+    account_id: str,
+    amount: float,
+    idempotency_key: str | None = None,
+) -> dict:
     """Remove funds from an existing account.
     
     Args:
         account_id: The unique account identifier.
         amount: The amount to withdraw (must be positive).
-        
+        idempotency_key: Optional unique key; retrying with the same key
+            returns the original result without withdrawing again.
+            
     Returns:
         Updated account balance or error message.
     """
     # Validate amount
     if amount <= 0:
         return {"error": "Amount must be positive"}
+    try:
+        minor_amount = to_minor_units(amount)
+    except ValueError as error:
+        return {"error": str(error)}
     
-    # Find account
-    account = get_account_by_id(account_id)
-    if account is None:
+    # Check funds, update balance and record transaction atomically
+    try:
+        _, new_balance = await aio.apply_transaction(
+            account_id,
+            TransactionType.WITHDRAWAL,
+            minor_amount,
+            idempotency_key,
+        )
+    except AccountNotFoundError:
         return {"error": "Account not found", "account_id": account_id}
-    
-    # Check sufficient funds
-    if account.balance < amount:
+    except InsufficientFundsError as error:
         return {
             "error": "Insufficient funds",
-            "balance": account.balance,
+            "balance": from_minor_units(error.balance),
             "requested": amount,
         }
-    
-    # Update balance
-    new_balance = account.balance - amount
-    update_account_balance(account_id, new_balance)
-    
-    # Record transaction
-    record_transaction(account_id, TransactionType.WITHDRAWAL, amount)
+    except IdempotencyConflictError as error:
+        return _idempotency_conflict(error)
+    except WriterUnavailableError as error:
+        return _writer_unavailable(error)
     
     return {
         "message": "Withdrawal successful",
         "account_id": account_id,
         "withdrawn": amount,
-        "new_balance": new_balance,
+        "new_balance": from_minor_units(new_balance),
+    }
+
+
+@mcp.tool()
+@instrument_tool
+async def transfer(
+    from_account_id: str,
+    to_account_id: str,
+    amount: float,
+    idempotency_key: str | None = None,
+) -> dict:
+    """Move funds from one account to another.
+    
+    Args:
+        from_account_id: The account to debit.
+        to_account_id: The account to credit.
+        amount: The amount to transfer (must be positive).
+        idempotency_key: Optional unique key; retrying with the same key
+            returns the original result without transferring again.
+            
+    Returns:
+        Both accounts' new balances or error message.
+    """
+    # Validate amount
+    if amount <= 0:
+        return {"error": "Amount must be positive"}
+    try:
+        minor_amount = to_minor_units(amount)
+    except ValueError as error:
+        return {"error": str(error)}
+    if from_account_id == to_account_id:
+        return {"error": "Cannot transfer to the same account"}
+    
+    # Debit, credit and both ledger rows commit together or not at all
+    try:
+        debit, credit = await aio.transfer(
+            from_account_id,
+            to_account_id,
+            minor_amount,
+            idempotency_key,
+        )
+    except AccountNotFoundError as error:
+        return {"error": "Account not found", "account_id": error.account_id}
+    except InsufficientFundsError as error:
+        return {
+            "error": "Insufficient funds",
+            "balance": from_minor_units(error.balance),
+            "requested": amount,
+        }
+    except BalanceLimitError as error:
+        return _balance_limit(error)
+    except IdempotencyConflictError as error:
+        return _idempotency_conflict(error)
+    except WriterUnavailableError as error:
+        return _writer_unavailable(error)
+    
+    return {
+        "message": "Transfer successful",
+        "from_account_id": from_account_id,
+        "to_account_id": to_account_id,
+        "transferred": amount,
+        "from_balance": from_minor_units(debit.balance_after),
+        "to_balance": from_minor_units(credit.balance_after),
     }
 
 
 @mcp.tool()
-def get_balance(account_id: str) -> dict:
+@instrument_tool
+async def get_balance(account_id: str) -> dict:
     """Check the current balance of an account.
     
     Args:
@@ -125,49 +252,574 @@ def get_balance(account_id: str) -> dict:
     Returns:
         Current balance or error message.
     """
-    account = get_account_by_id(account_id)
+    account = await aio.get_account_by_id(account_id)
     if account is None:
         return {"error": "Account not found", "account_id": account_id}
     
     return {
         "account_id": account_id,
         "holder_name": account.holder_name,
-        "balance": account.balance,
+        "balance": from_minor_units(account.balance),
     }
 
 
 @mcp.tool()
-def get_transactions(account_id: str, limit: int = 10) -> dict:
+@instrument_tool
+async def find_accounts(
+    holder_name_prefix: str,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> dict:
+    """Search accounts by the start of the holder's name, ignoring case.
+    
+    Args:
+        holder_name_prefix: Start of the holder name, e.g. "ali" for "Alice".
+        limit: Maximum number of accounts to return (default 20, max 500).
+        cursor: ``next_cursor`` from a previous response of the same search.
+        
+    Returns:
+        Matching accounts ordered by name, with a cursor for the next page,
+        or error message.
+    """
+    try:
+        page = await aio.find_accounts(holder_name_prefix, limit, cursor)
+    except ValueError as error:
+        return {"error": str(error)}
+    
+    return _account_page_response(page)
+
+
+@mcp.tool()
+@instrument_tool
+async def list_accounts(cursor: str | None = None, limit: int = 20) -> dict:
+    """List every account, ordered by account ID.
+    
+    Args:
+        cursor: ``next_cursor`` from a previous response.
+        limit: Maximum number of accounts to return (default 20, max 500).
+        
+    Returns:
+        Page of accounts with a cursor for the next page, or error message.
+    """
+    try:
+        page = await aio.list_accounts(cursor, limit)
+    except ValueError as error:
+        return {"error": str(error)}
+    
+    return _account_page_response(page)
+
+
+@mcp.tool()
+@instrument_tool
+async def get_transactions(
+    account_id: str,
+    limit: int = 10,
+    before: str | None = None,
+    after: str | None = None,
+) -> dict:
     """View recent transactions for an account.
     
     Args:
         account_id: The unique account identifier.
-        limit: Maximum number of transactions to return (default 10).
+        limit: Maximum number of transactions to return (default 10, max 1000).
+        before: Cursor from a previous response; page towards older entries.
+        after: Cursor from a previous response; page towards newer entries.
         
     Returns:
-        List of recent transactions or error message.
+        Page of transactions with pagination cursors, or error message.
     """
     # Verify account exists
-    account = get_account_by_id(account_id)
+    account = await aio.get_account_by_id(account_id)
+    if account is None:
+        return {"error": "Account not found", "account_id": account_id}
+    
+    # Rows go straight into response entries, without Transaction objects
+    try:
+        page = await aio.get_transactions_page(
+            account_id,
+            limit,
+            before=before,
+            after=after,
+            row_factory=transaction_entry,
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    
+    return {
+        "account_id": account_id,
+        "transaction_count": len(page.transactions),
+        "transactions": page.transactions,
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    }
+
+
+@mcp.tool()
+@instrument_tool
+async def get_balance_at(account_id: str, timestamp: str) -> dict:
+    """Check what an account's balance was at a point in time.
+    
+    Args:
+        account_id: The unique account identifier.
+        timestamp: ISO 8601 date/time; without an offset it is taken as UTC.
+        
+    Returns:
+        The balance as of that moment, or error message.
+    """
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return {"error": "Invalid timestamp", "timestamp": timestamp}
+    
+    try:
+        balance = await aio.get_balance_at(account_id, moment)
+    except AccountNotFoundError:
+        return {"error": "Account not found", "account_id": account_id}
+    
+    return {
+        "account_id": account_id,
+        "timestamp": timestamp,
+        "balance": from_minor_units(balance),
+    }
+
+
+@mcp.tool()
+@instrument_tool
+async def verify_account(account_id: str, full: bool = False) -> dict:
+    """Audit an account's balance against its transaction ledger.
+    
+    Args:
+        account_id: The unique account identifier.
+        full: Replay the whole ledger instead of starting at the latest snapshot.
+        
+    Returns:
+        Verification outcome with any problems found, or error message.
+    """
+    try:
+        result = await aio.verify_account(account_id, full)
+    except AccountNotFoundError:
+        return {"error": "Account not found", "account_id": account_id}
+    
+    return {
+        "account_id": account_id,
+        "ok": result.ok,
+        "balance": from_minor_units(result.balance),
+        "ledger_balance": from_minor_units(result.ledger_balance),
+        "from_seq": result.from_seq,
+        "transactions_checked": result.transactions_checked,
+        "problems": result.problems,
+    }
+
+
+@mcp.tool()
+@instrument_tool
+async def batch_deposit(operations: list[BatchOperation]) -> dict:
+    """Add funds to many accounts in a single transaction.
+    
+    Args:
+        operations: List of {"account_id", "amount"} entries, applied in order.
+        
+    Returns:
+        Per-item results in request order, each a success or an error.
+    """
+    return await _apply_batch(operations, TransactionType.DEPOSIT, "deposited")
+
+
+@mcp.tool()
+@instrument_tool
+async def batch_withdraw(operations: list[BatchOperation]) -> dict:
+    """Remove funds from many accounts in a single transaction.
+    
+    Args:
+        operations: List of {"account_id", "amount"} entries, applied in order.
+        
+    Returns:
+        Per-item results in request order, each a success or an error.
+    """
+    return await _apply_batch(operations, TransactionType.WITHDRAWAL, "withdrawn")
+
+
+@mcp.tool()
+@instrument_tool
+async def batch_get_balance(account_ids: list[str]) -> dict:
+    """Check the balances of many accounts at once.
+    
+    Args:
+        account_ids: The account identifiers to look up.
+        
+    Returns:
+        Per-account balances in request order, or an error for unknown IDs.
+    """
+    accounts = await aio.get_accounts_by_ids(account_ids)
+    
+    results = []
+    for account_id in account_ids:
+        account = accounts.get(account_id)
+        if account is None:
+            results.append({"error": "Account not found", "account_id": account_id})
+        else:
+            results.append({
+                "account_id": account_id,
+                "holder_name": account.holder_name,
+                "balance": from_minor_units(account.balance),
+            })
+    
+    return {
+        "found": sum("error" not in result for result in results),
+        "missing": sum("error" in result for result in results),
+        "balances": results,
+    }
+
+
+@mcp.tool()
+@instrument_tool
+async def get_ledger_summary(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    top_accounts: int = 10,
+) -> dict:
+    """Summarize ledger activity per day over a window of days.
+    
+    Args:
+        start_date: First day, ISO 8601 (YYYY-MM-DD); defaults to 30 days
+            before the end date.
+        end_date: Last day, inclusive; defaults to today (UTC).
+        top_accounts: Number of busiest accounts to list.
+        
+    Returns:
+        Deposits, withdrawals, transfers and net flow for each day and for
+        the window, and the accounts with the most transactions, or error
+        message. Ledger rows written in the last few seconds may not be
+        counted yet; ``stale`` is true when folding is failing and the
+        summary may leave out older rows too.
+    """
+    try:
+        end = date.fromisoformat(end_date) if end_date else datetime.now(timezone.utc).date()
+        start = (
+            date.fromisoformat(start_date)
+            if start_date
+            else end - timedelta(days=DEFAULT_SUMMARY_DAYS - 1)
+        )
+    except ValueError:
+        return {"error": "Invalid date", "start_date": start_date, "end_date": end_date}
+    if (end - start).days >= MAX_SUMMARY_DAYS:
+        return {"error": f"Window cannot exceed {MAX_SUMMARY_DAYS} days"}
+    
+    # A background folder keeps the rollups within its interval of the ledger;
+    # without one they are folded here. Either way a failed fold still
+    # leaves the rollups folded so far to serve
+    if folded_in_background():
+        folder = get_rollup_folder()
+        stale = folder is not None and folder.failing
+    else:
+        try:
+            await aio.refresh_rollups()
+        except Exception:
+            stale = True
+        else:
+            stale = False
+    rows = await aio.read_rollups(start.isoformat(), end.isoformat())
+    try:
+        summary = await aio.run_in_executor(
+            summarize,
+            RollupColumns.from_rows(rows),
+            start,
+            end,
+            top_accounts,
+        )
+    except ValueError as error:
+        return {"error": str(error)}
+    
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "stale": stale,
+        "days": [{"date": day["date"]} | _flows_response(day) for day in summary["days"]],
+        "totals": _flows_response(summary["totals"]),
+        "top_accounts": [
+            {
+                "account_id": account["account_id"],
+                "transactions": account["transactions"],
+                "volume": from_minor_units(account["volume"]),
+            }
+            for account in summary["top_accounts"]
+        ],
+    }
+
+
+@mcp.tool()
+@instrument_tool
+async def get_server_stats() -> dict:
+    """Report server performance metrics.
+    
+    Returns:
+        Per-tool call counts and latency percentiles, database operation
+        and commit timings, and connection pool and cache gauges.
+    """
+    return snapshot()
+
+
+@mcp.tool()
+@instrument_tool
+async def create_backup() -> dict:
+    """Take an online backup of the database without pausing writes.
+    
+    Admin tool: refused unless ZENITH_ADMIN_TOOLS is 1. The backup is
+    written to a new timestamped directory under ZENITH_BACKUP_DIR.
+    
+    Returns:
+        Backup directory, file count, size in bytes and seconds taken, or
+        error message.
+    """
+    if os.getenv("ZENITH_ADMIN_TOOLS") != "1":
+        return {"error": "Admin tools are disabled"}
+    
+    # A backup runs for a while; keep it off the database executor so it
+    # never holds up the threads serving other tools
+    summary = await asyncio.to_thread(create_database_backup)
+    return {
+        "path": summary["path"],
+        "shards": summary["shards"],
+        "files": summary["files"],
+        "size_bytes": summary["size_bytes"],
+        "seconds": round(summary["seconds"], 3),
+    }
+
+
+@mcp.tool()
+@instrument_tool
+async def export_statement(
+    account_id: str,
+    format: str = "ndjson",
+    start: str | None = None,
+    end: str | None = None,
+    cursor: str | None = None,
+    max_rows: int = 1000,
+) -> dict:
+    """Export an account statement for a date range as NDJSON or CSV.
+    
+    Long statements are returned in pieces: pass ``next_cursor`` back as
+    ``cursor`` to continue. The HTTP route /accounts/{account_id}/statement
+    streams the whole range in one response.
+    
+    Args:
+        account_id: The unique account identifier.
+        format: Either 'ndjson' or 'csv'.
+        start: ISO 8601 start of the range (inclusive); omit for the beginning.
+        end: ISO 8601 end of the range (exclusive); omit for now.
+        cursor: Cursor from a previous response; continue after it.
+        max_rows: Maximum rows in this piece (at most 10000).
+        
+    Returns:
+        Statement text with row count and continuation cursor, or error message.
+    """
+    if format not in STATEMENT_FORMATS:
+        return {"error": f"Unsupported format: {format}"}
+    if not 1 <= max_rows <= MAX_EXPORT_ROWS:
+        return {"error": f"max_rows must be between 1 and {MAX_EXPORT_ROWS}"}
+    
+    try:
+        start_at, end_at = _parse_range(start, end)
+    except ValueError as error:
+        return {"error": str(error)}
+    
+    account = await aio.get_account_by_id(account_id)
     if account is None:
         return {"error": "Account not found", "account_id": account_id}
     
-    transactions = get_transactions_by_account(account_id, limit)
+    try:
+        transactions, next_cursor = await aio.get_statement_chunk(
+            account_id,
+            start_at,
+            end_at,
+            cursor,
+            max_rows,
+        )
+    except ValueError as error:
+        return {"error": str(error)}
     
     return {
         "account_id": account_id,
-        "transaction_count": len(transactions),
-        "transactions": [
+        "format": format,
+        "row_count": len(transactions),
+        "data": format_statement(transactions, format, header=cursor is None),
+        "next_cursor": next_cursor,
+    }
+
+
+@mcp.custom_route("/accounts/{account_id}/statement", methods=["GET"])
+async def statement(request: Request) -> StreamingResponse | JSONResponse:
+    """Stream an account statement; query parameters format, start and end."""
+    account_id = request.path_params["account_id"]
+    format = request.query_params.get("format", "ndjson")
+    if format not in STATEMENT_FORMATS:
+        return JSONResponse({"error": f"Unsupported format: {format}"}, status_code=400)
+    
+    try:
+        start_at, end_at = _parse_range(
+            request.query_params.get("start"),
+            request.query_params.get("end"),
+        )
+    except ValueError as error:
+        return JSONResponse({"error": str(error)}, status_code=400)
+    
+    account = await aio.get_account_by_id(account_id)
+    if account is None:
+        return JSONResponse(
+            {"error": "Account not found", "account_id": account_id},
+            status_code=404,
+        )
+    
+    return StreamingResponse(
+        stream_statement(aio.iter_statement(account_id, start_at, end_at), format),
+        media_type=STATEMENT_FORMATS[format],
+    )
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    """Serve all metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+def transaction_entry(row: tuple) -> dict:
+    """Build a get_transactions entry from a ledger row tuple.
+    
+    Args:
+        row: Row in ``TRANSACTION_COLUMNS`` order, as passed to row factories.
+        
+    Returns:
+        The entry as returned by the get_transactions tool.
+    """
+    transaction_id, _, transaction_type, amount, created_at, _, balance_after, _ = row
+    return {
+        "transaction_id": transaction_id,
+        "type": transaction_type,
+        "amount": from_minor_units(amount),
+        "balance_after": from_minor_units(balance_after),
+        "created_at": created_at,
+    }
+
+
+def _account_page_response(page: AccountPage) -> dict:
+    return {
+        "account_count": len(page.accounts),
+        "accounts": [
             {
-                "transaction_id": txn.transaction_id,
-                "type": txn.type,
-                "amount": txn.amount,
-                "created_at": txn.created_at,
+                "account_id": account.account_id,
+                "holder_name": account.holder_name,
+                "balance": from_minor_units(account.balance),
             }
-            for txn in transactions
+            for account in page.accounts
         ],
+        "next_cursor": page.next_cursor,
     }
 
 
-# Initialize database when module loads
-initialize_database()
+def _flows_response(flows: dict) -> dict:
+    response = {
+        name: {"count": flows[name]["count"], "amount": from_minor_units(flows[name]["amount"])}
+        for name in FLOWS
+    }
+    response["net_flow"] = from_minor_units(flows["net_flow"])
+    return response
+
+
+def _balance_limit(error: BalanceLimitError) -> dict:
+    return {
+        "error": "Balance limit exceeded",
+        "account_id": error.account_id,
+        "balance": from_minor_units(error.balance),
+        "requested": from_minor_units(error.requested),
+    }
+
+
+def _idempotency_conflict(error: IdempotencyConflictError) -> dict:
+    return {
+        "error": "Idempotency key already used for a different request",
+        "idempotency_key": error.key,
+    }
+
+
+def _writer_unavailable(error: WriterUnavailableError) -> dict:
+    return {
+        "error": "Writer unavailable; the write may or may not have been applied",
+        "detail": str(error),
+    }
+
+
+def _parse_range(
+    start: str | None,
+    end: str | None,
+) -> tuple[datetime | None, datetime | None]:
+    try:
+        return (
+            datetime.fromisoformat(start) if start else None,
+            datetime.fromisoformat(end) if end else None,
+        )
+    except ValueError:
+        raise ValueError("Invalid timestamp") from None
+
+
+async def _apply_batch(
+    operations: list[BatchOperation],
+    transaction_type: str,
+    amount_key: str,
+) -> dict:
+    results: list[dict] = [{} for _ in operations]
+    items = []
+    positions = []
+    
+    # Reject invalid amounts up front, like the single-item tools
+    for index, operation in enumerate(operations):
+        error = None
+        if operation["amount"] <= 0:
+            error = "Amount must be positive"
+        else:
+            try:
+                minor_amount = to_minor_units(operation["amount"])
+            except ValueError as exc:
+                error = str(exc)
+            else:
+                items.append((operation["account_id"], minor_amount))
+                positions.append(index)
+        if error is not None:
+            results[index] = {"error": error, "account_id": operation["account_id"]}
+    
+    try:
+        outcomes = await aio.apply_transactions(transaction_type, items) if items else []
+    except WriterUnavailableError as error:
+        return _writer_unavailable(error)
+    
+    for index, outcome in zip(positions, outcomes):
+        if isinstance(outcome, AccountNotFoundError):
+            results[index] = {
+                "error": "Account not found",
+                "account_id": outcome.account_id,
+            }
+        elif isinstance(outcome, InsufficientFundsError):
+            results[index] = {
+                "error": "Insufficient funds",
+                "account_id": outcome.account_id,
+                "balance": from_minor_units(outcome.balance),
+                "requested": from_minor_units(outcome.requested),
+            }
+        elif isinstance(outcome, BalanceLimitError):
+            results[index] = _balance_limit(outcome)
+        else:
+            transaction, new_balance = outcome
+            results[index] = {
+                "account_id": transaction.account_id,
+                amount_key: from_minor_units(transaction.amount),
+                "new_balance": from_minor_units(new_balance),
+            }
+    
+    failed = sum("error" in result for result in results)
+    return {
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }
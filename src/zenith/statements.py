@@ -0,0 +1,112 @@
+"""Account statement export in NDJSON and CSV."""
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+
+from .models import Transaction, from_minor_units
+
+
+# Export format name -> HTTP media type
+STATEMENT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+STATEMENT_COLUMNS = (
+    "seq",
+    "transaction_id",
+    "created_at",
+    "type",
+    "amount",
+    "balance_after",
+)
+
+
+def statement_row(transaction: Transaction) -> dict:
+    """Convert a transaction into a statement line with decimal amounts.
+    
+    Args:
+        transaction: The transaction to export.
+        
+    Returns:
+        Dictionary keyed by STATEMENT_COLUMNS.
+    """
+    return {
+        "seq": transaction.seq,
+        "transaction_id": transaction.transaction_id,
+        "created_at": transaction.created_at,
+        "type": transaction.type,
+        "amount": from_minor_units(transaction.amount),
+        "balance_after": from_minor_units(transaction.balance_after),
+    }
+
+
+def format_statement(
+    transactions: Iterable[Transaction],
+    format: str,
+    header: bool = False,
+) -> str:
+    """Render transactions as NDJSON lines or CSV rows.
+    
+    Args:
+        transactions: Transactions to render, in output order.
+        format: Either 'ndjson' or 'csv'.
+        header: Prepend the CSV header row (ignored for NDJSON).
+        
+    Returns:
+        The rendered text, one line per transaction.
+        
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if format == "ndjson":
+        return "".join(
+            json.dumps(statement_row(transaction)) + "\n"
+            for transaction in transactions
+        )
+    if format != "csv":
+        raise ValueError(f"Unsupported format: {format}")
+    
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, STATEMENT_COLUMNS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(statement_row(transaction) for transaction in transactions)
+    return buffer.getvalue()
+
+
+async def stream_statement(
+    transactions: AsyncIterable[Transaction],
+    format: str,
+    rows_per_chunk: int = 500,
+) -> AsyncIterator[str]:
+    """Render a transaction stream as text chunks of bounded size.
+    
+    Args:
+        transactions: Transactions in output order, e.g. from
+            ``aio.iter_statement``.
+        format: Either 'ndjson' or 'csv'.
+        rows_per_chunk: Rows rendered into each yielded chunk.
+        
+    Yields:
+        Text chunks; for CSV the first chunk starts with the header row.
+        
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if format not in STATEMENT_FORMATS:
+        raise ValueError(f"Unsupported format: {format}")
+    
+    header = format == "csv"
+    batch: list[Transaction] = []
+    async for transaction in transactions:
+        batch.append(transaction)
+        if len(batch) >= rows_per_chunk:
+            yield format_statement(batch, format, header)
+            header = False
+            batch = []
+    
+    if batch or header:
+        yield format_statement(batch, format, header)
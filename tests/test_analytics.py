@@ -0,0 +1,103 @@
+"""Tests for ledger summaries over rollup columns."""
+
+from datetime import date
+
+import pytest
+
+from src.zenith import analytics
+from src.zenith.analytics import RollupColumns, summarize
+
+
+ROWS = [
+    ("2026-01-01", "acct-a", "DEPOSIT", 2, 500),
+    ("2026-01-01", "acct-b", "DEPOSIT", 1, 100),
+    ("2026-01-03", "acct-a", "WITHDRAWAL", 1, 200),
+    ("2026-01-03", "acct-a", "TRANSFER_OUT", 1, 50),
+    ("2026-01-03", "acct-c", "TRANSFER_IN", 1, 50),
+    ("2026-01-03", "acct-b", "DEPOSIT", 2, 100),
+    ("2026-01-03", "acct-c", "WITHDRAWAL", 1, 50),
+]
+
+
+@pytest.fixture
+def without_numpy(monkeypatch):
+    """Force the pure-Python aggregation path."""
+    monkeypatch.setattr(analytics, "np", None)
+
+
+class TestSummarize:
+    """Tests for summarize()."""
+    
+    def test_daily_flows_and_totals(self, without_numpy):
+        """Each day of the window should be listed, quiet days included."""
+        summary = summarize(
+            RollupColumns.from_rows(ROWS),
+            date(2026, 1, 1),
+            date(2026, 1, 3),
+        )
+        
+        assert [day["date"] for day in summary["days"]] == [
+            "2026-01-01",
+            "2026-01-02",
+            "2026-01-03",
+        ]
+        assert summary["days"][0]["deposits"] == {"count": 3, "amount": 600}
+        assert summary["days"][1]["net_flow"] == 0
+        assert summary["days"][2]["transfers"] == {"count": 1, "amount": 50}
+        assert summary["days"][2]["net_flow"] == -150
+        assert summary["totals"]["withdrawals"] == {"count": 2, "amount": 250}
+        assert summary["totals"]["net_flow"] == 450
+    
+    def test_top_accounts_ranked_by_count_then_volume(self, without_numpy):
+        """Ties on transaction count should go to the larger volume, then ID."""
+        summary = summarize(
+            RollupColumns.from_rows(ROWS),
+            date(2026, 1, 1),
+            date(2026, 1, 3),
+            top_accounts=2,
+        )
+        
+        assert summary["top_accounts"] == [
+            {"account_id": "acct-a", "transactions": 4, "volume": 750},
+            {"account_id": "acct-b", "transactions": 3, "volume": 200},
+        ]
+    
+    def test_empty_window(self, without_numpy):
+        """A window without rollups should report zeros, not fail."""
+        summary = summarize(RollupColumns.from_rows([]), date(2026, 1, 1), date(2026, 1, 1))
+        
+        assert summary["totals"]["deposits"] == {"count": 0, "amount": 0}
+        assert summary["top_accounts"] == []
+    
+    def test_rejects_inverted_window(self):
+        """The end of the window cannot come before its start."""
+        with pytest.raises(ValueError):
+            summarize(RollupColumns(), date(2026, 1, 2), date(2026, 1, 1))
+    
+    def test_overflowing_amounts_stay_exact(self, monkeypatch):
+        """Sums past 64 bits should be exact on either path."""
+        columns = RollupColumns.from_rows([
+            ("2026-01-01", "acct-a", "DEPOSIT", 1, 2 ** 62),
+            ("2026-01-01", "acct-b", "DEPOSIT", 1, 2 ** 62),
+            ("2026-01-01", "acct-c", "DEPOSIT", 1, 2 ** 63 + 1),
+        ])
+        window = (date(2026, 1, 1), date(2026, 1, 1))
+        
+        default = summarize(columns, *window)
+        monkeypatch.setattr(analytics, "np", None)
+        python = summarize(columns, *window)
+        
+        assert default == python
+        assert python["totals"]["deposits"]["amount"] == 2 ** 64 + 1
+        assert python["top_accounts"][0]["volume"] == 2 ** 63 + 1
+    
+    def test_numpy_matches_python(self, monkeypatch):
+        """The vectorized path should give exactly the pure-Python results."""
+        pytest.importorskip("numpy")
+        columns = RollupColumns.from_rows(ROWS)
+        window = (date(2026, 1, 1), date(2026, 1, 3))
+        
+        vectorized = summarize(columns, *window, top_accounts=3)
+        monkeypatch.setattr(analytics, "np", None)
+        
+        assert vectorized == summarize(columns, *window, top_accounts=3)
@@ -0,0 +1,128 @@
+"""Tests for the benchmark harness."""
+
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+os.environ["ZENITH_TEST_MODE"] = "1"
+
+from src.zenith import bench
+from src.zenith.bench import (
+    BenchConfig,
+    compare_reports,
+    main,
+    parse_mix,
+    percentile,
+    run_benchmark,
+    run_row_benchmark,
+    summarize,
+)
+from src.zenith.database import get_account_cache
+from src.zenith.database.connection import close_connections
+
+
+@pytest.fixture
+def bench_db(tmp_path, monkeypatch):
+    """Point the database at a throwaway file for the benchmark run."""
+    close_connections()
+    get_account_cache().clear()
+    monkeypatch.setenv("ZENITH_DATABASE_PATH", str(tmp_path / "bench.db"))
+    monkeypatch.setenv("ZENITH_SHARDS", "1")
+    
+    yield
+    
+    close_connections()
+    get_account_cache().clear()
+
+
+class TestStatistics:
+    """Tests for the summary helpers."""
+    
+    def test_percentile_nearest_rank(self):
+        """Percentiles should pick the nearest-rank sample."""
+        samples = [float(i) for i in range(1, 101)]
+        
+        assert percentile(samples, 0.50) == 50.0
+        assert percentile(samples, 0.99) == 99.0
+        assert percentile([], 0.99) == 0.0
+    
+    def test_summarize_reports_throughput(self):
+        """Summaries should convert to ms and compute ops/s."""
+        summary = summarize([0.001, 0.002, 0.003, 0.004], errors=1, elapsed=2.0)
+        
+        assert summary["count"] == 4
+        assert summary["errors"] == 1
+        assert summary["ops_per_sec"] == 2.0
+        assert summary["p50_ms"] == pytest.approx(2.0)
+    
+    def test_parse_mix_rejects_unknown_tool(self):
+        """Mixes should only name known tools."""
+        assert parse_mix("get_balance=0.8,deposit=0.2") == {
+            "get_balance": 0.8,
+            "deposit": 0.2,
+        }
+        with pytest.raises(ValueError):
+            parse_mix("transfer=1")
+    
+    def test_compare_flags_regressions(self):
+        """Throughput drops and p99 rises beyond tolerance are regressions."""
+        def report(ops, p99):
+            summary = {"count": 10, "ops_per_sec": ops, "p99_ms": p99}
+            return {"total": summary, "tools": {"deposit": summary}}
+        
+        assert compare_reports(report(100, 5.0), report(100, 5.0)) == []
+        assert len(compare_reports(report(50, 5.0), report(100, 5.0))) == 2
+        assert len(compare_reports(report(100, 9.0), report(100, 5.0))) == 2
+
+
+class TestInProcessRun:
+    """Tests for running the harness against the in-process server."""
+    
+    def test_fixed_operation_count(self, bench_db):
+        """A run capped by operation count should perform exactly that many."""
+        config = BenchConfig(clients=3, operations=30, accounts=3)
+        
+        report = asyncio.run(run_benchmark(config))
+        
+        assert report["total"]["count"] + report["total"]["errors"] == 30
+        assert report["total"]["errors"] == 0
+        assert set(report["tools"]) == set(config.mix)
+    
+    def test_error_results_count_as_errors(self, bench_db, monkeypatch):
+        """Calls answered with an error dict should not count as samples."""
+        monkeypatch.setattr(bench, "INITIAL_DEPOSIT", 0.0)
+        config = BenchConfig(clients=1, operations=5, accounts=1, mix={"withdraw": 1.0})
+        
+        report = asyncio.run(run_benchmark(config))
+        
+        assert report["total"]["count"] == 0
+        assert report["total"]["errors"] == 5
+    
+    def test_default_run_uses_a_scratch_database(self, monkeypatch, capsys):
+        """Without --database the run should not touch the configured file."""
+        close_connections()
+        monkeypatch.delenv("ZENITH_DATABASE_PATH", raising=False)
+        used = []
+        client_target = bench._client_target
+        
+        def recording_target(config):
+            used.append(os.environ["ZENITH_DATABASE_PATH"])
+            return client_target(config)
+        
+        monkeypatch.setattr(bench, "_client_target", recording_target)
+        
+        assert main(["inprocess", "--clients", "1", "--operations", "3", "--accounts", "1"]) == 0
+        assert not Path(used[0]).exists()
+        assert "ZENITH_DATABASE_PATH" not in os.environ
+        get_account_cache().clear()
+    
+    def test_row_benchmark_reports_both_paths(self, bench_db):
+        """The row benchmark should time the model and row factory paths."""
+        report = run_row_benchmark(rows=50, repeat=2)
+        
+        assert set(report["paths"]) == {"models", "row_factory"}
+        for path in report["paths"].values():
+            assert path["us_per_row"] > 0
+            assert path["peak_kib"] > 0
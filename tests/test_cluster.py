@@ -0,0 +1,190 @@
+"""Tests for multi-worker mode: write forwarding to the writer process."""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Future
+
+import pytest
+
+os.environ["ZENITH_TEST_MODE"] = "1"
+
+from src.zenith.cluster import _writer_main
+from src.zenith.database import InsufficientFundsError, aio, get_account_cache
+from src.zenith.database.connection import close_connections
+from src.zenith.database.ipc import (
+    WRITER_RESTARTED,
+    WriterClient,
+    WriterUnavailableError,
+    encode_reply,
+    set_writer_client,
+)
+from src.zenith.models import TransactionType
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    """Run a writer process on a throwaway database and route writes to it."""
+    close_connections()
+    get_account_cache().clear()
+    monkeypatch.setenv("ZENITH_DATABASE_PATH", str(tmp_path / "cluster.db"))
+    monkeypatch.setenv("ZENITH_SHARDS", "1")
+    
+    context = multiprocessing.get_context("spawn")
+    requests = context.Queue()
+    responses = context.Queue()
+    process = context.Process(target=_writer_main, args=(requests, [responses]))
+    process.start()
+    
+    client = WriterClient(0, requests, responses, timeout=30.0)
+    set_writer_client(client)
+    
+    yield client
+    
+    set_writer_client(None)
+    requests.put(None)
+    process.join(timeout=30)
+    if process.is_alive():
+        process.terminate()
+    responses.put(None)
+    close_connections()
+    get_account_cache().clear()
+
+
+class TestWriteForwarding:
+    """Tests for aio writes served by the writer process."""
+    
+    def test_writes_round_trip(self, writer):
+        """Forwarded writes should be applied and visible to local reads."""
+        async def scenario():
+            account = await aio.create_account("Alice")
+            await asyncio.gather(*(
+                aio.apply_transaction(account.account_id, TransactionType.DEPOSIT, 100)
+                for _ in range(20)
+            ))
+            return account.account_id, await aio.get_account_by_id(account.account_id)
+        
+        account_id, account = asyncio.run(scenario())
+        
+        assert account is not None
+        assert account.account_id == account_id
+        assert account.balance == 2000
+    
+    def test_errors_propagate(self, writer):
+        """Exceptions raised in the writer should be re-raised in the worker."""
+        async def scenario():
+            account = await aio.create_account("Bob")
+            await aio.apply_transaction(account.account_id, TransactionType.WITHDRAWAL, 500)
+        
+        with pytest.raises(InsufficientFundsError) as error:
+            asyncio.run(scenario())
+        
+        assert error.value.requested == 500
+    
+    def test_batch_is_forwarded(self, writer):
+        """Batch writes should return per-item outcomes from the writer."""
+        async def scenario():
+            account = await aio.create_account("Carol")
+            return await aio.apply_transactions(
+                TransactionType.DEPOSIT,
+                [(account.account_id, 100), ("missing", 100)],
+            )
+        
+        results = asyncio.run(scenario())
+        
+        assert results[0][1] == 100
+        assert isinstance(results[1], Exception)
+    
+    def test_transfer_is_forwarded(self, writer):
+        """Transfers should run in the writer process like other writes."""
+        async def scenario():
+            source = await aio.create_account("Dan")
+            target = await aio.create_account("Eve")
+            await aio.apply_transaction(source.account_id, TransactionType.DEPOSIT, 100)
+            return await aio.transfer(source.account_id, target.account_id, 40)
+        
+        debit, credit = asyncio.run(scenario())
+        
+        assert (debit.balance_after, credit.balance_after) == (60, 40)
+
+
+class TestWriterClient:
+    """Tests for the worker-side client without a writer process."""
+    
+    def test_restart_fails_pending_writes(self):
+        """A writer restart should fail every write still waiting for a reply."""
+        context = multiprocessing.get_context("spawn")
+        responses = context.Queue()
+        client = WriterClient(0, context.Queue(), responses)
+        
+        future = client.submit("create_account", "Alice")
+        responses.put(WRITER_RESTARTED)
+        
+        with pytest.raises(WriterUnavailableError):
+            future.result(timeout=5)
+        responses.put(None)
+    
+    def test_call_times_out(self):
+        """A write with no reply should fail once the timeout elapses."""
+        context = multiprocessing.get_context("spawn")
+        responses = context.Queue()
+        client = WriterClient(0, context.Queue(), responses, timeout=0.1)
+        
+        with pytest.raises(WriterUnavailableError):
+            asyncio.run(client.call("create_account", "Alice"))
+        responses.put(None)
+    
+    def test_only_write_operations_are_forwarded(self):
+        """Reads and unknown names should be rejected before queueing."""
+        context = multiprocessing.get_context("spawn")
+        responses = context.Queue()
+        client = WriterClient(0, context.Queue(), responses)
+        
+        with pytest.raises(ValueError):
+            client.submit("get_account_by_id", "x")
+        responses.put(None)
+    
+    def test_unpicklable_error_is_replaced(self):
+        """Replies should always be picklable so the caller is not left waiting."""
+        class LocalError(Exception):
+            pass
+        
+        request_id, result, error = encode_reply("request-7", None, LocalError("boom"))
+        
+        assert request_id == "request-7"
+        assert result is None
+        assert isinstance(error, RuntimeError)
+        assert "boom" in str(error)
+    
+    def test_reply_resolves_future(self):
+        """A reply should resolve the matching pending future."""
+        context = multiprocessing.get_context("spawn")
+        requests = context.Queue()
+        responses = context.Queue()
+        client = WriterClient(0, requests, responses)
+        
+        future: Future = client.submit("create_account", "Alice")
+        _, request_id, _, _ = requests.get(timeout=5)
+        responses.put(encode_reply(request_id, "done", None))
+        
+        assert future.result(timeout=5) == "done"
+        responses.put(None)
+    
+    def test_reply_to_previous_worker_is_ignored(self):
+        """A restarted worker should not take a reply meant for its predecessor."""
+        context = multiprocessing.get_context("spawn")
+        requests = context.Queue()
+        responses = context.Queue()
+        
+        previous = WriterClient(0, requests, context.Queue())
+        previous.submit("create_account", "Alice")
+        _, stale_id, _, _ = requests.get(timeout=5)
+        client = WriterClient(0, requests, responses)
+        future: Future = client.submit("create_account", "Bob")
+        _, request_id, _, _ = requests.get(timeout=5)
+        responses.put(encode_reply(stale_id, "stale", None))
+        responses.put(encode_reply(request_id, "done", None))
+        
+        assert stale_id != request_id
+        assert future.result(timeout=5) == "done"
+        responses.put(None)
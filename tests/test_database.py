@@ -1,40 +1,100 @@
 """Tests for database operations."""
 
+import asyncio
 import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
 import pytest
 
 # Use a test database
 os.environ["ZENITH_TEST_MODE"] = "1"
 
-from src.zenith.database.connection import get_database_path
+from src.zenith.database.connection import (
+    ConnectionPool,
+    PoolClosedError,
+    PoolExhaustedError,
+    close_connections,
+    after_commit,
+    get_connection,
+    get_database_path,
+    immediate_transaction,
+    retry_on_busy,
+)
+from src.zenith.database import connection as connection_module
+from src.zenith.database.rebalance import find_shard_files, rebalance
+from src.zenith.database import archive, migrate
+from src.zenith.database import schema
+from src.zenith.database.codec import from_micros, pack_id, to_micros, unpack_id
 from src.zenith.database.schema import initialize_database
+from src.zenith.database import operations, queries
+from src.zenith.database.operations import apply_transaction_locked
 from src.zenith.database import (
+    TRANSACTION_COLUMNS,
+    aio,
+    GroupCommitWriter,
+    close_group_commit_writer,
+    get_account_cache,
+    AccountCache,
+    AccountNotFoundError,
+    BalanceLimitError,
+    IdempotencyConflictError,
+    InsufficientFundsError,
+    PartialCommitError,
     create_account,
     get_account_by_id,
     update_account_balance,
     record_transaction,
+    apply_transaction,
+    apply_transactions,
+    transfer,
+    get_accounts_by_ids,
+    find_accounts,
+    list_accounts,
     get_transactions_by_account,
+    get_transactions_page,
+    get_balance_at,
+    verify_account,
+    get_statement_chunk,
+    iter_statement,
+    get_durability_profile,
+    get_idempotency_cache,
+    get_schema_version,
+    get_shard_path,
+    shard_for,
+    read_rollups,
+    refresh_rollups,
+    RollupFolder,
+    archive_transactions,
+    create_backup,
+    restore_backup,
+    SCHEMA_VERSION,
+)
+from src.zenith.models import (
+    MAX_MINOR_UNITS,
+    Account,
+    TransactionType,
+    from_minor_units,
+    to_minor_units,
 )
-from src.zenith.models import TransactionType
 
 
 @pytest.fixture(autouse=True)
-def setup_test_db():
-    """Create a fresh test database for each test."""
-    db_path = get_database_path()
+def setup_test_db(tmp_path, monkeypatch):
+    """Create a fresh single-shard test database for each test."""
+    close_connections()
+    get_account_cache().clear()
+    get_idempotency_cache().clear()
+    monkeypatch.setenv("ZENITH_DATABASE_PATH", str(tmp_path / "bank.db"))
+    monkeypatch.setenv("ZENITH_SHARDS", "1")
     
-    # Remove existing test db
-    if db_path.exists():
-        db_path.unlink()
-    
-    # Initialize fresh db
     initialize_database()
     
     yield
     
-    # Cleanup after test
-    if db_path.exists():
-        db_path.unlink()
+    close_connections()
 
 
 class TestAccountOperations:
@@ -131,3 +191,1789 @@ class TestTransactionOperations:
         transactions = get_transactions_by_account(account.account_id, limit=2)
         
         assert len(transactions) == 2
+
+
+class TestApplyTransaction:
+    """Tests for the atomic deposit/withdraw path."""
+    
+    def test_deposit_updates_balance_and_ledger(self):
+        """A deposit should return the new balance and record one row."""
+        account = create_account("Test User")
+        
+        txn, new_balance = apply_transaction(
+            account.account_id,
+            TransactionType.DEPOSIT,
+            40.0,
+        )
+        
+        assert new_balance == 40.0
+        assert txn.type == "DEPOSIT"
+        assert get_account_by_id(account.account_id).balance == 40.0
+        assert len(get_transactions_by_account(account.account_id)) == 1
+    
+    def test_withdrawal_insufficient_funds_changes_nothing(self):
+        """An overdraft should raise and leave balance and ledger untouched."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 10.0)
+        
+        with pytest.raises(InsufficientFundsError) as excinfo:
+            apply_transaction(account.account_id, TransactionType.WITHDRAWAL, 25.0)
+        
+        assert excinfo.value.balance == 10.0
+        assert excinfo.value.requested == 25.0
+        assert get_account_by_id(account.account_id).balance == 10.0
+        assert len(get_transactions_by_account(account.account_id)) == 1
+    
+    def test_unknown_account_raises(self):
+        """Applying to a missing account should raise AccountNotFoundError."""
+        with pytest.raises(AccountNotFoundError):
+            apply_transaction("invalid-id", TransactionType.DEPOSIT, 10.0)
+    
+    def test_concurrent_deposits_do_not_lose_updates(self):
+        """Concurrent deposits should all be reflected in the final balance."""
+        account = create_account("Test User")
+        
+        def worker():
+            for _ in range(25):
+                apply_transaction(account.account_id, TransactionType.DEPOSIT, 1.0)
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert get_account_by_id(account.account_id).balance == 100.0
+        assert len(get_transactions_by_account(account.account_id, limit=200)) == 100
+
+
+class TestTransfer:
+    """Tests for atomic account-to-account transfers."""
+    
+    def test_transfer_moves_funds_and_records_both_sides(self):
+        """A transfer should debit, credit and write one ledger row per side."""
+        source = create_account("Source")
+        target = create_account("Target")
+        apply_transaction(source.account_id, TransactionType.DEPOSIT, 100)
+        
+        debit, credit = transfer(source.account_id, target.account_id, 30)
+        
+        assert debit.type == TransactionType.TRANSFER_OUT
+        assert credit.type == TransactionType.TRANSFER_IN
+        assert (debit.balance_after, credit.balance_after) == (70, 30)
+        assert get_account_by_id(source.account_id).balance == 70
+        assert get_account_by_id(target.account_id).balance == 30
+        assert verify_account(source.account_id, full=True).ok
+        assert verify_account(target.account_id, full=True).ok
+    
+    def test_failed_transfer_changes_nothing(self):
+        """Insufficient funds or a missing target should roll back both sides."""
+        source = create_account("Source")
+        target = create_account("Target")
+        apply_transaction(source.account_id, TransactionType.DEPOSIT, 100)
+        
+        with pytest.raises(InsufficientFundsError):
+            transfer(source.account_id, target.account_id, 500)
+        with pytest.raises(AccountNotFoundError):
+            transfer(source.account_id, "missing", 50)
+        
+        assert get_account_by_id(source.account_id).balance == 100
+        assert len(get_transactions_by_account(source.account_id)) == 1
+        assert get_transactions_by_account(target.account_id) == []
+    
+    def test_same_account_rejected(self):
+        """Transferring to the source account should be refused."""
+        account = create_account("Source")
+        
+        with pytest.raises(ValueError):
+            transfer(account.account_id, account.account_id, 10)
+    
+    def test_concurrent_opposite_transfers_conserve_funds(self):
+        """Transfers racing in both directions should neither lose nor stall."""
+        first = create_account("First")
+        second = create_account("Second")
+        apply_transaction(first.account_id, TransactionType.DEPOSIT, 1000)
+        apply_transaction(second.account_id, TransactionType.DEPOSIT, 1000)
+        
+        def worker(source, target):
+            for _ in range(25):
+                transfer(source.account_id, target.account_id, 3)
+        
+        threads = [
+            threading.Thread(target=worker, args=pair)
+            for pair in [(first, second), (second, first)] * 2
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert get_account_by_id(first.account_id).balance == 1000
+        assert get_account_by_id(second.account_id).balance == 1000
+        assert verify_account(first.account_id, full=True).ok
+    
+    def test_busy_errors_are_retried(self):
+        """Busy errors should be retried a bounded number of times."""
+        calls = []
+        
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise sqlite3.OperationalError("database is locked")
+            return "done"
+        
+        def always_busy():
+            calls.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        
+        assert retry_on_busy(flaky) == "done"
+        calls.clear()
+        with pytest.raises(sqlite3.OperationalError):
+            retry_on_busy(always_busy, attempts=2)
+        assert len(calls) == 2
+
+
+class TestTransactionPagination:
+    """Tests for keyset-paginated transaction history."""
+    
+    def _seed(self, count):
+        account = create_account("Test User")
+        for i in range(count):
+            record_transaction(account.account_id, TransactionType.DEPOSIT, float(i))
+        return account
+    
+    def test_pages_walk_full_history_without_overlap(self):
+        """Following next_cursor should visit every row exactly once."""
+        account = self._seed(7)
+        
+        amounts = []
+        page = get_transactions_page(account.account_id, limit=3)
+        while True:
+            amounts.extend(txn.amount for txn in page.transactions)
+            if page.next_cursor is None:
+                break
+            page = get_transactions_page(
+                account.account_id, limit=3, before=page.next_cursor
+            )
+        
+        assert amounts == [6.0, 5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+    
+    def test_limit_out_of_range_rejected(self):
+        """Limits below 1 or above the maximum page size should be refused."""
+        account = self._seed(3)
+        
+        for limit in (0, -3, operations.MAX_TRANSACTION_PAGE_SIZE + 1):
+            with pytest.raises(ValueError):
+                get_transactions_page(account.account_id, limit=limit)
+    
+    def test_after_cursor_returns_newer_rows(self):
+        """Paging back with prev_cursor should return the newer page."""
+        account = self._seed(5)
+        
+        first = get_transactions_page(account.account_id, limit=2)
+        second = get_transactions_page(
+            account.account_id, limit=2, before=first.next_cursor
+        )
+        back = get_transactions_page(
+            account.account_id, limit=2, after=second.prev_cursor
+        )
+        
+        assert first.prev_cursor is None
+        assert [t.amount for t in second.transactions] == [2.0, 1.0]
+        assert [t.amount for t in back.transactions] == [4.0, 3.0]
+        assert back.prev_cursor is None
+    
+    def test_invalid_cursor_raises(self):
+        """A malformed cursor should be rejected."""
+        account = self._seed(1)
+        
+        with pytest.raises(ValueError):
+            get_transactions_page(account.account_id, before="not-a-cursor")
+    
+    def test_row_factory_builds_entries_from_tuples(self):
+        """A row factory should receive plain tuples and keep cursors working."""
+        account = self._seed(5)
+        
+        first = get_transactions_page(
+            account.account_id,
+            limit=2,
+            row_factory=lambda row: dict(zip(TRANSACTION_COLUMNS, row)),
+        )
+        second = get_transactions_page(
+            account.account_id,
+            limit=2,
+            before=first.next_cursor,
+            row_factory=tuple,
+        )
+        
+        assert [entry["amount"] for entry in first.transactions] == [4, 3]
+        assert first.transactions[0]["account_id"] == account.account_id
+        assert [row[3] for row in second.transactions] == [2, 1]
+    
+    def test_models_are_slotted(self):
+        """Ledger models should not carry a per-instance __dict__."""
+        account = self._seed(1)
+        transaction = get_transactions_page(account.account_id).transactions[0]
+        
+        assert not hasattr(transaction, "__dict__")
+        assert not hasattr(account, "__dict__")
+    
+    def test_history_query_uses_index(self):
+        """History reads should seek the account index, not scan and sort."""
+        with get_connection() as connection:
+            plan = connection.execute(
+                """EXPLAIN QUERY PLAN
+                   SELECT rowid, * FROM transactions
+                   WHERE account_id = ? AND (created_at, rowid) < (?, ?)
+                   ORDER BY created_at DESC, rowid DESC LIMIT 10""",
+                ("a", "b", 1),
+            ).fetchall()
+        details = " ".join(row["detail"] for row in plan)
+        
+        assert "idx_transactions_account_created" in details
+        assert "TEMP B-TREE" not in details
+    
+    def test_schema_version_recorded(self):
+        """Initialization should stamp the latest schema version."""
+        with get_connection() as connection:
+            assert get_schema_version(connection) == SCHEMA_VERSION
+
+
+class TestAsyncOperations:
+    """Tests for the async database API."""
+    
+    def test_async_round_trip(self):
+        """Async operations should behave like their blocking versions."""
+        async def scenario():
+            account = await aio.create_account("Async User")
+            await aio.apply_transaction(account.account_id, TransactionType.DEPOSIT, 30.0)
+            fetched = await aio.get_account_by_id(account.account_id)
+            page = await aio.get_transactions_page(account.account_id)
+            return fetched, page
+        
+        fetched, page = asyncio.run(scenario())
+        
+        assert fetched.balance == 30.0
+        assert len(page.transactions) == 1
+    
+    def test_waiting_writer_does_not_block_event_loop(self):
+        """Reads should complete while a write waits on SQLite's lock."""
+        account = create_account("Test User")
+        blocker = sqlite3.connect(get_shard_path(shard_for(account.account_id)))
+        blocker.execute("BEGIN IMMEDIATE")
+        
+        async def scenario():
+            write = asyncio.create_task(
+                aio.apply_transaction(account.account_id, TransactionType.DEPOSIT, 500)
+            )
+            await asyncio.sleep(0.05)
+            read = await aio.get_account_by_id(account.account_id)
+            write_pending = not write.done()
+            blocker.rollback()
+            await write
+            return read, write_pending
+        
+        try:
+            read, write_pending = asyncio.run(scenario())
+        finally:
+            blocker.close()
+        
+        assert write_pending
+        assert read.balance == 0
+        assert get_account_by_id(account.account_id).balance == 500
+
+
+class TestGroupCommit:
+    """Tests for the group-commit writer."""
+    
+    def test_batch_commits_all_requests_together(self):
+        """Queued mutations should share commits and all take effect."""
+        account = create_account("Test User")
+        writer = GroupCommitWriter(max_batch=50, max_wait=0.05)
+        
+        futures = [
+            writer.submit(
+                apply_transaction_locked,
+                account.account_id,
+                TransactionType.DEPOSIT,
+                100,
+            )
+            for _ in range(20)
+        ]
+        balances = sorted(future.result()[1] for future in futures)
+        writer.close()
+        
+        assert balances == [100 * i for i in range(1, 21)]
+        assert writer.stats()["batches"] < 20
+        assert get_account_by_id(account.account_id).balance == 2000
+    
+    def test_failing_request_does_not_abort_batch(self):
+        """A request that raises should fail alone; the batch still commits."""
+        account = create_account("Test User")
+        writer = GroupCommitWriter(max_batch=10, max_wait=0.05)
+        
+        ok = writer.submit(
+            apply_transaction_locked, account.account_id, TransactionType.DEPOSIT, 1000
+        )
+        overdraft = writer.submit(
+            apply_transaction_locked, account.account_id, TransactionType.WITHDRAWAL, 5000
+        )
+        missing = writer.submit(
+            apply_transaction_locked, "invalid-id", TransactionType.DEPOSIT, 100
+        )
+        
+        assert ok.result()[1] == 1000
+        with pytest.raises(InsufficientFundsError):
+            overdraft.result()
+        with pytest.raises(AccountNotFoundError):
+            missing.result()
+        writer.close()
+        
+        assert get_account_by_id(account.account_id).balance == 1000
+        assert len(get_transactions_by_account(account.account_id)) == 1
+    
+    def test_async_path_uses_writer_when_enabled(self, monkeypatch):
+        """ZENITH_GROUP_COMMIT=1 should route async deposits through the writer."""
+        monkeypatch.setenv("ZENITH_GROUP_COMMIT", "1")
+        account = create_account("Test User")
+        
+        async def scenario():
+            await asyncio.gather(*(
+                aio.apply_transaction(account.account_id, TransactionType.DEPOSIT, 2.0)
+                for _ in range(10)
+            ))
+        
+        try:
+            asyncio.run(scenario())
+        finally:
+            close_group_commit_writer()
+        
+        assert get_account_by_id(account.account_id).balance == 20.0
+    
+    def test_writer_honours_idempotency_keys(self, monkeypatch):
+        """Retries queued on the writer should apply only once."""
+        monkeypatch.setenv("ZENITH_GROUP_COMMIT", "1")
+        account = create_account("Test User")
+        
+        async def scenario():
+            return await asyncio.gather(*(
+                aio.apply_transaction(
+                    account.account_id,
+                    TransactionType.DEPOSIT,
+                    5,
+                    "deposit-1",
+                )
+                for _ in range(5)
+            ))
+        
+        try:
+            results = asyncio.run(scenario())
+        finally:
+            close_group_commit_writer()
+        
+        assert {transaction.transaction_id for transaction, _ in results} == {
+            results[0][0].transaction_id
+        }
+        assert get_account_by_id(account.account_id).balance == 5
+
+
+class TestIdempotency:
+    """Tests for idempotency keys on mutating operations."""
+    
+    def test_retry_returns_original_result(self):
+        """A retried deposit should not touch the balance or the ledger again."""
+        account = create_account("Test User")
+        
+        first = apply_transaction(account.account_id, TransactionType.DEPOSIT, 50, "key-1")
+        retry = apply_transaction(account.account_id, TransactionType.DEPOSIT, 50, "key-1")
+        get_idempotency_cache().clear()
+        cold_retry = apply_transaction(
+            account.account_id,
+            TransactionType.DEPOSIT,
+            50,
+            "key-1",
+        )
+        
+        assert retry == first
+        assert cold_retry == first
+        assert get_account_by_id(account.account_id).balance == 50
+        assert len(get_transactions_by_account(account.account_id)) == 1
+    
+    def test_key_reuse_with_other_arguments_conflicts(self):
+        """A key reused for a different request should be rejected."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 50, "key-1")
+        
+        with pytest.raises(IdempotencyConflictError):
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 60, "key-1")
+        get_idempotency_cache().clear()
+        with pytest.raises(IdempotencyConflictError):
+            apply_transaction(account.account_id, TransactionType.WITHDRAWAL, 50, "key-1")
+        
+        assert get_account_by_id(account.account_id).balance == 50
+    
+    def test_failed_request_does_not_store_key(self):
+        """A rejected request should leave its key free for a later attempt."""
+        account = create_account("Test User")
+        
+        with pytest.raises(InsufficientFundsError):
+            apply_transaction(account.account_id, TransactionType.WITHDRAWAL, 10, "key-1")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 20, "key-2")
+        _, balance = apply_transaction(
+            account.account_id,
+            TransactionType.WITHDRAWAL,
+            10,
+            "key-1",
+        )
+        
+        assert balance == 10
+    
+    def test_transfer_and_create_account_retries(self):
+        """Transfers and account creation should also replay their results."""
+        source = create_account("Source", "create-1")
+        assert create_account("Source", "create-1") == source
+        target = create_account("Target")
+        apply_transaction(source.account_id, TransactionType.DEPOSIT, 100)
+        
+        first = transfer(source.account_id, target.account_id, 40, "transfer-1")
+        get_idempotency_cache().clear()
+        retry = transfer(source.account_id, target.account_id, 40, "transfer-1")
+        
+        assert retry == first
+        assert create_account("Source", "create-1").account_id == source.account_id
+        assert get_account_by_id(source.account_id).balance == 60
+        assert get_account_by_id(target.account_id).balance == 40
+    
+    def test_expired_keys_are_evicted(self):
+        """Keys older than the TTL should be deleted and no longer replayed."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 50, "key-1")
+        cache = get_idempotency_cache()
+        cache.clear()
+        ttl = cache.ttl
+        cache.ttl = -10
+        try:
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 50, "key-2")
+        finally:
+            cache.ttl = ttl
+        
+        with get_connection() as connection:
+            keys = [row["key"] for row in connection.execute("SELECT key FROM idempotency_keys")]
+        
+        assert keys == ["key-2"]
+    
+    def test_expired_account_key_reuse_conflicts(self):
+        """After expiry a create_account key should still only fit its holder."""
+        account = create_account("Alice", "create-1")
+        cache = get_idempotency_cache()
+        cache.clear()
+        ttl = cache.ttl
+        cache.ttl = -10
+        try:
+            assert create_account("Alice", "create-1").account_id == account.account_id
+            with pytest.raises(IdempotencyConflictError):
+                create_account("Bob", "create-1")
+        finally:
+            cache.ttl = ttl
+        
+        assert get_account_by_id(account.account_id).holder_name == "Alice"
+
+
+class TestBatchOperations:
+    """Tests for batched lookups and mutations."""
+    
+    def test_get_accounts_by_ids_large_batch(self):
+        """Lookups of hundreds of IDs should return every account."""
+        accounts = [create_account(f"User {i}") for i in range(510)]
+        ids = [account.account_id for account in accounts] + ["invalid-id"]
+        
+        found = get_accounts_by_ids(ids)
+        
+        assert len(found) == 510
+        assert "invalid-id" not in found
+    
+    def test_text_ids_are_found(self):
+        """Batches should find accounts whose IDs predate UUIDs."""
+        account = create_account("Test User")
+        with get_connection() as connection:
+            with immediate_transaction(connection):
+                connection.execute(
+                    "INSERT INTO accounts (account_id, holder_name, balance) VALUES (?, ?, ?)",
+                    ("acc-1", "Legacy", 500),
+                )
+        
+        found = get_accounts_by_ids([account.account_id, "acc-1", "missing"])
+        results = apply_transactions(TransactionType.DEPOSIT, [("acc-1", 25)])
+        
+        assert sorted(found) == sorted([account.account_id, "acc-1"])
+        assert found["acc-1"].balance == 500
+        assert results[0][1] == 525
+        assert get_account_by_id("acc-1").balance == 525
+    
+    def test_apply_transactions_commits_valid_items(self):
+        """Valid items should persist even when others in the batch fail."""
+        account = create_account("Test User")
+        
+        results = apply_transactions(TransactionType.DEPOSIT, [
+            (account.account_id, 10.0),
+            ("invalid-id", 10.0),
+            (account.account_id, 5.0),
+        ])
+        
+        assert results[0][1] == 10.0
+        assert isinstance(results[1], AccountNotFoundError)
+        assert results[2][1] == 15.0
+        assert get_account_by_id(account.account_id).balance == 15.0
+        assert len(get_transactions_by_account(account.account_id)) == 2
+
+
+class TestAccountSearch:
+    """Tests for finding and listing accounts."""
+    
+    def test_prefix_search_ignores_case(self):
+        """Names starting with the prefix in any case should match, in name order."""
+        for name in ["alice", "Bob", "ALICIA", "Al", "alfred"]:
+            create_account(name)
+        
+        page = find_accounts("ali")
+        
+        assert [account.holder_name for account in page.accounts] == ["alice", "ALICIA"]
+        assert page.next_cursor is None
+    
+    def test_search_pages_without_overlap(self):
+        """Following next_cursor should visit every match exactly once."""
+        created = {create_account(f"Smith {i}").account_id for i in range(7)}
+        create_account("Jones")
+        
+        seen = []
+        page = find_accounts("smith", limit=3)
+        while True:
+            seen.extend(account.account_id for account in page.accounts)
+            if page.next_cursor is None:
+                break
+            page = find_accounts("smith", limit=3, cursor=page.next_cursor)
+        
+        assert len(seen) == 7
+        assert set(seen) == created
+    
+    def test_list_accounts_walks_everything_in_id_order(self):
+        """Listing should return every account once, ordered by ID."""
+        created = [create_account(f"User {i}").account_id for i in range(5)]
+        
+        first = list_accounts(limit=3)
+        second = list_accounts(first.next_cursor, limit=3)
+        
+        listed = [account.account_id for account in first.accounts + second.accounts]
+        assert listed == sorted(created)
+        assert second.next_cursor is None
+    
+    def test_invalid_arguments_raise(self):
+        """Malformed cursors and out-of-range limits should be rejected."""
+        create_account("Ann")
+        create_account("Anna")
+        search_cursor = find_accounts("ann", limit=1).next_cursor
+        
+        with pytest.raises(ValueError):
+            find_accounts("a", cursor="not-a-cursor")
+        with pytest.raises(ValueError):
+            list_accounts(cursor=search_cursor)
+        with pytest.raises(ValueError):
+            list_accounts(limit=0)
+    
+    def test_search_seeks_name_index(self):
+        """Searches should seek the name index, not scan and sort."""
+        with get_connection() as connection:
+            plan = connection.execute(
+                "EXPLAIN QUERY PLAN " + queries.FIND_ACCOUNTS.sql,
+                ("a", "", "a\U0010ffff", 10),
+            ).fetchall()
+        details = " ".join(row["detail"] for row in plan)
+        
+        assert "idx_accounts_holder_name ((holder_name,account_id)>(?,?)" in details
+        assert "TEMP B-TREE" not in details
+
+
+class TestQueryRegistry:
+    """Tests for the registry of named SQL statements."""
+    
+    def test_registered_statements_prepare_against_schema(self):
+        """Every registered statement should compile against the current schema."""
+        with get_connection() as connection:
+            for statement in queries.registered_statements():
+                connection.execute(
+                    "EXPLAIN " + statement.sql,
+                    [None] * statement.sql.count("?"),
+                )
+    
+    def test_duplicate_name_is_rejected(self):
+        """A name can only be registered once."""
+        with pytest.raises(ValueError):
+            queries.register("select_account", "SELECT 1")
+    
+    def test_executions_are_counted_per_statement(self):
+        """Running an operation should count its statements by name."""
+        account = create_account("Test User")
+        latency = queries.get_statement("select_accounts")._latency
+        executions = latency.count
+        
+        accounts = get_accounts_by_ids([account.account_id, "missing", account.account_id])
+        
+        assert list(accounts) == [account.account_id]
+        assert latency.count == executions + 1
+    
+    def test_pool_sizes_statement_cache(self):
+        """Pooled connections should report their statement cache size."""
+        pool = ConnectionPool(get_database_path(), size=1, statement_cache_size=64)
+        
+        assert pool.stats()["statement_cache_size"] == 64
+        pool.close()
+
+
+class TestConnectionPool:
+    """Tests for the pooled connection layer."""
+    
+    def test_connection_is_reused_across_calls(self):
+        """Sequential checkouts should hand back the same warm connection."""
+        with get_connection() as first:
+            pass
+        with get_connection() as second:
+            pass
+        
+        assert first is second
+    
+    def test_nested_checkout_shares_connection(self):
+        """A thread already holding a connection should get it back."""
+        with get_connection() as outer:
+            with get_connection() as inner:
+                assert inner is outer
+    
+    def test_threads_get_distinct_connections(self):
+        """Concurrent threads should not share a checked-out connection."""
+        seen = []
+        barrier = threading.Barrier(2)
+        
+        def worker():
+            with get_connection() as connection:
+                seen.append(connection)
+                barrier.wait()
+        
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert seen[0] is not seen[1]
+    
+    def test_pool_size_is_bounded(self):
+        """Checkouts beyond the pool size should time out."""
+        pool = ConnectionPool(get_database_path(), size=1, timeout=0.05)
+        held = threading.Event()
+        done = threading.Event()
+        
+        def holder():
+            with pool.connection():
+                held.set()
+                done.wait()
+        
+        thread = threading.Thread(target=holder)
+        thread.start()
+        held.wait()
+        
+        with pytest.raises(PoolExhaustedError):
+            with pool.connection():
+                pass
+        
+        done.set()
+        thread.join()
+        pool.close()
+    
+    def test_release_rolls_back_open_transaction(self):
+        """A connection returned mid-transaction should be rolled back."""
+        account = create_account("Test User")
+        
+        with get_connection() as connection:
+            connection.execute(
+                "UPDATE accounts SET balance = 500 WHERE account_id = ?",
+                (account.account_id,),
+            )
+        
+        assert get_account_by_id(account.account_id).balance == 0.0
+    
+    def test_commit_hooks_run_only_after_commit(self):
+        """after_commit callbacks should fire on commit and drop on rollback."""
+        fired = []
+        
+        with get_connection() as connection:
+            with immediate_transaction(connection):
+                after_commit(connection, lambda: fired.append("committed"))
+            
+            with pytest.raises(RuntimeError):
+                with immediate_transaction(connection):
+                    after_commit(connection, lambda: fired.append("rolled back"))
+                    raise RuntimeError("abort")
+        
+        assert fired == ["committed"]
+    
+    def test_failed_commit_rolls_back(self, monkeypatch):
+        """A commit that fails should roll back and drop the commit hooks."""
+        account = create_account("Test User")
+        fired = []
+        
+        def fail(connection):
+            raise sqlite3.OperationalError("disk I/O error")
+        
+        monkeypatch.setattr(connection_module, "commit", fail)
+        with get_connection() as connection:
+            with pytest.raises(sqlite3.OperationalError):
+                with immediate_transaction(connection):
+                    connection.execute(
+                        "UPDATE accounts SET balance = 500 WHERE account_id = ?",
+                        (pack_id(account.account_id),),
+                    )
+                    after_commit(connection, lambda: fired.append("committed"))
+            
+            assert not connection.in_transaction
+            assert connection.commit_hooks == []
+        
+        get_account_cache().clear()
+        assert fired == []
+        assert get_account_by_id(account.account_id).balance == 0
+    
+    def test_closed_pool_rejects_checkout(self):
+        """A pool that has been shut down should refuse new checkouts."""
+        pool = ConnectionPool(get_database_path(), size=1)
+        pool.close()
+        
+        with pytest.raises(PoolClosedError):
+            with pool.connection():
+                pass
+
+
+class TestLazyInitialization:
+    """Tests for schema setup on first use."""
+    
+    def test_first_use_creates_schema(self, tmp_path, monkeypatch):
+        """Operations on a new file should work without initialize_database."""
+        close_connections()
+        monkeypatch.setenv("ZENITH_DATABASE_PATH", str(tmp_path / "lazy.db"))
+        try:
+            account = create_account("Test User")
+            
+            with get_connection() as connection:
+                version = get_schema_version(connection)
+            
+            assert get_account_by_id(account.account_id) == account
+            assert version == SCHEMA_VERSION
+        finally:
+            close_connections()
+    
+    def test_current_schema_is_not_migrated_again(self, monkeypatch):
+        """Reopening an up-to-date file should not take the write lock."""
+        close_connections()
+        
+        def fail(connection):
+            raise AssertionError("migration attempted")
+        
+        monkeypatch.setattr(schema, "immediate_transaction", fail)
+        
+        with get_connection() as connection:
+            assert get_schema_version(connection) == SCHEMA_VERSION
+    
+    def test_database_path_is_resolved_once(self):
+        """Repeated lookups should reuse the resolved path."""
+        assert get_database_path() is get_database_path()
+
+
+class TestDurabilityProfiles:
+    """Tests for per-connection durability profiles."""
+    
+    def test_default_profile_enables_wal(self):
+        """Pooled connections should run in WAL with synchronous=NORMAL."""
+        with get_connection() as connection:
+            journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = connection.execute("PRAGMA synchronous").fetchone()[0]
+        
+        assert journal_mode == "wal"
+        assert synchronous == 1  # NORMAL
+    
+    def test_profile_selected_from_environment(self, monkeypatch):
+        """ZENITH_DURABILITY should select the profile by name."""
+        monkeypatch.setenv("ZENITH_DURABILITY", "strict")
+        
+        assert get_durability_profile().synchronous == "FULL"
+    
+    def test_profile_applied_to_every_connection(self):
+        """A pool's profile should be applied to each connection it opens."""
+        pool = ConnectionPool(
+            get_database_path(),
+            size=2,
+            profile=get_durability_profile("bench"),
+        )
+        
+        with pool.connection() as connection:
+            synchronous = connection.execute("PRAGMA synchronous").fetchone()[0]
+            temp_store = connection.execute("PRAGMA temp_store").fetchone()[0]
+        pool.close()
+        
+        assert synchronous == 0  # OFF
+        assert temp_store == 2  # MEMORY
+    
+    def test_unknown_profile_raises(self):
+        """An unknown profile name should be rejected."""
+        with pytest.raises(ValueError):
+            get_durability_profile("reckless")
+
+
+class TestMinorUnits:
+    """Tests for integer minor-unit money storage."""
+    
+    def test_conversion_round_trips(self):
+        """Decimal amounts should convert to exact integer minor units."""
+        assert to_minor_units(0.1) == 10
+        assert to_minor_units(19.99) == 1999
+        assert from_minor_units(1999) == 19.99
+    
+    def test_excess_precision_rejected(self):
+        """Amounts finer than the minor unit should be rejected."""
+        with pytest.raises(ValueError):
+            to_minor_units(0.001)
+    
+    def test_amount_beyond_64_bits_rejected(self):
+        """Amounts that do not fit a SQLite integer should be rejected."""
+        with pytest.raises(ValueError):
+            to_minor_units(1e18)
+        with pytest.raises(ValueError):
+            to_minor_units(-1e18)
+    
+    def test_credit_past_limit_rejected(self):
+        """A deposit that would overflow the balance should change nothing."""
+        account = create_account("Test User")
+        update_account_balance(account.account_id, MAX_MINOR_UNITS - 5)
+        
+        with pytest.raises(BalanceLimitError) as excinfo:
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 6)
+        
+        assert excinfo.value.balance == MAX_MINOR_UNITS - 5
+        _, balance = apply_transaction(account.account_id, TransactionType.DEPOSIT, 5)
+        assert balance == MAX_MINOR_UNITS
+        assert len(get_transactions_by_account(account.account_id)) == 1
+    
+    def test_batch_credit_past_limit_rejected(self):
+        """Batch deposits should reject only the items that would overflow."""
+        account = create_account("Test User")
+        update_account_balance(account.account_id, MAX_MINOR_UNITS - 5)
+        
+        results = apply_transactions(
+            TransactionType.DEPOSIT,
+            [(account.account_id, 3), (account.account_id, 3), (account.account_id, 2)],
+        )
+        
+        assert results[0][1] == MAX_MINOR_UNITS - 2
+        assert isinstance(results[1], BalanceLimitError)
+        assert results[2][1] == MAX_MINOR_UNITS
+        assert get_account_by_id(account.account_id).balance == MAX_MINOR_UNITS
+    
+    def test_balances_stored_as_integers(self):
+        """Balances and amounts should be stored with INTEGER type."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 1050)
+        
+        with get_connection() as connection:
+            balance_type = connection.execute(
+                "SELECT typeof(balance) FROM accounts"
+            ).fetchone()[0]
+            amount_type = connection.execute(
+                "SELECT typeof(amount) FROM transactions"
+            ).fetchone()[0]
+        
+        assert balance_type == "integer"
+        assert amount_type == "integer"
+    
+    def test_migration_converts_real_columns(self):
+        """A pre-migration database should have REAL values scaled to ints."""
+        close_connections()
+        db_path = get_database_path()
+        db_path.unlink()
+        
+        legacy = sqlite3.connect(db_path)
+        legacy.executescript("""
+            CREATE TABLE accounts (
+                account_id TEXT PRIMARY KEY,
+                holder_name TEXT NOT NULL,
+                balance REAL NOT NULL DEFAULT 0.0
+            );
+            CREATE TABLE transactions (
+                transaction_id TEXT PRIMARY KEY,
+                account_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            INSERT INTO accounts VALUES ('acc-1', 'Legacy', 10.3);
+            INSERT INTO transactions VALUES
+                ('txn-1', 'acc-1', 'DEPOSIT', 10.3, '2024-01-01T00:00:00+00:00');
+        """)
+        legacy.close()
+        
+        initialize_database()
+        
+        assert get_account_by_id("acc-1").balance == 1030
+        assert get_transactions_by_account("acc-1")[0].amount == 1030
+
+
+class TestAccountCache:
+    """Tests for the read-through account cache."""
+    
+    def test_repeat_lookup_is_served_from_cache(self):
+        """A second lookup of the same account should be a cache hit."""
+        account = create_account("Test User")
+        cache = get_account_cache()
+        cache.clear()
+        hits = cache.stats()["hits"]
+        
+        get_account_by_id(account.account_id)
+        get_account_by_id(account.account_id)
+        
+        assert cache.stats()["hits"] == hits + 1
+    
+    def test_write_invalidates_cached_balance(self):
+        """Reads after a committed write should see the new balance."""
+        account = create_account("Test User")
+        get_account_by_id(account.account_id)
+        
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 700)
+        
+        assert get_account_by_id(account.account_id).balance == 700
+    
+    def test_stale_fill_after_invalidation_is_dropped(self):
+        """A value read before an invalidation must not be cached after it."""
+        account = create_account("Test User")
+        cache = get_account_cache()
+        cache.clear()
+        
+        epoch = cache.epoch()
+        cache.invalidate(account.account_id)
+        cache.put(account, epoch)
+        
+        assert cache.get(account.account_id) is None
+    
+    def test_capacity_evicts_least_recently_used(self):
+        """The cache should never hold more than its capacity."""
+        cache = AccountCache(capacity=2, ttl=60.0)
+        for i in range(3):
+            cache.put(Account(f"acc-{i}", "User", 0), cache.epoch())
+        
+        assert cache.get("acc-0") is None
+        assert cache.get("acc-2") is not None
+        assert cache.stats()["evictions"] == 1
+
+
+class TestRunningBalances:
+    """Tests for per-row running balances, snapshots and verification."""
+    
+    def test_ledger_rows_carry_seq_and_balance_after(self):
+        """Every write path should number rows and record the running balance."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 1000)
+        apply_transactions(
+            TransactionType.WITHDRAWAL,
+            [(account.account_id, 300), (account.account_id, 200)],
+        )
+        update_account_balance(account.account_id, 600)
+        record_transaction(account.account_id, TransactionType.DEPOSIT, 100)
+        
+        history = get_transactions_by_account(account.account_id)
+        
+        assert [t.seq for t in history] == [4, 3, 2, 1]
+        assert [t.balance_after for t in history] == [600, 500, 700, 1000]
+    
+    def test_snapshots_written_at_interval(self, monkeypatch):
+        """A snapshot should be stored every SNAPSHOT_INTERVAL rows."""
+        monkeypatch.setattr(operations, "SNAPSHOT_INTERVAL", 3)
+        account = create_account("Test User")
+        for _ in range(4):
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 100)
+        apply_transactions(
+            TransactionType.DEPOSIT,
+            [(account.account_id, 100), (account.account_id, 100)],
+        )
+        
+        with get_connection() as connection:
+            snapshots = connection.execute(
+                "SELECT seq, balance FROM account_snapshots ORDER BY seq"
+            ).fetchall()
+        
+        assert [tuple(row) for row in snapshots] == [(3, 300), (6, 600)]
+    
+    def test_get_balance_at(self):
+        """Balances should be reconstructed as of a given moment."""
+        account = create_account("Test User")
+        before = datetime.now(timezone.utc) - timedelta(seconds=1)
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 500)
+        middle = datetime.now(timezone.utc)
+        apply_transaction(account.account_id, TransactionType.WITHDRAWAL, 200)
+        
+        assert get_balance_at(account.account_id, before) == 0
+        assert get_balance_at(account.account_id, middle) == 500
+        assert get_balance_at(account.account_id, datetime.now(timezone.utc)) == 300
+    
+    def test_get_balance_at_unknown_account(self):
+        """Unknown accounts should raise AccountNotFoundError."""
+        with pytest.raises(AccountNotFoundError):
+            get_balance_at("missing", datetime.now(timezone.utc))
+    
+    def test_verify_consistent_account(self, monkeypatch):
+        """A consistent account should verify from its latest snapshot."""
+        monkeypatch.setattr(operations, "SNAPSHOT_INTERVAL", 4)
+        account = create_account("Test User")
+        for _ in range(6):
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 100)
+        
+        result = verify_account(account.account_id)
+        full = verify_account(account.account_id, full=True)
+        
+        assert result.ok
+        assert result.from_seq == 4
+        assert result.transactions_checked == 2
+        assert full.ok
+        assert full.transactions_checked == 6
+    
+    def test_verify_detects_mismatches(self):
+        """Tampered ledger rows and out-of-band balances should be reported."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 500)
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 500)
+        update_account_balance(account.account_id, 5000)
+        
+        with get_connection() as connection:
+            connection.execute(
+                "UPDATE transactions SET balance_after = 999 WHERE seq = 1"
+            )
+            connection.commit()
+        
+        result = verify_account(account.account_id)
+        
+        assert not result.ok
+        assert result.ledger_balance == 1000
+        assert len(result.problems) == 3
+    
+    def test_migration_backfills_running_balances(self):
+        """Upgrading should number existing rows and compute balance_after."""
+        close_connections()
+        db_path = get_database_path()
+        db_path.unlink()
+        
+        legacy = sqlite3.connect(db_path)
+        legacy.executescript("""
+            CREATE TABLE accounts (
+                account_id TEXT PRIMARY KEY,
+                holder_name TEXT NOT NULL,
+                balance REAL NOT NULL DEFAULT 0.0
+            );
+            CREATE TABLE transactions (
+                transaction_id TEXT PRIMARY KEY,
+                account_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                amount REAL NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            INSERT INTO accounts VALUES ('acc-1', 'Legacy', 7.0);
+            INSERT INTO transactions VALUES
+                ('txn-2', 'acc-1', 'WITHDRAWAL', 3.0, '2024-01-02T00:00:00+00:00'),
+                ('txn-1', 'acc-1', 'DEPOSIT', 10.0, '2024-01-01T00:00:00+00:00');
+        """)
+        legacy.close()
+        
+        initialize_database()
+        history = get_transactions_by_account("acc-1")
+        
+        assert [(t.seq, t.balance_after) for t in history] == [(2, 700), (1, 1000)]
+        assert verify_account("acc-1").ok
+        assert get_balance_at("acc-1", datetime(2024, 1, 1, 12)) == 1000
+
+
+class TestLedgerRollups:
+    """Tests for the incrementally maintained ledger rollups."""
+    
+    def test_refresh_folds_new_rows_once(self):
+        """Each ledger row should be folded exactly once, in bounded batches."""
+        account = create_account("Test User")
+        other = create_account("Other User")
+        for _ in range(5):
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 10)
+        apply_transaction(account.account_id, TransactionType.WITHDRAWAL, 15)
+        transfer(account.account_id, other.account_id, 5)
+        
+        assert refresh_rollups(batch_size=2) == 8
+        assert refresh_rollups() == 0
+        apply_transaction(other.account_id, TransactionType.DEPOSIT, 1)
+        assert refresh_rollups() == 1
+        
+        assert sorted(read_rollups("0000-01-01", "9999-12-31")) == ledger_rollups()
+    
+    def test_refresh_survives_integer_overflow(self):
+        """A rollup amount past 64 bits should not stall the watermark."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 2 ** 62)
+        apply_transaction(account.account_id, TransactionType.WITHDRAWAL, 2 ** 62)
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 2 ** 62)
+        
+        assert refresh_rollups() == 3
+        assert refresh_rollups() == 0
+        rows = read_rollups("0000-01-01", "9999-12-31")
+        assert [row[3:] for row in rows if row[2] == "DEPOSIT"] == [(2, 2 ** 63)]
+    
+    def test_rollup_past_64_bits_stays_exact(self):
+        """Adding to a rollup past 64 bits should keep the exact amount."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 2 ** 62)
+        refresh_rollups()
+        apply_transaction(account.account_id, TransactionType.WITHDRAWAL, 2 ** 62)
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 2 ** 62)
+        refresh_rollups()
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 1)
+        refresh_rollups()
+        
+        rows = read_rollups("0000-01-01", "9999-12-31")
+        assert [row[3:] for row in rows if row[2] == "DEPOSIT"] == [(3, 2 ** 63 + 1)]
+    
+    def test_background_folder_folds_new_rows(self):
+        """Rows written while a folder runs should reach the rollups unasked."""
+        account = create_account("Test User")
+        folder = RollupFolder(interval=0.02)
+        try:
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 10)
+            deadline = time.monotonic() + 5
+            while not read_rollups("0000-01-01", "9999-12-31") and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            folder.close()
+        
+        assert [row[3:] for row in read_rollups("0000-01-01", "9999-12-31")] == [(1, 10)]
+        assert folder.stats()["rows"] == 1
+        assert not folder.failing
+    
+    def test_idle_refresh_skips_the_write_lock(self):
+        """With nothing to fold a refresh should not wait for the write lock."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 10)
+        refresh_rollups()
+        blocker = sqlite3.connect(get_database_path())
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            started = time.monotonic()
+            assert refresh_rollups() == 0
+        finally:
+            blocker.close()
+        
+        assert time.monotonic() - started < 1
+    
+    def test_read_is_limited_to_the_window(self):
+        """Rows outside the requested days should not be returned."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 10)
+        refresh_rollups()
+        
+        assert read_rollups("2000-01-01", "2000-12-31") == []
+    
+    def test_writer_process_runs_refresh(self):
+        """Refreshing is a write, so worker processes forward it."""
+        from src.zenith.database.ipc import WRITE_OPERATIONS
+        
+        assert "refresh_rollups" in WRITE_OPERATIONS
+
+
+class TestStatementExport:
+    """Tests for chunked, chronological statement reads."""
+    
+    def test_iter_statement_streams_all_rows_in_order(self):
+        """Iteration should cross chunk boundaries without gaps or repeats."""
+        account = create_account("Test User")
+        for i in range(1, 8):
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, i)
+        
+        transactions = list(iter_statement(account.account_id, chunk_size=3))
+        
+        assert [t.amount for t in transactions] == [1, 2, 3, 4, 5, 6, 7]
+        assert [t.seq for t in transactions] == [1, 2, 3, 4, 5, 6, 7]
+    
+    def test_chunk_cursor(self):
+        """A chunk should only return a cursor when more rows remain."""
+        account = create_account("Test User")
+        for i in range(1, 5):
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, i)
+        
+        first, cursor = get_statement_chunk(account.account_id, limit=2)
+        second, last_cursor = get_statement_chunk(account.account_id, after=cursor, limit=2)
+        
+        assert [t.amount for t in first] == [1, 2]
+        assert [t.amount for t in second] == [3, 4]
+        assert last_cursor is None
+    
+    def test_date_range(self):
+        """Start should be inclusive and end exclusive."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 1)
+        start = datetime.now(timezone.utc)
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 2)
+        end = datetime.now(timezone.utc)
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 3)
+        
+        transactions = list(iter_statement(account.account_id, start, end))
+        
+        assert [t.amount for t in transactions] == [2]
+
+
+def create_v7_database(rows: list[tuple[str, str, str, int, str]]) -> None:
+    """Replace the test database with one in the layout before compaction.
+    
+    Args:
+        rows: ``(transaction_id, account_id, type, amount, created_at)``
+            deposits, in ledger order.
+    """
+    close_connections()
+    db_path = get_database_path()
+    db_path.unlink()
+    
+    legacy = sqlite3.connect(db_path)
+    cursor = legacy.cursor()
+    for migration in schema.MIGRATIONS[:7]:
+        if callable(migration):
+            migration(cursor)
+        else:
+            for statement in migration:
+                cursor.execute(statement)
+    balances = {}
+    for transaction_id, account_id, transaction_type, amount, created_at in rows:
+        balance, seq = balances.get(account_id, (0, 0))
+        balances[account_id] = (balance + amount, seq + 1)
+        cursor.execute(
+            "INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (transaction_id, account_id, transaction_type, amount, created_at,
+             seq + 1, balance + amount),
+        )
+    for account_id, (balance, seq) in balances.items():
+        cursor.execute(
+            "INSERT INTO accounts VALUES (?, 'Legacy', ?, ?)",
+            (account_id, balance, seq),
+        )
+    cursor.execute("PRAGMA user_version = 7")
+    legacy.commit()
+    legacy.close()
+
+
+class TestCompactStorage:
+    """Tests for IDs stored as 16-byte blobs and timestamps as microseconds."""
+    
+    def test_codec_round_trips(self):
+        """Packing and unpacking should give back the API values."""
+        account_id = "0f8fad5b-d9cb-469f-a165-70867728950e"
+        moment = datetime(2024, 2, 29, 23, 59, 59, 999999, tzinfo=timezone.utc)
+        
+        assert len(pack_id(account_id)) == 16
+        assert unpack_id(pack_id(account_id)) == account_id
+        assert pack_id("acc-1") == "acc-1"
+        assert pack_id(account_id.upper()) == account_id.upper()
+        assert from_micros(to_micros(moment)) == moment.isoformat(timespec="microseconds")
+        assert to_micros(moment.replace(tzinfo=None)) == to_micros(moment)
+    
+    def test_rows_stored_compactly(self):
+        """New rows should store blob IDs and integer timestamps."""
+        account = create_account("Test User")
+        recorded, _ = apply_transaction(account.account_id, TransactionType.DEPOSIT, 10)
+        
+        with get_connection() as connection:
+            stored = connection.execute(
+                """SELECT typeof(transaction_id), length(transaction_id),
+                          typeof(account_id), typeof(created_at)
+                   FROM transactions"""
+            ).fetchone()
+            account_type = connection.execute(
+                "SELECT typeof(account_id) FROM accounts"
+            ).fetchone()[0]
+        
+        assert tuple(stored) == ("blob", 16, "blob", "integer")
+        assert account_type == "blob"
+        
+        history = get_transactions_by_account(account.account_id)
+        assert history[0].transaction_id == recorded.transaction_id
+        assert history[0].account_id == account.account_id
+        assert history[0].created_at == recorded.created_at
+    
+    def test_migration_compacts_existing_rows(self):
+        """Canonical IDs and ISO timestamps should be converted in place."""
+        account_id = "0f8fad5b-d9cb-469f-a165-70867728950e"
+        create_v7_database([
+            ("9b2d7f7e-3c43-4d7d-9a3a-59a8b1f4a001", account_id, "DEPOSIT", 100,
+             "2024-01-01T00:00:00.000001+00:00"),
+            ("9b2d7f7e-3c43-4d7d-9a3a-59a8b1f4a002", account_id, "DEPOSIT", 200,
+             "2024-01-02T00:00:00.000002+00:00"),
+            ("9b2d7f7e-3c43-4d7d-9a3a-59a8b1f4a003", account_id, "DEPOSIT", 300,
+             "2024-01-03T00:00:00.000003+00:00"),
+        ])
+        
+        # A cursor issued before the migration, positioned after the newest row
+        old_cursor = operations._encode_cursor(
+            (None, None, None, None, "2024-01-03T00:00:00.000003+00:00", None, None, 3)
+        )
+        
+        initialize_database()
+        
+        with get_connection() as connection:
+            stored = connection.execute(
+                """SELECT rowid, typeof(account_id), typeof(created_at)
+                   FROM transactions ORDER BY rowid"""
+            ).fetchall()
+        assert [tuple(row) for row in stored] == [
+            (1, "blob", "integer"),
+            (2, "blob", "integer"),
+            (3, "blob", "integer"),
+        ]
+        
+        assert get_account_by_id(account_id).balance == 600
+        history = get_transactions_by_account(account_id)
+        assert [t.created_at for t in history] == [
+            "2024-01-03T00:00:00.000003+00:00",
+            "2024-01-02T00:00:00.000002+00:00",
+            "2024-01-01T00:00:00.000001+00:00",
+        ]
+        assert history[-1].transaction_id == "9b2d7f7e-3c43-4d7d-9a3a-59a8b1f4a001"
+        
+        page = get_transactions_page(account_id, limit=5, before=old_cursor)
+        assert [t.amount for t in page.transactions] == [200, 100]
+    
+    def test_migrate_tool_reports_pending_shards(self, capsys):
+        """--check should fail until the tool has migrated the file."""
+        create_v7_database([
+            ("9b2d7f7e-3c43-4d7d-9a3a-59a8b1f4a001",
+             "0f8fad5b-d9cb-469f-a165-70867728950e", "DEPOSIT", 100,
+             "2024-01-01T00:00:00+00:00"),
+        ])
+        
+        assert migrate.main(["--check"]) == 1
+        assert migrate.main(["--vacuum"]) == 0
+        assert migrate.main(["--check"]) == 0
+        assert "version 7 -> " in capsys.readouterr().out
+        
+        with get_connection() as connection:
+            assert schema.get_schema_version(connection) == SCHEMA_VERSION
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    """Run against a throwaway database split into four shards."""
+    close_connections()
+    get_account_cache().clear()
+    monkeypatch.setenv("ZENITH_DATABASE_PATH", str(tmp_path / "bank.db"))
+    monkeypatch.setenv("ZENITH_SHARDS", "4")
+    initialize_database()
+    
+    yield monkeypatch
+    
+    close_connections()
+    get_account_cache().clear()
+
+
+def ledger_rollups(shard_count: int = 1) -> list[tuple]:
+    """Aggregate the ledger per day, account and type straight from the rows."""
+    rows = []
+    for shard in range(shard_count):
+        with get_connection(shard=shard) as connection:
+            rows.extend(
+                (day, unpack_id(account_id), transaction_type, count, amount)
+                for day, account_id, transaction_type, count, amount in connection.execute(
+                    """SELECT date(created_at / 1000000, 'unixepoch'), account_id, type,
+                              COUNT(*), SUM(amount)
+                       FROM transactions
+                       GROUP BY 1, 2, 3"""
+                )
+            )
+    return sorted(rows)
+
+
+def accounts_per_shard(shard_count: int) -> list[int]:
+    """Count the accounts stored in each shard file."""
+    counts = []
+    for shard in range(shard_count):
+        connection = sqlite3.connect(get_shard_path(shard))
+        counts.append(connection.execute("SELECT COUNT(*) FROM accounts").fetchone()[0])
+        connection.close()
+    return counts
+
+
+class TestSharding:
+    """Tests for routing accounts across shard files and rebalancing."""
+    
+    def test_accounts_routed_to_their_shard(self, sharded):
+        """Each account should live only in the shard its ID hashes to."""
+        accounts = [create_account(f"User {i}") for i in range(20)]
+        for account in accounts:
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 100)
+        
+        counts = accounts_per_shard(4)
+        expected = [0, 0, 0, 0]
+        for account in accounts:
+            expected[shard_for(account.account_id)] += 1
+        
+        assert counts == expected
+        assert sum(1 for count in counts if count) > 1
+        assert all(get_account_by_id(a.account_id).balance == 100 for a in accounts)
+    
+    def test_batches_span_shards(self, sharded):
+        """Batch operations should split across shards and keep request order."""
+        accounts = [create_account(f"User {i}") for i in range(8)]
+        items = [(account.account_id, 10 * (i + 1)) for i, account in enumerate(accounts)]
+        items.append(("missing", 5))
+        
+        results = apply_transactions(TransactionType.DEPOSIT, items)
+        found = get_accounts_by_ids([account.account_id for account in accounts])
+        
+        assert [result[1] for result in results[:-1]] == [amount for _, amount in items[:-1]]
+        assert isinstance(results[-1], AccountNotFoundError)
+        assert {a: found[a].balance for a, _ in items[:-1]} == dict(items[:-1])
+    
+    def test_search_merges_shards(self, sharded):
+        """Search and listing pages should merge every shard in order."""
+        names = [f"{'Ab' if i % 2 else 'ab'}{i:02d}" for i in range(12)]
+        for name in names:
+            create_account(name)
+        
+        found = []
+        page = find_accounts("AB", limit=5)
+        while True:
+            found.extend(account.holder_name for account in page.accounts)
+            if page.next_cursor is None:
+                break
+            page = find_accounts("AB", limit=5, cursor=page.next_cursor)
+        listed = list_accounts(limit=100).accounts
+        
+        assert found == sorted(names, key=str.lower)
+        assert [a.account_id for a in listed] == sorted(a.account_id for a in listed)
+        assert len(listed) == 12
+    
+    def test_group_commit_per_shard(self, sharded):
+        """Group commit should run one writer per shard."""
+        sharded.setenv("ZENITH_GROUP_COMMIT", "1")
+        accounts = [create_account(f"User {i}") for i in range(8)]
+        
+        async def deposit_all():
+            await asyncio.gather(*(
+                aio.apply_transaction(a.account_id, TransactionType.DEPOSIT, 50)
+                for a in accounts
+            ))
+            return await aio.apply_transactions(
+                TransactionType.DEPOSIT,
+                [(a.account_id, 1) for a in accounts],
+            )
+        
+        try:
+            results = asyncio.run(deposit_all())
+        finally:
+            close_group_commit_writer()
+        
+        assert [balance for _, balance in results] == [51] * 8
+    
+    def test_transfer_across_shards(self, sharded):
+        """Transfers between shards should apply both sides or neither."""
+        source = create_account("Source")
+        target = create_account("Target")
+        while shard_for(target.account_id) == shard_for(source.account_id):
+            target = create_account("Target")
+        apply_transaction(source.account_id, TransactionType.DEPOSIT, 100)
+        
+        transfer(source.account_id, target.account_id, 60)
+        with pytest.raises(InsufficientFundsError):
+            transfer(source.account_id, target.account_id, 60)
+        
+        assert get_account_by_id(source.account_id).balance == 40
+        assert get_account_by_id(target.account_id).balance == 60
+        assert verify_account(source.account_id, full=True).ok
+        assert verify_account(target.account_id, full=True).ok
+    
+    def test_partial_cross_shard_commit_not_retried(self, sharded):
+        """A cross-shard transfer should not replay once one shard committed."""
+        source = create_account("Source")
+        target = create_account("Target")
+        while shard_for(target.account_id) == shard_for(source.account_id):
+            target = create_account("Target")
+        apply_transaction(source.account_id, TransactionType.DEPOSIT, 100)
+        
+        commits = []
+        real_commit = connection_module.commit
+        
+        def fail_second(connection):
+            commits.append(connection)
+            if len(commits) == 2:
+                raise sqlite3.OperationalError("database is locked")
+            real_commit(connection)
+        
+        sharded.setattr(connection_module, "commit", fail_second)
+        with pytest.raises(PartialCommitError) as raised:
+            transfer(source.account_id, target.account_id, 60)
+        
+        first, second = sorted((shard_for(source.account_id), shard_for(target.account_id)))
+        assert len(commits) == 2
+        assert (raised.value.committed_shard, raised.value.failed_shard) == (second, first)
+    
+    def test_rebalance_moves_accounts(self, sharded):
+        """Changing the shard count should move accounts with their ledgers."""
+        accounts = [create_account(f"User {i}") for i in range(20)]
+        for account in accounts:
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 100)
+            apply_transaction(
+                account.account_id,
+                TransactionType.WITHDRAWAL,
+                30,
+                f"withdraw-{account.account_id}",
+            )
+        
+        summary = rebalance(2)
+        sharded.setenv("ZENITH_SHARDS", "2")
+        get_account_cache().clear()
+        get_idempotency_cache().clear()
+        
+        assert find_shard_files() == [0, 1]
+        assert sum(accounts_per_shard(2)) == 20
+        assert summary["moved_accounts"] > 0
+        assert summary["moved_transactions"] == 2 * summary["moved_accounts"]
+        for account in accounts:
+            # Keys moved with their accounts, so the retry is still a replay
+            apply_transaction(
+                account.account_id,
+                TransactionType.WITHDRAWAL,
+                30,
+                f"withdraw-{account.account_id}",
+            )
+            assert get_account_by_id(account.account_id).balance == 70
+            assert len(get_transactions_by_account(account.account_id)) == 2
+            assert verify_account(account.account_id).ok
+    
+    def test_rebalance_keeps_rollups_exact(self, sharded):
+        """Rollups should match the ledger after accounts change shards."""
+        accounts = [create_account(f"User {i}") for i in range(20)]
+        for account in accounts:
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 100)
+        refresh_rollups()
+        
+        rebalance(2)
+        sharded.setenv("ZENITH_SHARDS", "2")
+        get_account_cache().clear()
+        for account in accounts:
+            apply_transaction(account.account_id, TransactionType.WITHDRAWAL, 30)
+        refresh_rollups()
+        
+        assert sorted(read_rollups("0000-01-01", "9999-12-31")) == ledger_rollups(2)
+    
+    def test_rebalance_keeps_archived_rollups(self, sharded):
+        """Rollups of archived rows should survive their account moving."""
+        accounts = [create_account(f"User {i}") for i in range(20)]
+        for account in accounts:
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, 100)
+        archive_transactions(datetime.now(timezone.utc) + timedelta(seconds=1))
+        expected = sorted(read_rollups("0000-01-01", "9999-12-31"))
+        
+        rebalance(2)
+        sharded.setenv("ZENITH_SHARDS", "2")
+        refresh_rollups()
+        
+        assert sorted(read_rollups("0000-01-01", "9999-12-31")) == expected
+        for account in accounts:
+            assert get_transactions_by_account(account.account_id)[0].amount == 100
+
+
+def age_history(account_id: str, count: int, days: int = 20) -> None:
+    """Backdate an account's first rows, each ``days`` before the next."""
+    with get_connection(account_id) as connection:
+        with immediate_transaction(connection):
+            connection.execute(
+                """UPDATE transactions
+                   SET created_at = created_at - (? - seq + 1) * ?
+                   WHERE account_id = ? AND seq <= ?""",
+                (count, days * 86_400_000_000, pack_id(account_id), count),
+            )
+
+
+def read_history(account_id: str, limit: int = 3) -> list:
+    """Page through an account's whole history, newest first."""
+    transactions = []
+    page = get_transactions_page(account_id, limit=limit)
+    transactions.extend(page.transactions)
+    while page.next_cursor:
+        page = get_transactions_page(account_id, limit=limit, before=page.next_cursor)
+        transactions.extend(page.transactions)
+    return transactions
+
+
+class TestArchive:
+    """Tests for moving old ledger rows into per-month archive files."""
+    
+    def create_history(self) -> list[Account]:
+        """Two accounts whose first six rows are months old."""
+        accounts = [create_account("Test User"), create_account("Other User")]
+        for account in accounts:
+            for i in range(1, 9):
+                apply_transaction(account.account_id, TransactionType.DEPOSIT, i)
+            age_history(account.account_id, 6)
+        transfer(accounts[0].account_id, accounts[1].account_id, 5)
+        return accounts
+    
+    def test_reads_continue_into_archives(self, sharded):
+        """History, statements, balances and verification should span both tiers."""
+        accounts = self.create_history()
+        old_moment = datetime.now(timezone.utc) - timedelta(days=70)
+        before = {
+            account.account_id: (
+                read_history(account.account_id),
+                list(iter_statement(account.account_id, chunk_size=4)),
+                get_balance_at(account.account_id, old_moment),
+            )
+            for account in accounts
+        }
+        refresh_rollups()
+        rollups = sorted(read_rollups("0000-01-01", "9999-12-31"))
+        
+        summary = archive_transactions(datetime.now(timezone.utc) - timedelta(days=1))
+        
+        assert summary["archived"] == 12
+        assert len(summary["months"]) >= 3
+        for account in accounts:
+            history, statement, balance = before[account.account_id]
+            assert read_history(account.account_id) == history
+            assert list(iter_statement(account.account_id, chunk_size=4)) == statement
+            assert get_balance_at(account.account_id, old_moment) == balance
+            assert verify_account(account.account_id).ok
+            verification = verify_account(account.account_id, full=True)
+            assert verification.transactions_checked == len(history)
+            
+            # One page spanning both tiers knows it reached the end
+            page = get_transactions_page(account.account_id, limit=len(history))
+            assert page.transactions == history
+            assert page.next_cursor is None
+        assert sorted(read_rollups("0000-01-01", "9999-12-31")) == rollups
+        
+        apply_transaction(accounts[0].account_id, TransactionType.DEPOSIT, 1)
+        assert refresh_rollups() == 1
+    
+    def test_after_cursor_crosses_into_hot_rows(self, sharded):
+        """Paging towards newer rows from an archived row should reach the hot file."""
+        account = create_account("Test User")
+        for i in range(1, 7):
+            apply_transaction(account.account_id, TransactionType.DEPOSIT, i)
+        age_history(account.account_id, 3)
+        archive_transactions(datetime.now(timezone.utc) - timedelta(days=1))
+        
+        first = get_transactions_page(account.account_id, limit=5)
+        last = get_transactions_page(account.account_id, limit=5, before=first.next_cursor)
+        newer = get_transactions_page(account.account_id, limit=3, after=last.prev_cursor)
+        
+        assert [t.amount for t in last.transactions] == [1]
+        assert last.next_cursor is None
+        assert [t.amount for t in newer.transactions] == [4, 3, 2]
+        assert newer.next_cursor and newer.prev_cursor
+    
+    def test_compressed_months_stay_readable(self, sharded):
+        """Gzipped months should be read back transparently."""
+        accounts = self.create_history()
+        history = {account.account_id: read_history(account.account_id) for account in accounts}
+        
+        summary = archive_transactions(
+            datetime.now(timezone.utc) - timedelta(days=1),
+            compress=True,
+        )
+        
+        assert summary["compressed"]
+        assert all(path.endswith(".gz") for path in summary["compressed"])
+        for account in accounts:
+            assert read_history(account.account_id) == history[account.account_id]
+            assert verify_account(account.account_id, full=True).ok
+    
+    def test_interrupted_run_is_repeatable(self, sharded):
+        """Rows copied but not yet deleted should be read once and cleaned up later."""
+        accounts = self.create_history()
+        history = {account.account_id: read_history(account.account_id) for account in accounts}
+        cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+        
+        def crash(*args):
+            raise RuntimeError("interrupted")
+        
+        with sharded.context() as patch:
+            patch.setattr(archive, "_delete_batch", crash)
+            with pytest.raises(RuntimeError):
+                archive_transactions(cutoff)
+        
+        for account in accounts:
+            assert read_history(account.account_id) == history[account.account_id]
+            assert verify_account(account.account_id, full=True).ok
+        
+        assert archive_transactions(cutoff)["archived"] == 12
+        for account in accounts:
+            assert read_history(account.account_id) == history[account.account_id]
+
+
+class TestBackup:
+    """Tests for online backups and restoring them."""
+    
+    def test_restore_returns_to_the_backed_up_state(self, sharded, tmp_path):
+        """A restore should bring back every shard and archive as it was."""
+        accounts = TestArchive().create_history()
+        archive_transactions(datetime.now(timezone.utc) - timedelta(days=1), compress=True)
+        history = {account.account_id: read_history(account.account_id) for account in accounts}
+        balances = {
+            account.account_id: get_account_by_id(account.account_id).balance
+            for account in accounts
+        }
+        
+        summary = create_backup(tmp_path / "backup", pages_per_step=2, pause=0)
+        
+        assert summary["shards"] == len(find_shard_files())
+        assert summary["files"] > summary["shards"]
+        
+        apply_transaction(accounts[0].account_id, TransactionType.DEPOSIT, 1000)
+        archive_transactions(datetime.now(timezone.utc) + timedelta(seconds=1))
+        
+        restored = restore_backup(tmp_path / "backup")
+        get_account_cache().clear()
+        
+        assert restored["shards"] == summary["shards"]
+        for account in accounts:
+            assert get_account_by_id(account.account_id).balance == balances[account.account_id]
+            assert read_history(account.account_id) == history[account.account_id]
+            assert verify_account(account.account_id, full=True).ok
+    
+    def test_backup_is_consistent_under_writes(self, sharded, tmp_path):
+        """Writes during a backup should neither block it nor tear the copy."""
+        accounts = [create_account(f"User {i}") for i in range(8)]
+        stop = threading.Event()
+        
+        def write():
+            while not stop.is_set():
+                for account in accounts:
+                    apply_transaction(account.account_id, TransactionType.DEPOSIT, 1)
+        
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            create_backup(tmp_path / "backup", pages_per_step=1, pause=0.001)
+        finally:
+            stop.set()
+            writer.join()
+        
+        restore_backup(tmp_path / "backup")
+        get_account_cache().clear()
+        for account in accounts:
+            assert verify_account(account.account_id, full=True).ok
+    
+    def test_restore_rejects_damaged_backup(self, sharded, tmp_path):
+        """A damaged copy should be refused before any live file is touched."""
+        account = create_account("Test User")
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 10)
+        create_backup(tmp_path / "backup", pause=0)
+        apply_transaction(account.account_id, TransactionType.DEPOSIT, 5)
+        
+        copy = tmp_path / "backup" / get_shard_path(shard_for(account.account_id)).name
+        copy.write_bytes(b"not a database" * 100)
+        
+        with pytest.raises(ValueError):
+            restore_backup(tmp_path / "backup")
+        assert get_account_by_id(account.account_id).balance == 15
@@ -0,0 +1,160 @@
+"""Tests for the metrics registry and its exposure through the server."""
+
+import os
+
+import pytest
+from starlette.testclient import TestClient
+
+os.environ["ZENITH_TEST_MODE"] = "1"
+
+from src.zenith.database import get_account_cache
+from src.zenith.database.connection import close_connections
+from src.zenith.database.schema import initialize_database
+from src.zenith.metrics import TOOL_CALLS, TOOL_LATENCY, MetricsRegistry, registry, snapshot
+from src.zenith.server import mcp
+
+from tests.test_server import call_tool
+
+
+@pytest.fixture(autouse=True)
+def setup_test_db(tmp_path, monkeypatch):
+    """Create a fresh single-shard test database for each test."""
+    close_connections()
+    get_account_cache().clear()
+    monkeypatch.setenv("ZENITH_DATABASE_PATH", str(tmp_path / "bank.db"))
+    monkeypatch.setenv("ZENITH_SHARDS", "1")
+    
+    initialize_database()
+    
+    yield
+    
+    close_connections()
+
+
+def sample_value(text: str, series: str) -> float:
+    """Find the value of one series in Prometheus exposition text."""
+    for line in text.splitlines():
+        name, _, value = line.rpartition(" ")
+        if name == series:
+            return float(value)
+    raise AssertionError(f"{series} not found")
+
+
+class TestRegistry:
+    """Tests for counters, histograms and rendering."""
+    
+    def test_counter_render(self):
+        """Counters should render one labelled series per label set."""
+        metrics = MetricsRegistry()
+        calls = metrics.counter("calls_total", "Calls", ("tool",))
+        calls.labels(tool="a").inc()
+        calls.labels(tool="a").inc(2)
+        calls.labels(tool="b").inc()
+        
+        text = metrics.render()
+        
+        assert "# TYPE calls_total counter" in text
+        assert sample_value(text, 'calls_total{tool="a"}') == 3
+        assert sample_value(text, 'calls_total{tool="b"}') == 1
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """Histogram buckets should count every observation at or below them."""
+        metrics = MetricsRegistry()
+        latency = metrics.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            latency.labels().observe(value)
+        
+        text = metrics.render()
+        
+        assert sample_value(text, 'latency_seconds_bucket{le="0.1"}') == 1
+        assert sample_value(text, 'latency_seconds_bucket{le="1.0"}') == 3
+        assert sample_value(text, 'latency_seconds_bucket{le="+Inf"}') == 4
+        assert sample_value(text, "latency_seconds_count") == 4
+        assert sample_value(text, "latency_seconds_sum") == pytest.approx(6.05)
+    
+    def test_quantile_estimate(self):
+        """Quantiles should fall inside the bucket holding that rank."""
+        metrics = MetricsRegistry()
+        latency = metrics.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for _ in range(90):
+            latency.labels().observe(0.05)
+        for _ in range(10):
+            latency.labels().observe(0.5)
+        
+        assert latency.labels().quantile(0.5) <= 0.1
+        assert 0.1 < latency.labels().quantile(0.99) <= 1.0
+    
+    def test_register_stats_exposes_numeric_fields(self):
+        """Stats collectors should become gauges and skip non-numeric fields."""
+        metrics = MetricsRegistry()
+        metrics.register_stats("pool", "Pool", lambda: {"open": 2, "profile": "strict"})
+        metrics.register_stats("idle", "Idle", lambda: None)
+        
+        text = metrics.render()
+        
+        assert "# TYPE zenith_pool_open gauge" in text
+        assert sample_value(text, "zenith_pool_open") == 2
+        assert "profile" not in text
+        assert "zenith_idle" not in text
+
+
+class TestServerMetrics:
+    """Tests for instrumentation of tools and the database layer."""
+    
+    def test_tool_calls_are_counted(self):
+        """Tool calls should be counted by outcome and timed."""
+        before = registry.render()
+        
+        account_id = call_tool("create_account", {"holder_name": "Alice"})["account_id"]
+        call_tool("deposit", {"account_id": account_id, "amount": 10.0})
+        call_tool("deposit", {"account_id": "missing", "amount": 10.0})
+        
+        after = registry.render()
+        ok = 'zenith_tool_calls_total{tool="deposit",outcome="ok"}'
+        error = 'zenith_tool_calls_total{tool="deposit",outcome="error"}'
+        
+        def delta(series: str) -> float:
+            try:
+                previous = sample_value(before, series)
+            except AssertionError:
+                previous = 0.0
+            return sample_value(after, series) - previous
+        
+        assert delta(ok) == 1
+        assert delta(error) == 1
+        assert delta('zenith_tool_latency_seconds_count{tool="deposit"}') == 2
+        assert delta("zenith_db_commits_total") >= 2
+        assert sample_value(after, 'zenith_pool_open{shard="0"}') >= 1
+    
+    def test_get_server_stats_tool(self):
+        """get_server_stats should report tools, database timings and gauges."""
+        call_tool("create_account", {"holder_name": "Alice"})
+        
+        stats = call_tool("get_server_stats", {})
+        
+        assert stats["tools"]["create_account"]["calls"] >= 1
+        assert "create_account" in stats["db_operations"]
+        assert stats["commits"] >= 1
+        assert "zenith_pool_size{shard=0}" in stats["gauges"]
+        assert call_tool("get_server_stats", {})["tools"]["get_server_stats"]["calls"] >= 1
+    
+    def test_snapshot_does_not_create_series(self):
+        """Reading the stats should not add zero-valued series."""
+        TOOL_LATENCY.labels(tool="probe").observe(0.001)
+        
+        stats = snapshot()
+        
+        assert stats["tools"]["probe"]["errors"] == 0
+        assert TOOL_CALLS.find(tool="probe", outcome="error") is None
+    
+    def test_metrics_route(self):
+        """The /metrics route should serve the exposition text."""
+        call_tool("create_account", {"holder_name": "Alice"})
+        
+        with TestClient(mcp.http_app(transport="sse")) as client:
+            response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "zenith_tool_latency_seconds_bucket" in response.text
+        assert "zenith_db_lock_wait_seconds_count" in response.text
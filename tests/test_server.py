@@ -1,13 +1,19 @@
 """Tests for MCP server tools."""
 
+import json
 import os
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 
 os.environ["ZENITH_TEST_MODE"] = "1"
 
-from src.zenith.database.connection import get_database_path
+from src.zenith.database.connection import close_connections
 from src.zenith.database.schema import initialize_database
 from src.zenith.database import create_account as db_create_account
+from src.zenith.database import get_account_cache, get_idempotency_cache
 
 
 # Import the actual tool functions (unwrapped)
@@ -15,19 +21,19 @@ from src.zenith.server import mcp
 
 
 @pytest.fixture(autouse=True)
-def setup_test_db():
-    """Create a fresh test database for each test."""
-    db_path = get_database_path()
-    
-    if db_path.exists():
-        db_path.unlink()
+def setup_test_db(tmp_path, monkeypatch):
+    """Create a fresh single-shard test database for each test."""
+    close_connections()
+    get_account_cache().clear()
+    get_idempotency_cache().clear()
+    monkeypatch.setenv("ZENITH_DATABASE_PATH", str(tmp_path / "bank.db"))
+    monkeypatch.setenv("ZENITH_SHARDS", "1")
     
     initialize_database()
     
     yield
     
-    if db_path.exists():
-        db_path.unlink()
+    close_connections()
 
 
 def call_tool(name: str, arguments: dict) -> dict:
@@ -98,6 +104,83 @@ class TestDepositTool:
         assert result["error"] == "Account not found"
 
 
+class TestMinorUnitBoundary:
+    """Tests for decimal/minor-unit conversion in the tools."""
+    
+    def test_repeated_decimal_deposits_do_not_drift(self):
+        """Cents should add exactly, without float rounding drift."""
+        account = db_create_account("Bob")
+        
+        for _ in range(3):
+            result = call_tool("deposit", {
+                "account_id": account.account_id,
+                "amount": 0.1,
+            })
+        
+        assert result["new_balance"] == 0.3
+    
+    def test_sub_cent_amount_rejected(self):
+        """Amounts finer than the minor unit should be rejected."""
+        account = db_create_account("Bob")
+        
+        result = call_tool("deposit", {
+            "account_id": account.account_id,
+            "amount": 1.005,
+        })
+        
+        assert "decimal places" in result["error"]
+    
+    def test_amount_below_one_minor_unit_rejected(self):
+        """Amounts that round to zero minor units should not be applied."""
+        account = db_create_account("Bob")
+        other = db_create_account("Carol")
+        call_tool("deposit", {"account_id": account.account_id, "amount": 5.0})
+        
+        results = [
+            call_tool("deposit", {"account_id": account.account_id, "amount": 1e-12}),
+            call_tool("withdraw", {"account_id": account.account_id, "amount": 1e-12}),
+            call_tool("transfer", {
+                "from_account_id": account.account_id,
+                "to_account_id": other.account_id,
+                "amount": 1e-12,
+            }),
+        ]
+        batch = call_tool("batch_deposit", {"operations": [
+            {"account_id": account.account_id, "amount": 1e-12},
+        ]})
+        history = call_tool("get_transactions", {"account_id": account.account_id})
+        
+        assert all("at least" in result["error"] for result in results)
+        assert batch["failed"] == 1
+        assert len(history["transactions"]) == 1
+    
+    def test_amount_beyond_64_bits_rejected(self):
+        """Amounts too large to store should return an error, not raise."""
+        account = db_create_account("Bob")
+        
+        result = call_tool("deposit", {
+            "account_id": account.account_id,
+            "amount": 1e18,
+        })
+        batch = call_tool("batch_deposit", {"operations": [
+            {"account_id": account.account_id, "amount": 1e18},
+        ]})
+        
+        assert "must not exceed" in result["error"]
+        assert "must not exceed" in batch["results"][0]["error"]
+    
+    def test_balance_overflow_rejected(self):
+        """A deposit that would overflow the balance should be refused."""
+        account = db_create_account("Bob")
+        
+        call_tool("deposit", {"account_id": account.account_id, "amount": 9e16})
+        result = call_tool("deposit", {"account_id": account.account_id, "amount": 9e16})
+        balance = call_tool("get_balance", {"account_id": account.account_id})
+        
+        assert result["error"] == "Balance limit exceeded"
+        assert balance["balance"] == 9e16
+
+
 class TestWithdrawTool:
     """Tests for withdraw MCP tool."""
     
@@ -130,6 +213,296 @@ class TestWithdrawTool:
         assert result["requested"] == 100.0
 
 
+class TestTransferTool:
+    """Tests for transfer MCP tool."""
+    
+    def test_transfer_success(self):
+        """Should move funds and report both balances."""
+        source = db_create_account("Erin")
+        target = db_create_account("Frank")
+        call_tool("deposit", {"account_id": source.account_id, "amount": 100.0})
+        
+        result = call_tool("transfer", {
+            "from_account_id": source.account_id,
+            "to_account_id": target.account_id,
+            "amount": 25.5,
+        })
+        
+        assert result["message"] == "Transfer successful"
+        assert result["from_balance"] == 74.5
+        assert result["to_balance"] == 25.5
+    
+    def test_transfer_errors(self):
+        """Should report overdrafts, missing accounts and self-transfers."""
+        source = db_create_account("Erin")
+        call_tool("deposit", {"account_id": source.account_id, "amount": 10.0})
+        
+        overdraft = call_tool("transfer", {
+            "from_account_id": source.account_id,
+            "to_account_id": db_create_account("Frank").account_id,
+            "amount": 20.0,
+        })
+        missing = call_tool("transfer", {
+            "from_account_id": source.account_id,
+            "to_account_id": "missing",
+            "amount": 5.0,
+        })
+        same = call_tool("transfer", {
+            "from_account_id": source.account_id,
+            "to_account_id": source.account_id,
+            "amount": 5.0,
+        })
+        
+        assert overdraft["error"] == "Insufficient funds"
+        assert missing == {"error": "Account not found", "account_id": "missing"}
+        assert same["error"] == "Cannot transfer to the same account"
+
+
+class TestWriterUnavailable:
+    """Tests for write tools when the writer process does not answer."""
+    
+    @pytest.fixture
+    def dead_writer(self):
+        """Route writes to a writer client that never gets a reply."""
+        from src.zenith.database.ipc import WriterUnavailableError, set_writer_client
+        
+        class DeadWriter:
+            async def call(self, operation, *args):
+                raise WriterUnavailableError("No reply from the writer process after 0s")
+        
+        set_writer_client(DeadWriter())
+        yield
+        set_writer_client(None)
+    
+    def test_write_tools_return_error(self, dead_writer):
+        """Every write tool should report the outage instead of raising."""
+        account_id = "00000000-0000-0000-0000-000000000001"
+        calls = [
+            ("create_account", {"holder_name": "Grace"}),
+            ("deposit", {"account_id": account_id, "amount": 5.0}),
+            ("withdraw", {"account_id": account_id, "amount": 5.0}),
+            ("transfer", {
+                "from_account_id": account_id,
+                "to_account_id": "00000000-0000-0000-0000-000000000002",
+                "amount": 5.0,
+            }),
+            ("batch_deposit", {"operations": [{"account_id": account_id, "amount": 5.0}]}),
+            ("batch_withdraw", {"operations": [{"account_id": account_id, "amount": 5.0}]}),
+        ]
+        
+        for name, arguments in calls:
+            result = call_tool(name, arguments)
+            assert result["error"].startswith("Writer unavailable"), name
+            assert "No reply" in result["detail"]
+
+
+class TestStartup:
+    """Tests for server start-up cost."""
+    
+    def test_import_does_not_touch_database(self, tmp_path):
+        """Loading the server module should leave the database alone until first use."""
+        database_path = tmp_path / "untouched.db"
+        environment = {**os.environ, "ZENITH_DATABASE_PATH": str(database_path)}
+        
+        subprocess.run(
+            [sys.executable, "-c", "import src.zenith.server"],
+            check=True,
+            cwd=Path(__file__).parent.parent,
+            env=environment,
+        )
+        
+        assert not database_path.exists()
+    
+    def test_import_does_not_load_numpy(self):
+        """NumPy should wait for the first ledger summary."""
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, src.zenith.server; assert 'numpy' not in sys.modules",
+            ],
+            check=True,
+            cwd=Path(__file__).parent.parent,
+        )
+
+
+class TestAccountSearchTools:
+    """Tests for the find_accounts and list_accounts tools."""
+    
+    def test_find_accounts_by_prefix(self):
+        """Searching should return matching accounts with decimal balances."""
+        account = db_create_account("Margaret")
+        db_create_account("Oscar")
+        call_tool("deposit", {"account_id": account.account_id, "amount": 12.5})
+        
+        result = call_tool("find_accounts", {"holder_name_prefix": "marg"})
+        
+        assert result["account_count"] == 1
+        assert result["accounts"][0] == {
+            "account_id": account.account_id,
+            "holder_name": "Margaret",
+            "balance": 12.5,
+        }
+        assert result["next_cursor"] is None
+    
+    def test_list_accounts_pages(self):
+        """Listing should hand out a cursor until every account is returned."""
+        for name in ["Ivan", "Judy", "Mallory"]:
+            db_create_account(name)
+        
+        first = call_tool("list_accounts", {"limit": 2})
+        second = call_tool("list_accounts", {"cursor": first["next_cursor"], "limit": 2})
+        
+        assert first["account_count"] == 2
+        assert second["account_count"] == 1
+        assert second["next_cursor"] is None
+    
+    def test_invalid_cursor_returns_error(self):
+        """A malformed cursor should produce an error, not an exception."""
+        result = call_tool("list_accounts", {"cursor": "bogus"})
+        
+        assert "error" in result
+
+
+class TestIdempotencyKeys:
+    """Tests for idempotency keys on mutating tools."""
+    
+    def test_retried_deposit_returns_original_response(self):
+        """A retry with the same key should repeat the response, not the deposit."""
+        account = db_create_account("Grace")
+        arguments = {
+            "account_id": account.account_id,
+            "amount": 10.0,
+            "idempotency_key": "retry-me",
+        }
+        
+        first = call_tool("deposit", arguments)
+        retry = call_tool("deposit", arguments)
+        balance = call_tool("get_balance", {"account_id": account.account_id})
+        
+        assert retry == first
+        assert balance["balance"] == 10.0
+    
+    def test_reused_key_is_rejected(self):
+        """A key reused with other arguments should return an error."""
+        account = db_create_account("Grace")
+        call_tool("deposit", {
+            "account_id": account.account_id,
+            "amount": 10.0,
+            "idempotency_key": "retry-me",
+        })
+        
+        result = call_tool("withdraw", {
+            "account_id": account.account_id,
+            "amount": 5.0,
+            "idempotency_key": "retry-me",
+        })
+        
+        assert result["idempotency_key"] == "retry-me"
+        assert "different request" in result["error"]
+    
+    def test_retried_create_account(self):
+        """Creating an account twice with one key should create it once."""
+        first = call_tool("create_account", {"holder_name": "Heidi", "idempotency_key": "new"})
+        retry = call_tool("create_account", {"holder_name": "Heidi", "idempotency_key": "new"})
+        
+        assert retry == first
+
+
+class TestLedgerSummaryTool:
+    """Tests for the get_ledger_summary tool."""
+    
+    def test_summarizes_todays_activity(self):
+        """The window should include flows written just before the call."""
+        from datetime import datetime, timedelta, timezone
+        
+        source = db_create_account("Ivan")
+        target = db_create_account("Judy")
+        call_tool("deposit", {"account_id": source.account_id, "amount": 10.5})
+        call_tool("withdraw", {"account_id": source.account_id, "amount": 2.25})
+        call_tool("transfer", {
+            "from_account_id": source.account_id,
+            "to_account_id": target.account_id,
+            "amount": 1.0,
+        })
+        today = datetime.now(timezone.utc).date()
+        
+        result = call_tool("get_ledger_summary", {
+            "start_date": (today - timedelta(days=1)).isoformat(),
+            "end_date": (today + timedelta(days=1)).isoformat(),
+        })
+        
+        assert len(result["days"]) == 3
+        assert result["totals"]["deposits"] == {"count": 1, "amount": 10.5}
+        assert result["totals"]["withdrawals"] == {"count": 1, "amount": 2.25}
+        assert result["totals"]["transfers"] == {"count": 1, "amount": 1.0}
+        assert result["totals"]["net_flow"] == 8.25
+        assert result["top_accounts"][0] == {
+            "account_id": source.account_id,
+            "transactions": 3,
+            "volume": 13.75,
+        }
+    
+    def test_defaults_to_last_thirty_days(self):
+        """Without dates the summary should cover the last 30 days."""
+        result = call_tool("get_ledger_summary", {})
+        
+        assert len(result["days"]) == 30
+        assert result["days"][-1]["date"] == result["end_date"]
+        assert result["top_accounts"] == []
+    
+    def test_failed_refresh_serves_folded_rollups(self, monkeypatch):
+        """A refresh error should not stop the summary from being served."""
+        from src.zenith.database import aio
+        
+        account = db_create_account("Ivan")
+        call_tool("deposit", {"account_id": account.account_id, "amount": 10.5})
+        assert call_tool("get_ledger_summary", {})["stale"] is False
+        
+        async def failing_refresh():
+            raise RuntimeError("integer overflow")
+        
+        monkeypatch.setattr(aio, "refresh_rollups", failing_refresh)
+        call_tool("deposit", {"account_id": account.account_id, "amount": 1.0})
+        result = call_tool("get_ledger_summary", {})
+        
+        assert result["stale"] is True
+        assert result["totals"]["deposits"] == {"count": 1, "amount": 10.5}
+    
+    def test_background_folding_skips_refresh(self, monkeypatch):
+        """With a folder running the summary should only read the rollups."""
+        from src.zenith.database import aio, close_rollup_folder, start_rollup_folder
+        
+        refreshes = []
+        
+        async def counting_refresh():
+            refreshes.append(1)
+            return 0
+        
+        monkeypatch.setattr(aio, "refresh_rollups", counting_refresh)
+        monkeypatch.setenv("ZENITH_ROLLUP_INTERVAL", "60")
+        start_rollup_folder()
+        try:
+            result = call_tool("get_ledger_summary", {})
+        finally:
+            close_rollup_folder()
+        
+        assert result["stale"] is False
+        assert refreshes == []
+    
+    def test_rejects_bad_windows(self):
+        """Malformed, inverted and overlong windows should return errors."""
+        assert "error" in call_tool("get_ledger_summary", {"start_date": "yesterday"})
+        assert "error" in call_tool("get_ledger_summary", {
+            "start_date": "2026-02-01",
+            "end_date": "2026-01-01",
+        })
+        assert "error" in call_tool("get_ledger_summary", {
+            "start_date": "2020-01-01",
+            "end_date": "2026-01-01",
+        })
+
+
 class TestGetBalanceTool:
     """Tests for get_balance MCP tool."""
     
@@ -158,3 +531,216 @@ class TestGetTransactionsTool:
         assert result["transaction_count"] == 2
         assert len(result["transactions"]) == 2
         assert result["transactions"][0]["type"] == "WITHDRAWAL"  # Most recent
+    
+    def test_negative_limit_rejected(self):
+        """A negative limit should return an error, not an unbounded page."""
+        account = db_create_account("Frank")
+        call_tool("deposit", {"account_id": account.account_id, "amount": 100.0})
+        
+        result = call_tool("get_transactions", {
+            "account_id": account.account_id,
+            "limit": -3,
+        })
+        
+        assert result["error"] == "Limit must be between 1 and 1000"
+    
+    def test_get_transactions_paginates(self):
+        """Should return a cursor that continues to older transactions."""
+        account = db_create_account("Grace")
+        for amount in (10.0, 20.0, 30.0):
+            call_tool("deposit", {"account_id": account.account_id, "amount": amount})
+        
+        first = call_tool("get_transactions", {
+            "account_id": account.account_id,
+            "limit": 2,
+        })
+        second = call_tool("get_transactions", {
+            "account_id": account.account_id,
+            "limit": 2,
+            "before": first["next_cursor"],
+        })
+        
+        assert [t["amount"] for t in first["transactions"]] == [30.0, 20.0]
+        assert [t["amount"] for t in second["transactions"]] == [10.0]
+        assert second["next_cursor"] is None
+
+
+class TestBatchTools:
+    """Tests for the batch MCP tools."""
+    
+    def test_batch_deposit_reports_per_item_results(self):
+        """Should apply valid items and report errors for the rest."""
+        first = db_create_account("Heidi")
+        second = db_create_account("Ivan")
+        
+        result = call_tool("batch_deposit", {"operations": [
+            {"account_id": first.account_id, "amount": 10.0},
+            {"account_id": "invalid-id", "amount": 5.0},
+            {"account_id": second.account_id, "amount": -1.0},
+            {"account_id": first.account_id, "amount": 15.0},
+        ]})
+        
+        assert result["succeeded"] == 2
+        assert result["failed"] == 2
+        assert result["results"][0]["new_balance"] == 10.0
+        assert result["results"][1]["error"] == "Account not found"
+        assert result["results"][2]["error"] == "Amount must be positive"
+        assert result["results"][3]["new_balance"] == 25.0
+    
+    def test_batch_withdraw_checks_running_balance(self):
+        """Each withdrawal should see the balance left by earlier items."""
+        account = db_create_account("Judy")
+        call_tool("deposit", {"account_id": account.account_id, "amount": 50.0})
+        
+        result = call_tool("batch_withdraw", {"operations": [
+            {"account_id": account.account_id, "amount": 30.0},
+            {"account_id": account.account_id, "amount": 30.0},
+        ]})
+        
+        assert result["results"][0]["new_balance"] == 20.0
+        assert result["results"][1]["error"] == "Insufficient funds"
+        assert result["results"][1]["balance"] == 20.0
+    
+    def test_batch_get_balance(self):
+        """Should return balances in request order with misses flagged."""
+        account = db_create_account("Karl")
+        call_tool("deposit", {"account_id": account.account_id, "amount": 5.0})
+        
+        result = call_tool("batch_get_balance", {
+            "account_ids": [account.account_id, "invalid-id"],
+        })
+        
+        assert result["found"] == 1
+        assert result["balances"][0]["balance"] == 5.0
+        assert result["balances"][1]["error"] == "Account not found"
+
+
+class TestAuditTools:
+    """Tests for get_balance_at and verify_account tools."""
+    
+    def test_get_balance_at(self):
+        """Should report the balance as of the given timestamp."""
+        account = db_create_account("Liam")
+        call_tool("deposit", {"account_id": account.account_id, "amount": 12.5})
+        
+        past = call_tool("get_balance_at", {
+            "account_id": account.account_id,
+            "timestamp": "2000-01-01T00:00:00",
+        })
+        now = call_tool("get_balance_at", {
+            "account_id": account.account_id,
+            "timestamp": "2999-01-01T00:00:00+00:00",
+        })
+        
+        assert past["balance"] == 0.0
+        assert now["balance"] == 12.5
+    
+    def test_get_balance_at_invalid_timestamp(self):
+        """Should reject timestamps that are not ISO 8601."""
+        account = db_create_account("Mia")
+        
+        result = call_tool("get_balance_at", {
+            "account_id": account.account_id,
+            "timestamp": "yesterday",
+        })
+        
+        assert result["error"] == "Invalid timestamp"
+    
+    def test_verify_account(self):
+        """Should confirm a consistent account and reject unknown ones."""
+        account = db_create_account("Noah")
+        call_tool("deposit", {"account_id": account.account_id, "amount": 40.0})
+        call_tool("withdraw", {"account_id": account.account_id, "amount": 15.0})
+        
+        result = call_tool("verify_account", {"account_id": account.account_id})
+        missing = call_tool("verify_account", {"account_id": "invalid-id"})
+        
+        assert result["ok"] is True
+        assert result["ledger_balance"] == 25.0
+        assert result["problems"] == []
+        assert missing["error"] == "Account not found"
+
+
+class TestBackupTool:
+    """Tests for the create_backup admin tool."""
+    
+    def test_refused_unless_enabled(self, monkeypatch):
+        """Admin tools should be off by default."""
+        monkeypatch.delenv("ZENITH_ADMIN_TOOLS", raising=False)
+        
+        result = call_tool("create_backup", {})
+        
+        assert result["error"] == "Admin tools are disabled"
+    
+    def test_writes_backup_directory(self, monkeypatch, tmp_path):
+        """An enabled tool should write a backup under ZENITH_BACKUP_DIR."""
+        monkeypatch.setenv("ZENITH_ADMIN_TOOLS", "1")
+        monkeypatch.setenv("ZENITH_BACKUP_DIR", str(tmp_path))
+        account = db_create_account("Olivia")
+        call_tool("deposit", {"account_id": account.account_id, "amount": 20.0})
+        
+        result = call_tool("create_backup", {})
+        
+        assert result["path"].startswith(str(tmp_path))
+        assert result["files"] == 1
+        assert (Path(result["path"]) / "manifest.json").exists()
+
+
+class TestStatementExport:
+    """Tests for export_statement and the streaming statement route."""
+    
+    def test_export_statement_pages_with_cursor(self):
+        """Should return statement pieces that continue via next_cursor."""
+        account = db_create_account("Olivia")
+        for amount in (1.0, 2.0, 3.0):
+            call_tool("deposit", {"account_id": account.account_id, "amount": amount})
+        
+        first = call_tool("export_statement", {
+            "account_id": account.account_id,
+            "format": "csv",
+            "max_rows": 2,
+        })
+        second = call_tool("export_statement", {
+            "account_id": account.account_id,
+            "format": "csv",
+            "cursor": first["next_cursor"],
+            "max_rows": 2,
+        })
+        
+        assert first["data"].splitlines()[0] == (
+            "seq,transaction_id,created_at,type,amount,balance_after"
+        )
+        assert first["row_count"] == 2
+        assert second["row_count"] == 1
+        assert second["next_cursor"] is None
+        assert second["data"].endswith("DEPOSIT,3.0,6.0\n")
+    
+    def test_export_statement_rejects_bad_input(self):
+        """Should reject unknown formats and unknown accounts."""
+        account = db_create_account("Paul")
+        
+        bad_format = call_tool("export_statement", {
+            "account_id": account.account_id,
+            "format": "xml",
+        })
+        missing = call_tool("export_statement", {"account_id": "invalid-id"})
+        
+        assert bad_format["error"] == "Unsupported format: xml"
+        assert missing["error"] == "Account not found"
+    
+    def test_statement_route_streams_ndjson(self):
+        """The HTTP route should stream one JSON object per transaction."""
+        from starlette.testclient import TestClient
+        
+        account = db_create_account("Quinn")
+        for amount in (5.0, 7.5):
+            call_tool("deposit", {"account_id": account.account_id, "amount": amount})
+        
+        with TestClient(mcp.http_app(transport="sse")) as client:
+            response = client.get(f"/accounts/{account.account_id}/statement")
+            missing = client.get("/accounts/invalid-id/statement")
+        
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert [line["balance_after"] for line in lines] == [5.0, 12.5]
+        assert missing.status_code == 404